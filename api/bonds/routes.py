@@ -1,11 +1,18 @@
 # markets/bonds/router.py
 import logging
-from fastapi import APIRouter, Query, Depends, HTTPException
+import orjson
+from fastapi import APIRouter, Query, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
+from datetime import date, timedelta
 from api.database.engine import get_session
-from api.database.dao import BaseDao, BondDAO, CouponDAO
-from api.bonds.schemas import BondForTable, BondEvent, BondFullInfo
+from api.common.pagination import fetch_page, decode_event_cursor, encode_event_cursor, NEXT_CURSOR_HEADER
+from api.common.serialization import json_response
+from api.database.dao import BaseDao, BondDAO, CouponDAO, BondEventDAO
+from api.bonds.schemas import (
+    BondForTable, BondEvent, BondFullInfo, BondCalendarEvent,
+    bond_for_table_serializer, bond_event_serializer, bond_full_info_serializer, bond_calendar_event_serializer,
+)
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(
@@ -19,24 +26,22 @@ router = APIRouter(prefix="/bonds", tags=["Bonds"])
 
 @router.get("", response_model=List[BondForTable])
 async def get_page(
+        response: Response,
         page: int = Query(1, ge=1),
-        per_page: int = Query(40, le=100),
+        per_page: int = Query(40, ge=1, le=100),
+        after: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor (keyset-пагинация вместо page)"),
         session: AsyncSession = Depends(get_session)
 ):
     """Получить список облигаций с пагинацией и сквозной нумерацией."""
     try:
-        bonds = await BaseDao.get_page(session=session, instrument_type="bond", page=page, per_page=per_page)
-        start_index = (page - 1) * per_page + 1
-        result = [
-            BondForTable.model_validate({
-                **bond.__dict__,
-                "id": start_index + index
-            })
-            for index, bond in enumerate(bonds)
-        ]
-
-        return result
-
+        bonds, start_index = await fetch_page(
+            session=session, response=response, instrument_type="bond",
+            page=page, per_page=per_page, after=after, columns=bond_for_table_serializer.columns
+        )
+        return json_response(bond_for_table_serializer.dump(bonds, start_id=start_index), response)
+
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         logger.error(f"Ошибка при получении облигаций: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Внутренняя ошибка сервера")
@@ -45,7 +50,7 @@ async def get_page(
 @router.get("/events", response_model=list[BondEvent], tags=["Bonds"])
 async def get_bond_events(
     type: str = Query(..., description="Тип события: 'repayment' или 'payment'"),
-    limit: int = Query(default=10, le=20, description="Максимум 20 событий"),
+    limit: int = Query(default=10, ge=1, le=20, description="Максимум 20 событий"),
     session: AsyncSession = Depends(get_session)
 ):
     """
@@ -54,52 +59,94 @@ async def get_bond_events(
     if type not in ["repayment", "payment"]:
         raise HTTPException(status_code=400, detail="Invalid event type. Use 'repayment' or 'payment'.")
 
-    bonds = await BondDAO.get_events(session=session, type=type, limit=limit)
-    result = [
-        BondEvent.model_validate({
-            **bond.__dict__,
-            "id": 1 + index
-        })
-        for index, bond in enumerate(bonds)
-    ]
-    return result
+    bonds = await BondDAO.get_events(
+        session=session, type=type, limit=limit, columns=bond_event_serializer.columns
+    )
+    return json_response(bond_event_serializer.dump(bonds, start_id=1, event_type=type))
 
 @router.get("/top", response_model=List[BondForTable])
 async def get_top_bonds(
     session: AsyncSession = Depends(get_session),
     type: str = Query(default="liquidity", description="liquidity - по ликвидности, duration - по дюрации, discount - по дисконту, coupon - по купону"),
-    limit: int = Query(default=5, le=20)
+    limit: int = Query(default=5, ge=1, le=20)
 ):
     """
     Топ облигаций по различным метрикам: ликвидность, дюрация, дисконт, купон.
     """
-    bonds = await BondDAO.get_top_bonds(session=session, type=type, limit=limit)
-    result = [
-        BondForTable.model_validate({
-            **bond.__dict__,
-            "id": 1 + index
-        })
-        for index, bond in enumerate(bonds)
-    ]
-    return result
-
-@router.get("/yields")
+    bonds = await BondDAO.get_top_bonds(
+        session=session, type=type, limit=limit, columns=bond_for_table_serializer.columns
+    )
+    return json_response(bond_for_table_serializer.dump(bonds, start_id=1))
+
+@router.get("/yields", response_model=List[BondForTable])
 async def get_yields_bonds(
         session: AsyncSession = Depends(get_session),
         type: str = Query(default="long", description="long - долгосрочные, medium - среднесрочные, short - краткосрочные"),
-        limit: int = Query(default=5, le=20, description="Не больше 20 бумаг")):
+        limit: int = Query(default=5, ge=1, le=20, description="Не больше 20 бумаг")):
     """
     Топ облигаций по доходности.
     """
-    bonds = await BondDAO.get_top_yields(session=session, type=type, limit=limit)
-    result = [
-        BondForTable.model_validate({
-            **bond.__dict__,
-            "id": 1 + index
-        })
-        for index, bond in enumerate(bonds)
-    ]
-    return result
+    bonds = await BondDAO.get_top_yields(
+        session=session, type=type, limit=limit, columns=bond_for_table_serializer.columns
+    )
+    return json_response(bond_for_table_serializer.dump(bonds, start_id=1))
+
+
+CALENDAR_EVENT_TYPES = {"coupon", "offer", "amortization", "maturity"}
+
+
+def _split_param(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
+
+
+@router.get("/calendar", response_model=List[BondCalendarEvent])
+async def get_bond_calendar(
+        response: Response,
+        date_from: Optional[date] = Query(None, alias="from", description="Начало периода (по умолчанию сегодня)"),
+        date_to: Optional[date] = Query(None, alias="to", description="Конец периода (по умолчанию +7 дней)"),
+        type: Optional[str] = Query(None, description="coupon, offer, amortization, maturity — можно через запятую"),
+        currency: Optional[str] = Query(None, description="Валюта номинала, например SUR или USD — можно через запятую"),
+        limit: int = Query(default=500, ge=1, le=5000),
+        after: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor"),
+        session: AsyncSession = Depends(get_session)
+):
+    """
+    Календарь выплат по всем облигациям: купоны, оферты, амортизации и погашения за период.
+    Весь период выгружается постранично: пока страница заполнена, в X-Next-Cursor лежит курсор следующей.
+    """
+    date_from = date_from or date.today()
+    date_to = date_to or date_from + timedelta(days=7)
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="'to' must not be earlier than 'from'")
+
+    event_types = [item.lower() for item in _split_param(type)]
+    unknown = set(event_types) - CALENDAR_EVENT_TYPES
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid event type: {', '.join(sorted(unknown))}. Use {', '.join(sorted(CALENDAR_EVENT_TYPES))}."
+        )
+
+    try:
+        cursor = decode_event_cursor(after) if after is not None else None
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    events = await BondEventDAO.get_calendar(
+        session=session,
+        date_from=date_from,
+        date_to=date_to,
+        limit=limit,
+        event_types=[item.upper() for item in event_types],
+        currencies=[item.upper() for item in _split_param(currency)],
+        after=cursor,
+        columns=bond_calendar_event_serializer.columns
+    )
+    if len(events) == limit:
+        last = events[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_event_cursor(last.event_date, last.secid, last.seq)
+
+    return json_response(bond_calendar_event_serializer.dump(events), response)
 
 
 @router.get("/{secid}", response_model=BondFullInfo)
@@ -109,12 +156,17 @@ async def get_marketdata_bond(
 ):
     """Получить рыночные данные по тикеру"""
     try:
-        bond = await BaseDao.get_marketdata_by_secid(session=session, secid=secid.upper())
-        return bond
+        bond = await BaseDao.get_marketdata_by_secid(
+            session=session, secid=secid.upper(), columns=bond_full_info_serializer.columns
+        )
     except Exception as e:
         logger.error(f"Ошибка при получении акций: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Внутренняя ошибка сервера")
 
+    if bond is None:
+        raise HTTPException(status_code=404, detail="Инструмент не найден")
+    return json_response(bond_full_info_serializer.dump_one(bond))
+
 
 @router.get("/coupons/{secid}")
 async def get_coupons_for_secid(
@@ -122,8 +174,8 @@ async def get_coupons_for_secid(
     session: AsyncSession = Depends(get_session)
 ):
     try:
-        events = await CouponDAO.get_or_fetch_bond_payments(session, secid)
-        return events
+        events = await CouponDAO.get_bond_payments(session, secid)
+        return json_response(orjson.dumps(events))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
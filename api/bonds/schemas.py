@@ -2,6 +2,8 @@ from typing import Optional
 from pydantic import BaseModel, model_validator
 from datetime import date
 
+from api.common.serialization import RowSerializer
+
 
 class BondForTable(BaseModel):
     id: Optional[int]  = None
@@ -18,6 +20,15 @@ class BondForTable(BaseModel):
     model_config = {"from_attributes": True}
 
 
+def days_to_event(event_type: str, next_coupon_date: Optional[date], maturity_date: Optional[date]) -> Optional[int]:
+    today = date.today()
+    if event_type == "payment" and next_coupon_date:
+        return (next_coupon_date - today).days
+    if event_type == "repayment" and maturity_date:
+        return (maturity_date - today).days
+    return None
+
+
 class BondEvent(BaseModel):
     id: int
     secid: str
@@ -38,18 +49,26 @@ class BondEvent(BaseModel):
     # ============= Вычисляемое поле: дней до события =============
     @model_validator(mode='after')
     def compute_count_day(self):
-        today = date.today()
-        if self.event_type == "payment" and self.next_coupon_date:
-            self.count_day = (self.next_coupon_date - today).days
-        elif self.event_type == "repayment" and self.maturity_date:
-            self.count_day = (self.maturity_date - today).days
-        else:
-            self.count_day = None
+        self.count_day = days_to_event(self.event_type, self.next_coupon_date, self.maturity_date)
         return self
 
     model_config = {"from_attributes": True}
 
 
+class BondCalendarEvent(BaseModel):
+    secid: str
+    event_type: str
+    event_date: date
+    face_value: Optional[float] = None
+    payment_amount: Optional[float] = None
+    payment_amount_rub: Optional[float] = None
+    payment_percent: Optional[float] = None
+    offer_price_percent: Optional[float] = None
+    currency: Optional[str] = None
+
+    model_config = {"from_attributes": True}
+
+
 class BondFullInfo(BaseModel):
     secid: str
     shortname: str
@@ -68,3 +87,12 @@ class BondFullInfo(BaseModel):
     effectiveyield: Optional[float] = None
 
     model_config = {"from_attributes": True}
+
+
+bond_for_table_serializer = RowSerializer(BondForTable)
+bond_event_serializer = RowSerializer(
+    BondEvent,
+    computed={"count_day": lambda item: days_to_event(item["event_type"], item["next_coupon_date"], item["maturity_date"])}
+)
+bond_full_info_serializer = RowSerializer(BondFullInfo)
+bond_calendar_event_serializer = RowSerializer(BondCalendarEvent)
@@ -0,0 +1,95 @@
+import hashlib
+from datetime import date, datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+from api.database.versions import dataset_versions
+from api.settings import settings
+
+# Префикс пути → набор данных, от версии которого зависит ответ.
+# Порядок важен: более длинные префиксы раньше.
+ROUTE_DATASETS = (
+    ("/bonds/coupons", "coupons"),
+    ("/bonds/calendar", "coupons"),
+    ("/stocks", "stocks"),
+    ("/bonds", "bonds"),
+    ("/funds", "funds"),
+    ("/indexes", "indexes"),
+    ("/forex", "forex"),
+    ("/candles", "candles"),
+    ("/capitalization", "capitalization"),
+    ("/companies", "companies"),
+)
+
+# Ответы, которые меняются со сменой дня и без нового коммита шедулера:
+# дни до события, фильтры по текущей дате, периоды и диапазоны от сегодняшнего дня
+DATE_DEPENDENT_ROUTES = (
+    "/bonds/events",
+    "/bonds/top",
+    "/bonds/yields",
+    "/bonds/calendar",
+    "/candles",
+    "/capitalization",
+)
+
+
+def _matches(path: str, prefix: str) -> bool:
+    return path == prefix or path.startswith(prefix + "/")
+
+
+def dataset_for_path(path: str) -> Optional[str]:
+    for prefix, dataset in ROUTE_DATASETS:
+        if _matches(path, prefix):
+            return dataset
+    return None
+
+
+def is_date_dependent(path: str) -> bool:
+    return any(_matches(path, prefix) for prefix in DATE_DEPENDENT_ROUTES)
+
+
+def _if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return etag in candidates or "*" in candidates
+
+
+async def conditional_get(request: Request, call_next):
+    """
+    Middleware условных GET-запросов.
+    ETag = версия набора данных + путь с параметрами (+ текущая дата для DATE_DEPENDENT_ROUTES,
+    иначе после полуночи клиент получил бы 304 на вчерашний ответ). Если клиент прислал
+    совпадающий If-None-Match — сразу 304, без сессии БД, DAO и сериализации.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return await call_next(request)
+
+    dataset = dataset_for_path(request.url.path)
+    current = dataset_versions.get(dataset) if dataset else None
+    if current is None:
+        return await call_next(request)
+
+    version, updated_at = current
+    query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+    key = f"{request.url.path}?{query}"
+    if is_date_dependent(request.url.path):
+        key += f"#{date.today().isoformat()}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    etag = f'"{dataset}-{version}-{digest}"'
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.HTTP_CACHE_MAX_AGE}, must-revalidate",
+        "X-Data-Age": str(max(0, int((datetime.utcnow() - updated_at).total_seconds()))),
+    }
+
+    if _if_none_match(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
@@ -0,0 +1,85 @@
+import base64
+import json
+from datetime import date
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.database.dao import BaseDao
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded))
+
+
+def encode_cursor(last_id: int, position: int) -> str:
+    """
+    Непрозрачный курсор: id последней отданной строки и её сквозной номер.
+    По id строится keyset-условие, номер нужен для продолжения нумерации.
+    """
+    return _encode([last_id, position])
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    try:
+        last_id, position = _decode(cursor)
+        return int(last_id), int(position)
+    except Exception:
+        raise ValueError("Некорректный курсор пагинации")
+
+
+def encode_event_cursor(event_date: date, secid: str, seq: int) -> str:
+    """Курсор календаря: ключ сортировки (event_date, secid, seq) последнего отданного события."""
+    return _encode([event_date.isoformat(), secid, seq])
+
+
+def decode_event_cursor(cursor: str) -> Tuple[date, str, int]:
+    try:
+        event_date, secid, seq = _decode(cursor)
+        return date.fromisoformat(event_date), str(secid), int(seq)
+    except Exception:
+        raise ValueError("Некорректный курсор пагинации")
+
+
+async def fetch_page(
+        session: AsyncSession,
+        response: Response,
+        instrument_type: str,
+        page: int,
+        per_page: int,
+        after: Optional[str] = None,
+        columns: Optional[Sequence[str]] = None,
+) -> Tuple[List[Any], int]:
+    """
+    Возвращает страницу инструментов и сквозной номер её первой строки.
+    С курсором after — keyset-пагинация (WHERE id > ...), иначе — классическая page/per_page.
+    Если страница заполнена целиком, курсор следующей страницы кладётся в заголовок X-Next-Cursor.
+    columns — поля схемы ответа: из БД читаются только они (и id).
+    """
+    if after is not None:
+        after_id, position = decode_cursor(after)
+        rows = await BaseDao.get_page_after(
+            session=session, instrument_type=instrument_type, after_id=after_id, per_page=per_page,
+            columns=columns
+        )
+        start_index = position + 1
+    else:
+        rows = await BaseDao.get_page(
+            session=session, instrument_type=instrument_type, page=page, per_page=per_page,
+            columns=columns
+        )
+        start_index = (page - 1) * per_page + 1
+
+    if rows and len(rows) == per_page:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id, start_index + len(rows) - 1)
+
+    return rows, start_index
@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Literal
+from typing import List, Literal, Optional
 import logging
 
 # Импорты DAO и сессии
 from api.database.engine import get_session
-from api.database.dao import BaseDao, CapitalizationDAO, CandlesDAO, CompanyDAO
+from api.common.pagination import fetch_page
+from api.common.serialization import json_response
+from api.database.dao import CapitalizationDAO, CandlesDAO, CompanyDAO
 
 # Схема ответа
-from api.common.schemas import Forex, Company
+from api.common.schemas import Forex, Company, forex_serializer, company_serializer
 
 
 # Настройка логгера
@@ -23,12 +25,20 @@ router = APIRouter(tags=["Common"])
 
 @router.get("/forex", response_model=List[Forex])
 async def get_currency(
+    response: Response,
     session: AsyncSession = Depends(get_session),
     page: int = Query(1, ge=1, description="Номер страницы, начиная с 1"),
-    per_page: int = Query(40, le=100, description="Количество записей на страницу, максимум 100"),
+    per_page: int = Query(40, ge=1, le=100, description="Количество записей на страницу, максимум 100"),
+    after: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor (keyset-пагинация вместо page)"),
 ):
     """Получить котировки валют от ЦБ"""
-    forex = await BaseDao.get_page(session=session, instrument_type="forex", page=page, per_page=per_page)
+    try:
+        forex, start_index = await fetch_page(
+            session=session, response=response, instrument_type="forex",
+            page=page, per_page=per_page, after=after, columns=forex_serializer.columns
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     result = [
         {
             "id": index + 1,
@@ -39,7 +49,7 @@ async def get_currency(
         }
         for index, valute in enumerate(forex)
     ]
-    return result
+    return json_response(forex_serializer.dump_mappings(result), response)
 
 
 @router.get("/capitalization")
@@ -77,4 +87,7 @@ async def get_info_companies_by_secid(
         secid: str,
         session: AsyncSession = Depends(get_session)):
     result = await CompanyDAO.get_company_info(session = session, secid = secid)
-    return result
\ No newline at end of file
+    # Нет описания компании — 200 и null, как и раньше: клиенты на это рассчитывают
+    if result is None:
+        return json_response(b"null")
+    return json_response(company_serializer.dump_one(result))
\ No newline at end of file
@@ -1,6 +1,9 @@
 from pydantic import BaseModel, HttpUrl
 from typing import Optional
 
+from api.common.serialization import RowSerializer
+
+
 class Forex(BaseModel):
     id: int
     secid: str
@@ -17,4 +20,8 @@ class Company(BaseModel):
     employees: Optional[str] = None
     sector: Optional[str] = None
     ceo: Optional[str] = None
-    link: Optional[str] = None
\ No newline at end of file
+    link: Optional[str] = None
+
+
+forex_serializer = RowSerializer(Forex)
+company_serializer = RowSerializer(Company)
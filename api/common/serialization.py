@@ -0,0 +1,151 @@
+import types
+import typing
+from datetime import date, datetime
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+# Заголовки служебного Response из зависимостей, которые не переносятся в готовый ответ
+_SKIP_HEADERS = {"content-length", "content-type"}
+
+
+def _to_float(value):
+    if value is None or value.__class__ is float:
+        return value
+    return float(value)
+
+
+def _to_int(value):
+    # Как pydantic: Decimal и float приводятся, только если они целые — дробная часть не отбрасывается молча
+    if value is None or value.__class__ is int:
+        return value
+    if isinstance(value, str):
+        return int(value)
+    result = int(value)
+    if result != value:
+        raise ValueError(f"Нецелое значение для целочисленного поля: {value!r}")
+    return result
+
+
+def _to_date(value):
+    # date из datetime — как в pydantic: отдаём только дату
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _converter_for(annotation: Any) -> Optional[Callable]:
+    """Конвертер значения из БД (Decimal, BIGINT, ...) в тип поля схемы; None — значение отдаётся как есть."""
+    if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        # HttpUrl | str и подобные объединения не приводим
+        annotation = args[0] if len(args) == 1 else None
+
+    if annotation is float:
+        return _to_float
+    if annotation is int:
+        return _to_int
+    if annotation is date:
+        return _to_date
+    return None
+
+
+class RowSerializer:
+    """
+    Предкомпилированный сериализатор строк БД в JSON по схеме ответа.
+    Поля, конвертеры и геттер собираются один раз при импорте схемы, поэтому на запросе
+    нет ни копирования __dict__ ORM-объекта, ни валидации pydantic — только чтение атрибутов и orjson.
+    Контракт тот же, что у response_model: те же поля, в том же порядке, те же типы.
+    computed — поля, которые в схеме вычисляет валидатор: имя → функция от уже собранного словаря.
+    """
+
+    def __init__(self, schema: Type[BaseModel], computed: Optional[Dict[str, Callable[[Dict[str, Any]], Any]]] = None):
+        self.schema = schema
+        self.fields = tuple(schema.model_fields)
+        self.defaults = {
+            name: field.default
+            for name, field in schema.model_fields.items()
+            if not field.is_required()
+        }
+        self.converters = [
+            (name, converter)
+            for name, field in schema.model_fields.items()
+            if (converter := _converter_for(field.annotation)) is not None
+        ]
+        self.computed = computed or {}
+        # Поля, которые читаются из строки: по ним DAO строит проекцию запроса
+        self.columns = tuple(name for name in self.fields if name not in self.computed)
+
+    def _items(
+            self,
+            rows: Iterable[Any],
+            names: List[str],
+            getter: Callable,
+            start_id: Optional[int],
+            overrides: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        # Шаблон фиксирует порядок ключей как в схеме, даже если id и overrides подставляются отдельно
+        template = dict.fromkeys(self.fields)
+        single = len(names) == 1
+        converters = self.converters
+        computed = self.computed
+        items = []
+
+        for index, row in enumerate(rows):
+            item = template.copy()
+            values = getter(row)
+            item.update(zip(names, (values,) if single else values))
+            if start_id is not None:
+                item["id"] = start_id + index
+            if overrides:
+                item.update(overrides)
+            for name, converter in converters:
+                item[name] = converter(item[name])
+            for name, compute in computed.items():
+                item[name] = compute(item)
+            items.append(item)
+        return items
+
+    def dump_items(self, rows: Iterable[Any], start_id: Optional[int] = None, **overrides) -> List[Dict[str, Any]]:
+        skip = set(overrides) | set(self.computed)
+        if start_id is not None:
+            skip.add("id")
+        names = [name for name in self.fields if name not in skip]
+        getter = attrgetter(*names) if names else (lambda row: ())
+        return self._items(rows, names, getter, start_id, overrides)
+
+    def dump(self, rows: Iterable[Any], start_id: Optional[int] = None, **overrides) -> bytes:
+        """
+        Список строк (ORM, Row, SimpleNamespace — всё, у чего есть атрибуты) → JSON-массив.
+        start_id — сквозная нумерация в поле id; overrides — поля, которых нет в строке (например, event_type).
+        """
+        return orjson.dumps(self.dump_items(rows, start_id, **overrides))
+
+    def dump_one(self, row: Any, **overrides) -> bytes:
+        return orjson.dumps(self.dump_items([row], **overrides)[0])
+
+    def dump_mappings(self, rows: Iterable[Dict[str, Any]]) -> bytes:
+        """То же для словарей; отсутствующие ключи берутся из значений по умолчанию схемы."""
+        defaults = self.defaults
+        names = [name for name in self.fields if name not in self.computed]
+        return orjson.dumps(self._items(
+            ({**defaults, **row} for row in rows),
+            names,
+            itemgetter(*names),
+            None,
+            {},
+        ))
+
+
+def json_response(content: bytes, response: Optional[Response] = None) -> Response:
+    """
+    Готовые JSON-байты → Response. FastAPI не валидирует и не сериализует его повторно.
+    Заголовки, выставленные зависимостями на response (например, X-Next-Cursor), переносятся.
+    """
+    headers = None
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key not in _SKIP_HEADERS}
+    return Response(content=content, media_type="application/json", headers=headers)
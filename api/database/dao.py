@@ -1,11 +1,31 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc, asc
+from sqlalchemy import select, tuple_
 from api.database.models import MarketData, MarketCap, Candle, Company
-from typing import List, Any, Dict
-from api.database.models import Coupons
-from api.bonds.utils import parse_bond_payments
-from datetime import datetime, timedelta, date
-import httpx
+from typing import List, Any, Dict, Optional, Sequence, Tuple
+from api.database.models import Leaderboard, BondEvents
+from api.bonds.utils import event_to_payment
+from api.database.snapshot import market_snapshot
+from datetime import timedelta, date
+
+
+def _projection(model, columns: Optional[Sequence[str]], key: Sequence[str] = ("id",)):
+    """
+    select только по колонкам, которые нужны схеме ответа, плюс ключ (на нём держатся порядок и курсоры).
+    Имена, которых нет в таблице (вычисляемые поля схемы), пропускаются.
+    Без columns — полная ORM-сущность, как раньше. Снимок market_data (api/database/snapshot.py)
+    строит строки по тем же columns.
+    """
+    if columns is None:
+        return select(model)
+    available = model.__table__.columns.keys()
+    names = dict.fromkeys([*key, *(name for name in columns if name in available)])
+    return select(*(getattr(model, name) for name in names))
+
+
+def _rows(result, columns: Optional[Sequence[str]]):
+    # Проекция возвращает лёгкие Row (доступ по атрибутам), полная выборка — сущности
+    return result.all() if columns is not None else result.scalars().all()
+
 
 class BaseDao:
     @staticmethod
@@ -13,210 +33,140 @@ class BaseDao:
             session: AsyncSession,
             instrument_type: str,
             page: int,
-            per_page: int
+            per_page: int,
+            columns: Optional[Sequence[str]] = None
     ) -> List[MarketData]:
+        if market_snapshot.ready:
+            return market_snapshot.get_page(instrument_type, page, per_page, columns)
+
         offset = (page - 1) * per_page
         try:
             result = await session.execute(
-                select(MarketData)
+                _projection(MarketData, columns)
                 .where(MarketData.instrument_type == instrument_type)
                 .order_by(MarketData.id)
                 .offset(offset)
                 .limit(per_page)
             )
-            return result.scalars().all()
+            return _rows(result, columns)
         except Exception as e:
             raise e
 
     @staticmethod
-    async def get_marketdata_by_secid(session: AsyncSession, secid: str):
+    async def get_page_after(
+            session: AsyncSession,
+            instrument_type: str,
+            after_id: int,
+            per_page: int,
+            columns: Optional[Sequence[str]] = None
+    ) -> List[MarketData]:
+        """
+        Keyset-пагинация: строки с id больше курсора.
+        Стоимость не зависит от глубины страницы, а upsert шедулера не сдвигает
+        уже отданные строки — id при ON CONFLICT не меняется.
+        """
+        if market_snapshot.ready:
+            return market_snapshot.get_page_after(instrument_type, after_id, per_page, columns)
+
+        result = await session.execute(
+            _projection(MarketData, columns)
+            .where(
+                MarketData.instrument_type == instrument_type,
+                MarketData.id > after_id
+            )
+            .order_by(MarketData.id)
+            .limit(per_page)
+        )
+        return _rows(result, columns)
+
+    @staticmethod
+    async def get_marketdata_by_secid(session: AsyncSession, secid: str, columns: Optional[Sequence[str]] = None):
+        if market_snapshot.ready:
+            return market_snapshot.get_by_secid(secid, columns)
+
         try:
             result = await session.execute(
-                select(MarketData)
+                _projection(MarketData, columns)
                 .where(MarketData.secid == secid)
             )
-            return result.scalars().first()
+            return result.first() if columns is not None else result.scalars().first()
         except Exception as e:
             raise e
 
 
-class StockDAO:
+class LeaderboardDAO:
     @staticmethod
-    async def get_top_stocks(session: AsyncSession, type: str, limit: int):
+    async def get_top(
+            session: AsyncSession,
+            instrument_type: str,
+            metric: str,
+            limit: int,
+            bucket: str = "",
+            columns: Optional[Sequence[str]] = None
+    ) -> List[MarketData]:
         """
-        Получить топ акций по типу: 'volatility', 'volume', 'rising', 'falling'
+        Читает готовый топ, который шедулер пересчитывает после каждого upsert
+        (scheduler/database/leaderboards.py). Никаких сортировок на запрос — O(K).
         """
-        query = select(MarketData).where(MarketData.instrument_type == "stock")
-
-        if type == "volatility":
-            query = query.where(MarketData.volatility_percent.isnot(None))
-            query = query.order_by(desc(MarketData.volatility_percent))
-
-        elif type == "volume":
-            query = query.where(MarketData.volume.isnot(None))
-            query = query.order_by(desc(MarketData.volume))
+        if market_snapshot.ready:
+            return market_snapshot.get_leaderboard(instrument_type, metric, bucket, limit, columns)
 
-        elif type == "rising":
-            query = query.where(
-                and_(
-                    MarketData.change_percent.isnot(None),
-                    MarketData.change_percent != 0
-                )
+        result = await session.execute(
+            _projection(MarketData, columns)
+            .join(Leaderboard, Leaderboard.market_data_id == MarketData.id)
+            .where(
+                Leaderboard.instrument_type == instrument_type,
+                Leaderboard.metric == metric,
+                Leaderboard.bucket == bucket
             )
-            query = query.order_by(desc(MarketData.change_percent))
+            .order_by(Leaderboard.rank)
+            .limit(limit)
+        )
+        return _rows(result, columns)
 
-        elif type == "falling":
-            query = query.where(
-                and_(
-                    MarketData.change_percent.isnot(None),
-                    MarketData.change_percent != 0
-                )
-            )
-            query = query.order_by(asc(MarketData.change_percent))
 
-        else:
+class StockDAO:
+    @staticmethod
+    async def get_top_stocks(session: AsyncSession, type: str, limit: int, columns: Optional[Sequence[str]] = None):
+        """
+        Получить топ акций по типу: 'volatility', 'volume', 'rising', 'falling'
+        """
+        if type not in ("volatility", "volume", "rising", "falling"):
             raise ValueError(f"Неизвестный тип: {type}. Допустимые: volatility, volume, rising, falling")
 
-        query = query.limit(limit)
-        result = await session.execute(query)
-        return result.scalars().all()
-
+        return await LeaderboardDAO.get_top(session, "stock", type, limit, columns=columns)
 
 
 class BondDAO:
     @staticmethod
-    async def get_events(session: AsyncSession, type: str, limit: int):
+    async def get_events(session: AsyncSession, type: str, limit: int, columns: Optional[Sequence[str]] = None):
         """
         Получение событий по типу: выплаты купонов или погашения.
+        Тип события (event_type) в ответ подставляет роут — строки проекции неизменяемые.
         """
-        today = date.today()
-        if type == "payment":
-            stmt = (
-                select(MarketData)
-                .where(MarketData.next_coupon_date >= today)
-                .order_by(asc(MarketData.next_coupon_date))
-                .limit(limit)
-            )
-        elif type == "repayment":
-            stmt = (
-                select(MarketData)
-                .where(MarketData.maturity_date >= today)
-                .order_by(asc(MarketData.maturity_date))
-                .limit(limit)
-            )
-
-        result = await session.execute(stmt)
-        bonds = result.scalars().all()
-
-        for bond in bonds:
-            bond.event_type = type
-
-        return bonds
+        return await LeaderboardDAO.get_top(session, "bond", type, limit, columns=columns)
 
     @staticmethod
     async def get_top_bonds(
             session: AsyncSession,
             type: str,
-            limit: int
+            limit: int,
+            columns: Optional[Sequence[str]] = None
             ) -> List[MarketData]:
-            today = date.today()
-
-            base_filter = and_(
-                MarketData.maturity_date > today,  # Ещё не погашены
-                MarketData.list_level == 1,  # Высший уровень листинга
-            )
-
-            # Дополнительные условия для каждого типа запроса
-            if type == "liquidity":
-                stmt = (
-                    select(MarketData)
-                    .where(base_filter)
-                    .order_by(desc(MarketData.volume))
-                    .limit(limit)
-                )
-            elif type == "duration":
-                stmt = (
-                    select(MarketData)
-                    .where(base_filter)
-                    .order_by(desc(MarketData.duration_years))
-                    .limit(limit)
-                )
-            elif type == "discount":
-                # Только облигации с ценой ниже номинала
-                discount_filter = and_(
-                    base_filter,
-                    MarketData.last_price < MarketData.facevalue,
-                    MarketData.facevalue > 0,  # избегаем деления на ноль
-                )
-                # Сортируем по размеру дисконта в процентах
-                stmt = (
-                    select(MarketData)
-                    .where(discount_filter)
-                    .order_by(
-                        desc(
-                            ((MarketData.facevalue - MarketData.last_price) / MarketData.facevalue) * 100)
-                    )
-                    .limit(limit)
-                )
-            elif type == "coupon":
-                stmt = (
-                    select(MarketData)
-                    .where(base_filter)
-                    .order_by(desc(MarketData.couponpercent))
-                    .limit(limit)
-                )
-            else:
+            if type not in ("liquidity", "duration", "discount", "coupon"):
                 raise ValueError(
                     "Invalid type. Must be 'liquidity', 'duration', 'discount', or 'coupon'"
                 )
 
-            result = await session.execute(stmt)
-            bonds = result.scalars().all()
-            return bonds
+            return await LeaderboardDAO.get_top(session, "bond", type, limit, columns=columns)
 
     @staticmethod
-    async def get_top_yields(session: AsyncSession, type: str, limit: int):
-        # Определяем диапазон лет в зависимости от типа
-        today = date.today()
-        if type == "short":
-            min_years, max_years = 0, 1
-        elif type == "medium":
-            min_years, max_years = 1, 5
-        elif type == "long":
-            min_years, max_years = 5, None
-        else:
+    async def get_top_yields(session: AsyncSession, type: str, limit: int, columns: Optional[Sequence[str]] = None):
+        # Корзины по сроку до погашения: short — до года, medium — 1–5 лет, long — больше 5 лет
+        if type not in ("short", "medium", "long"):
             raise ValueError("type must be 'short', 'medium', or 'long'")
 
-        # Разница в днях между датой погашения и сегодняшней датой
-        days_diff = MarketData.maturity_date - today
-        years_left = days_diff / 365.25
-
-        # Фильтр по сроку до погашения
-        if max_years is not None:
-            duration_filter = (years_left > min_years) & (years_left <= max_years)
-        else:
-            duration_filter = years_left > min_years
-
-        # Основные условия отбора
-        base_filter = (
-                (MarketData.list_level == 1) &
-                (MarketData.maturity_date > today) &
-                (MarketData.effectiveyield > 0) &
-                (MarketData.effectiveyield < 100) &
-                (MarketData.accruedint.isnot(None)) &
-                duration_filter
-        )
-
-        # Запрос: топ облигаций по доходности
-        stmt = (
-            select(MarketData)
-            .where(base_filter)
-            .order_by(MarketData.effectiveyield.desc())
-            .limit(limit)
-        )
-
-        result = await session.execute(stmt)
-        return result.scalars().all()
+        return await LeaderboardDAO.get_top(session, "bond", "yield", limit, bucket=type, columns=columns)
 
 
 class IndexDAO:
@@ -243,50 +193,33 @@ class IndexDAO:
     @staticmethod
     async def get_top_indexes(
         session: AsyncSession,
-        type: str
+        type: str,
+        columns: Optional[Sequence[str]] = None
     ):
         """
         Возвращает топ-индексы по различным критериям.
         Индексы определяются по MarketData.instrument_type == 'index'.
         """
-        base_query = select(MarketData).where(MarketData.instrument_type == "index")
+        if type in ("rising", "falling", "volume", "volatility"):
+            return await LeaderboardDAO.get_top(session, "index", type, limit=5, columns=columns)
 
+        secids = None
         if type == "main":
-            result = await session.execute(
-                base_query.where(MarketData.secid.in_(IndexDAO.MAIN_INDEXES.keys()))
-            )
-            return result.scalars().all()
-
+            secids = list(IndexDAO.MAIN_INDEXES.keys())
         elif type == "sector":
-            result = await session.execute(
-                base_query.where(MarketData.secid.in_(IndexDAO.SECTOR_INDEXES.keys()))
-            )
-            return result.scalars().all()
-
-        elif type in ("rising", "falling"):
-            order = MarketData.change_percent.desc() if type == "rising" else MarketData.change_percent.asc()
-            result = await session.execute(
-                base_query.order_by(order).limit(5)
-            )
-            return result.scalars().all()
-
-        elif type == "volume":
-            result = await session.execute(
-                base_query.order_by(MarketData.volume.desc()).limit(5)
-            )
-            return result.scalars().all()
+            secids = list(IndexDAO.SECTOR_INDEXES.keys())
 
-        elif type == "volatility":
-            result = await session.execute(
-                base_query
-                .where(MarketData.volatility_percent.isnot(None))
-                .order_by(MarketData.volatility_percent.desc())
-                .limit(5))
-            return result.scalars().all()
+        if market_snapshot.ready:
+            if secids is not None:
+                return market_snapshot.get_by_secids("index", secids, columns)
+            return market_snapshot.get_all("index", columns)
 
+        base_query = _projection(MarketData, columns).where(MarketData.instrument_type == "index")
+        if secids is not None:
+            base_query = base_query.where(MarketData.secid.in_(secids))
 
-        result = await session.execute(base_query)
-        return result.scalars().all()
+        result = await session.execute(base_query.order_by(MarketData.id))
+        return _rows(result, columns)
 
 class CapitalizationDAO:
     @staticmethod
@@ -454,59 +387,58 @@ class CandlesDAO:
 
 
 class CouponDAO:
-    BONDIZATION_URL = "https://iss.moex.com/iss/securities/{secid}/bondization.json"
-    CACHE_TTL_HOURS = 24
-
-    @classmethod
-    async def get_or_fetch_bond_payments(
-        cls,
-        session: AsyncSession,
-        secid: str
-    ) -> List[Dict[str, Any]]:
+    @staticmethod
+    async def get_bond_payments(session: AsyncSession, secid: str) -> List[Dict[str, Any]]:
         """
-        Возвращает список событий (купоны, оферты, амортизации, погашения) по secid.
-        Использует локальный кеш (таблица bondization_cache). При отсутствии или устаревании —
-        обращается к API Мосбиржи, сохраняет ответ и возвращает распарсенные данные.
+        Возвращает список событий (купоны, оферты, амортизации, погашения) по secid из bond_events.
+        Таблицу пишет только шедулер (предзагрузка bondization, единственный разбор ответа ISS),
+        API её только читает: по бумаге, которую шедулер ещё не загрузил, — пустой список.
         """
-        # 1. Попытка получить из кеша
-        result = await session.execute(
-            select(Coupons).where(Coupons.secid == secid)
-        )
-        cached = result.scalar_one_or_none()
+        events = await BondEventDAO.get_for_secid(session, secid)
+        return [event_to_payment(event) for event in events]
 
-        now = datetime.utcnow()
-        ttl = timedelta(hours=cls.CACHE_TTL_HOURS)
-        should_refresh = (
-            cached is None
-            or (now - cached.updated_at) > ttl
-        )
 
-        if not should_refresh:
-            return parse_bond_payments(cached.data)
+class BondEventDAO:
+    @staticmethod
+    async def get_for_secid(session: AsyncSession, secid: str):
+        result = await session.execute(
+            select(BondEvents)
+            .where(BondEvents.secid == secid)
+            .order_by(BondEvents.seq)
+        )
+        return result.scalars().all()
 
-        # 2. Запрос к внешнему API
-        try:
-            url = cls.BONDIZATION_URL.format(secid=secid)
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params={"limit": "unlimited"})
-                response.raise_for_status()
-                raw_data = response.json()
-        except Exception as e:
-            # Fallback: если API недоступен, но есть старый кеш — вернуть его
-            if cached:
-                return parse_bond_payments(cached.data)
-            raise RuntimeError(f"Failed to fetch bondization data for {secid}: {e}")
-
-        # 3. Сохранение в кеш
-        if cached:
-            cached.data = raw_data
-            cached.updated_at = now
-        else:
-            cached = Coupons(secid=secid, data=raw_data)
-            session.add(cached)
+    @staticmethod
+    async def get_calendar(
+            session: AsyncSession,
+            date_from: date,
+            date_to: date,
+            limit: int,
+            event_types: Optional[Sequence[str]] = None,
+            currencies: Optional[Sequence[str]] = None,
+            after: Optional[Tuple[date, str, int]] = None,
+            columns: Optional[Sequence[str]] = None
+    ):
+        """
+        События всех облигаций в диапазоне дат — скан по индексу (event_date).
+        after — ключ (event_date, secid, seq) последнего отданного события: следующая страница
+        продолжает скан с этого места, без OFFSET.
+        """
+        conditions = [BondEvents.event_date >= date_from, BondEvents.event_date <= date_to]
+        if event_types:
+            conditions.append(BondEvents.event_type.in_(event_types))
+        if currencies:
+            conditions.append(BondEvents.currency.in_(currencies))
+        if after is not None:
+            conditions.append(tuple_(BondEvents.event_date, BondEvents.secid, BondEvents.seq) > tuple_(*after))
 
-        await session.commit()
-        return parse_bond_payments(raw_data)
+        result = await session.execute(
+            _projection(BondEvents, columns, key=("event_date", "secid", "seq"))
+            .where(*conditions)
+            .order_by(BondEvents.event_date, BondEvents.secid, BondEvents.seq)
+            .limit(limit)
+        )
+        return _rows(result, columns)
 
 
 class CompanyDAO:
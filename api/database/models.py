@@ -11,6 +11,7 @@ from sqlalchemy import (
     JSON,
     BIGINT,
     Text,
+    Float,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
@@ -99,6 +100,7 @@ class Coupons(Base):
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
+    next_event_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
 
 
 class Company(Base):
@@ -112,3 +114,46 @@ class Company(Base):
     sector: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     ceo: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     link: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+
+class BondEvents(Base):
+    __tablename__ = "bond_events"
+
+    secid: Mapped[str] = mapped_column(String(51), primary_key=True)
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    event_type: Mapped[str] = mapped_column(String(16), nullable=False)
+    event_date: Mapped[date] = mapped_column(Date, nullable=False)
+    face_value: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    payment_amount: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    payment_amount_rub: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    payment_percent: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    record_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    start_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    offer_start_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    offer_end_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    offer_price_percent: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    offer_status: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    currency: Mapped[Optional[str]] = mapped_column(String(10), nullable=True)
+
+
+class Leaderboard(Base):
+    __tablename__ = "leaderboards"
+
+    instrument_type: Mapped[str] = mapped_column(String(10), primary_key=True)
+    metric: Mapped[str] = mapped_column(String(20), primary_key=True)
+    bucket: Mapped[str] = mapped_column(String(20), primary_key=True, default="")
+    rank: Mapped[int] = mapped_column(Integer, primary_key=True)
+    market_data_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False
+    )
+
+
+class DatasetVersion(Base):
+    __tablename__ = "dataset_versions"
+
+    dataset: Mapped[str] = mapped_column(String(32), primary_key=True)
+    version: Mapped[int] = mapped_column(BIGINT, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False
+    )
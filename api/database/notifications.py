@@ -0,0 +1,93 @@
+# api/database/notifications.py
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+import asyncpg
+
+from api.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Каналы совпадают с теми, в которые пишет шедулер (scheduler/database/dao.py)
+MARKET_DATA_CHANNEL = "market_data_changed"
+DATASET_VERSION_CHANNEL = "dataset_version_changed"
+
+Handler = Callable[[Optional[str]], None]
+
+
+class PgListener:
+    """
+    Отдельное соединение asyncpg с LISTEN на каналах Postgres.
+    Обработчики вызываются синхронно в event loop с payload уведомления.
+    После переподключения каждый обработчик получает payload=None —
+    за время простоя уведомления могли потеряться, подписчик должен пересинхронизироваться.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, channel: str, handler: Handler):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _dispatch(self, channel: str, payload: Optional[str]):
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(payload)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика канала {channel}: {e}", exc_info=True)
+
+    def _on_notification(self, connection, pid, channel, payload):
+        self._dispatch(channel, payload or None)
+
+    async def _run(self):
+        first_connect = True
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(
+                    user=settings.POSTGRES_USER,
+                    password=settings.POSTGRES_PASSWORD,
+                    database=settings.POSTGRES_DB,
+                    host=settings.DB_HOST,
+                    port=settings.DB_PORT,
+                )
+                terminated = asyncio.Event()
+                conn.add_termination_listener(lambda _: terminated.set())
+                for channel in self._handlers:
+                    await conn.add_listener(channel, self._on_notification)
+                logger.info(f"LISTEN на каналах: {', '.join(self._handlers)}")
+
+                if not first_connect:
+                    for channel in self._handlers:
+                        self._dispatch(channel, None)
+                first_connect = False
+
+                await terminated.wait()
+                logger.warning("Соединение LISTEN потеряно, переподключаемся...")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Не удалось подписаться на уведомления Postgres: {e}")
+                first_connect = False
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(settings.LISTENER_RECONNECT_DELAY)
+
+
+listener = PgListener()
@@ -0,0 +1,245 @@
+# api/database/snapshot.py
+import asyncio
+import logging
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+
+from api.database.engine import AsyncSessionLocal
+from api.database.models import MarketData, Leaderboard
+from api.database.versions import dataset_versions, SNAPSHOT_DATASETS
+from api.settings import settings
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = tuple(column.name for column in MarketData.__table__.columns)
+COLUMN_SET = frozenset(COLUMNS)
+
+
+class MarketDataSnapshot:
+    """
+    Колоночный снимок всей таблицы market_data в памяти процесса API.
+
+    Каждая колонка хранится отдельным списком, строка — это позиция в списках.
+    Снимок загружается целиком при старте, а дальше догружается инкрементально
+    по updated_at, когда шедулер присылает NOTIFY после upsert_market_data;
+    строки, удалённые из таблицы, убираются по сверке списка id.
+    Все изменения применяются синхронно, без await, поэтому запросы в том же
+    event loop никогда не видят наполовину обновлённый снимок.
+    """
+
+    def __init__(self):
+        self._columns: Dict[str, List[Any]] = {name: [] for name in COLUMNS}
+        self._pos_by_id: Dict[int, int] = {}
+        self._by_type: Dict[str, List[int]] = {}
+        self._by_secid: Dict[str, int] = {}
+        self._leaderboards: Dict[Tuple[str, str, str], List[int]] = {}
+        self._synced_until: Optional[datetime] = None
+        self._refresh_event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.ready = False
+
+    # === Жизненный цикл ===
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def request_refresh(self, payload: Optional[str] = None):
+        """Обработчик NOTIFY: помечает снимок устаревшим, догрузка идёт в фоне."""
+        self._refresh_event.set()
+
+    async def _run(self):
+        full_reload_at = 0.0
+        while True:
+            full = not self.ready or time.monotonic() >= full_reload_at
+            self._refresh_event.clear()
+            try:
+                await self._load(full=full)
+                if full:
+                    full_reload_at = time.monotonic() + settings.SNAPSHOT_FULL_RELOAD_INTERVAL
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка загрузки снимка market_data: {e}", exc_info=True)
+                await asyncio.sleep(settings.LISTENER_RECONNECT_DELAY)
+                continue
+
+            timeout = max(0.0, full_reload_at - time.monotonic())
+            try:
+                await asyncio.wait_for(self._refresh_event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _load(self, full: bool):
+        start = time.time()
+        table = MarketData.__table__
+        stmt = select(table)
+        if not full and self._synced_until is not None:
+            # Перекрытие окна страхует от транзакций, которые закоммитились позже,
+            # чем началась следующая: updated_at у них меньше уже виденного максимума
+            since = self._synced_until - timedelta(seconds=settings.SNAPSHOT_RELOAD_OVERLAP)
+            stmt = stmt.where(table.c.updated_at > since)
+
+        async with AsyncSessionLocal() as session:
+            # Версии читаем до данных: данные в снимке всегда не старее версии в ETag
+            versions = await dataset_versions.fetch(session)
+            result = await session.execute(stmt)
+            rows = result.all()
+            # Удалённые строки по updated_at не найти: сверяем список id целиком (несколько тысяч int).
+            # Читаем после данных: строка, вставленная между запросами, не будет ошибочно удалена
+            ids = None if full else set((await session.execute(select(table.c.id))).scalars())
+            # Топы маленькие (десятки строк на тип) — всегда перечитываем целиком
+            result = await session.execute(
+                select(
+                    Leaderboard.instrument_type, Leaderboard.metric,
+                    Leaderboard.bucket, Leaderboard.market_data_id
+                ).order_by(Leaderboard.rank)
+            )
+            leaderboard_rows = result.all()
+
+        leaderboards: Dict[Tuple[str, str, str], List[int]] = {}
+        for instrument_type, metric, bucket, market_data_id in leaderboard_rows:
+            leaderboards.setdefault((instrument_type, metric, bucket), []).append(market_data_id)
+
+        if full:
+            self._replace(rows)
+        else:
+            self._merge(rows, ids)
+        self._leaderboards = leaderboards
+        dataset_versions.apply(versions, datasets=SNAPSHOT_DATASETS)
+        self.ready = True
+
+        logger.info(
+            f"Снимок market_data {'загружен' if full else 'обновлён'}: "
+            f"{len(rows)} строк за {time.time() - start:.3f} сек (всего {len(self._pos_by_id)})"
+        )
+
+    def _replace(self, rows):
+        self._columns = {
+            name: [row[idx] for row in rows]
+            for idx, name in enumerate(COLUMNS)
+        }
+        self._synced_until = None
+        self._reindex()
+
+    def _merge(self, rows, ids: Optional[set] = None):
+        """
+        Применяет изменённые строки. ids — все id в таблице сейчас: строки снимка с другими id
+        удалены из market_data (или перезаписаны под новым id) и из снимка убираются.
+        """
+        columns = self._columns
+        id_idx = COLUMNS.index("id")
+        for row in rows:
+            pos = self._pos_by_id.get(row[id_idx])
+            if pos is None:
+                for idx, name in enumerate(COLUMNS):
+                    columns[name].append(row[idx])
+            else:
+                for idx, name in enumerate(COLUMNS):
+                    columns[name][pos] = row[idx]
+        if ids is not None:
+            keep = [pos for pos, row_id in enumerate(columns["id"]) if row_id in ids]
+            if len(keep) < len(columns["id"]):
+                self._columns = {name: [values[pos] for pos in keep] for name, values in columns.items()}
+        self._reindex()
+
+    def _reindex(self):
+        ids = self._columns["id"]
+        types = self._columns["instrument_type"]
+        secids = self._columns["secid"]
+        updated = self._columns["updated_at"]
+
+        order = sorted(range(len(ids)), key=ids.__getitem__)
+        by_type: Dict[str, List[int]] = {}
+        by_secid: Dict[str, int] = {}
+        for pos in order:
+            by_type.setdefault(types[pos], []).append(pos)
+            by_secid.setdefault(secids[pos], pos)
+
+        self._pos_by_id = {ids[pos]: pos for pos in order}
+        self._by_type = by_type
+        self._by_secid = by_secid
+        if updated:
+            latest = max(updated)
+            if self._synced_until is None or latest > self._synced_until:
+                self._synced_until = latest
+
+    # === Примитивы чтения ===
+
+    @staticmethod
+    def _names(columns: Optional[Sequence[str]]) -> Tuple[str, ...]:
+        """
+        Колонки строки ответа — как _projection в DAO: id плюс запрошенные колонки таблицы
+        (вычисляемые поля схемы пропускаются). Без columns — все колонки.
+        """
+        if columns is None:
+            return COLUMNS
+        return tuple(dict.fromkeys(["id", *(name for name in columns if name in COLUMN_SET)]))
+
+    def _row(self, pos: int, columns: Optional[Sequence[str]] = None) -> SimpleNamespace:
+        return self._rows([pos], columns)[0]
+
+    def _rows(self, positions: List[int], columns: Optional[Sequence[str]] = None) -> List[SimpleNamespace]:
+        # Строка собирается только из нужных схеме колонок, а не из всех 40
+        names = self._names(columns)
+        values = [self._columns[name] for name in names]
+        return [SimpleNamespace(**dict(zip(names, [column[pos] for column in values]))) for pos in positions]
+
+    def _positions(self, instrument_type: str) -> List[int]:
+        return self._by_type.get(instrument_type, [])
+
+    # === Запросы ===
+
+    # columns — поля схемы ответа (RowSerializer.columns), как у DAO; без них — строка целиком
+
+    def get_page(
+            self, instrument_type: str, page: int, per_page: int, columns: Optional[Sequence[str]] = None
+    ) -> List[SimpleNamespace]:
+        offset = (page - 1) * per_page
+        return self._rows(self._positions(instrument_type)[offset:offset + per_page], columns)
+
+    def get_page_after(
+            self, instrument_type: str, after_id: int, per_page: int, columns: Optional[Sequence[str]] = None
+    ) -> List[SimpleNamespace]:
+        positions = self._positions(instrument_type)
+        start = bisect_right(positions, after_id, key=self._columns["id"].__getitem__)
+        return self._rows(positions[start:start + per_page], columns)
+
+    def get_by_secid(self, secid: str, columns: Optional[Sequence[str]] = None) -> Optional[SimpleNamespace]:
+        pos = self._by_secid.get(secid)
+        return self._row(pos, columns) if pos is not None else None
+
+    def get_by_secids(
+            self, instrument_type: str, secids: List[str], columns: Optional[Sequence[str]] = None
+    ) -> List[SimpleNamespace]:
+        wanted = set(secids)
+        secid_col = self._columns["secid"]
+        return self._rows([p for p in self._positions(instrument_type) if secid_col[p] in wanted], columns)
+
+    def get_all(self, instrument_type: str, columns: Optional[Sequence[str]] = None) -> List[SimpleNamespace]:
+        return self._rows(self._positions(instrument_type), columns)
+
+    def get_leaderboard(
+            self, instrument_type: str, metric: str, bucket: str, limit: int, columns: Optional[Sequence[str]] = None
+    ) -> List[SimpleNamespace]:
+        """Готовый топ, посчитанный шедулером: O(K) без сортировок."""
+        ids = self._leaderboards.get((instrument_type, metric, bucket), [])
+        positions = [self._pos_by_id[i] for i in ids[:limit] if i in self._pos_by_id]
+        return self._rows(positions, columns)
+
+
+market_snapshot = MarketDataSnapshot()
@@ -0,0 +1,91 @@
+# api/database/versions.py
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.database.engine import AsyncSessionLocal
+from api.database.models import DatasetVersion
+from api.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Наборы данных, которые API отдаёт из снимка market_data
+SNAPSHOT_DATASETS = ("stocks", "bonds", "funds", "indexes", "forex")
+
+
+class DatasetVersions:
+    """
+    Версии наборов данных в памяти процесса (таблица dataset_versions).
+    Шедулер увеличивает версию при каждом коммите и шлёт NOTIFY, по версии строится ETag.
+
+    Версии наборов из снимка market_data выставляет сам снимок — после того как
+    дочитал данные. Иначе клиент мог бы получить старые данные с ETag новой версии
+    и не увидеть обновление до следующего коммита.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, Tuple[int, datetime]] = {}
+        self._delegated: Set[str] = set()
+        self._refresh_event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def delegate(self, datasets: Iterable[str]):
+        self._delegated.update(datasets)
+
+    def get(self, dataset: str) -> Optional[Tuple[int, datetime]]:
+        return self._versions.get(dataset)
+
+    @staticmethod
+    async def fetch(session: AsyncSession) -> List[Tuple[str, int, datetime]]:
+        result = await session.execute(
+            select(DatasetVersion.dataset, DatasetVersion.version, DatasetVersion.updated_at)
+        )
+        return [tuple(row) for row in result.all()]
+
+    def apply(self, rows: List[Tuple[str, int, datetime]], datasets: Optional[Iterable[str]] = None):
+        wanted = set(datasets) if datasets is not None else None
+        for dataset, version, updated_at in rows:
+            if wanted is not None and dataset not in wanted:
+                continue
+            self._versions[dataset] = (version, updated_at)
+
+    # === Жизненный цикл ===
+
+    def request_refresh(self, payload: Optional[str] = None):
+        self._refresh_event.set()
+
+    async def start(self):
+        if self._task is None:
+            self._refresh_event.set()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self._refresh_event.wait()
+            self._refresh_event.clear()
+            try:
+                async with AsyncSessionLocal() as session:
+                    rows = await self.fetch(session)
+                self.apply([row for row in rows if row[0] not in self._delegated])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка загрузки версий наборов данных: {e}", exc_info=True)
+                await asyncio.sleep(settings.LISTENER_RECONNECT_DELAY)
+                self._refresh_event.set()
+
+
+dataset_versions = DatasetVersions()
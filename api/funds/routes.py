@@ -1,11 +1,13 @@
 import logging
-from fastapi import APIRouter, Query, Depends, HTTPException
+from fastapi import APIRouter, Query, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
 from api.database.engine import get_session
+from api.common.pagination import fetch_page
+from api.common.serialization import json_response
 from api.database.dao import BaseDao
-from api.funds.schemas import FundForTable, FundFullInfo
+from api.funds.schemas import FundForTable, FundFullInfo, fund_for_table_serializer, fund_full_info_serializer
 
 # Простой логгер
 logger = logging.getLogger(__name__)
@@ -20,23 +22,22 @@ router = APIRouter(prefix="/funds", tags=["Funds"])
 
 @router.get("", response_model=List[FundForTable])
 async def get_page(
+        response: Response,
         page: int = Query(1, ge=1, description="Номер страницы, начиная с 1"),
-        per_page: int = Query(40, le=100, description="Количество записей на страницу, максимум 100"),
+        per_page: int = Query(40, ge=1, le=100, description="Количество записей на страницу, максимум 100"),
+        after: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor (keyset-пагинация вместо page)"),
         session: AsyncSession = Depends(get_session)
 ):
     """Получить список акций с пагинацией и сквозной нумерацией."""
     try:
-        funds = await BaseDao.get_page(session=session, instrument_type="fund", page=page, per_page=per_page)
-        start_index = (page - 1) * per_page + 1
-        result = [
-            FundForTable.model_validate({
-                **fund.__dict__,
-                "id": start_index + index
-            })
-            for index, fund in enumerate(funds)
-        ]
-        return result
-
+        funds, start_index = await fetch_page(
+            session=session, response=response, instrument_type="fund",
+            page=page, per_page=per_page, after=after, columns=fund_for_table_serializer.columns
+        )
+        return json_response(fund_for_table_serializer.dump(funds, start_id=start_index), response)
+
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         logger.error(f"Ошибка при получении акций: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Внутренняя ошибка сервера")
@@ -48,8 +49,13 @@ async def get_marketdata_fund(
         session: AsyncSession = Depends(get_session)):
     """Получить рыночные данные по тикеру"""
     try:
-        fund = await BaseDao.get_marketdata_by_secid(session=session, secid=secid.upper())
-        return fund
+        fund = await BaseDao.get_marketdata_by_secid(
+            session=session, secid=secid.upper(), columns=fund_full_info_serializer.columns
+        )
     except Exception as e:
         logger.error(f"Ошибка при получении акций: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Внутренняя ошибка сервера")
+
+    if fund is None:
+        raise HTTPException(status_code=404, detail="Инструмент не найден")
+    return json_response(fund_full_info_serializer.dump_one(fund))
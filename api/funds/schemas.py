@@ -1,6 +1,9 @@
 from pydantic import BaseModel
 from typing import Optional
 
+from api.common.serialization import RowSerializer
+
+
 class FundForTable(BaseModel):
     id: Optional[int] = None
     shortname: Optional[str] = None
@@ -28,4 +31,8 @@ class FundFullInfo(BaseModel):
     high_price: Optional[float] = None
     low_price: Optional[float] = None
 
-    model_config = {"from_attributes": True}
\ No newline at end of file
+    model_config = {"from_attributes": True}
+
+
+fund_for_table_serializer = RowSerializer(FundForTable)
+fund_full_info_serializer = RowSerializer(FundFullInfo)
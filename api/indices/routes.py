@@ -1,11 +1,13 @@
 import logging
-from fastapi import APIRouter, Query, Depends, HTTPException
+from fastapi import APIRouter, Query, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Literal
+from typing import List, Literal, Optional
 
 from api.database.engine import get_session
+from api.common.pagination import fetch_page
+from api.common.serialization import json_response
 from api.database.dao import BaseDao, IndexDAO
-from api.indices.schemas import IndexForTable, IndexFullInfo
+from api.indices.schemas import IndexForTable, IndexFullInfo, index_for_table_serializer, index_full_info_serializer
 
 # Простой логгер
 logger = logging.getLogger(__name__)
@@ -25,16 +27,8 @@ async def get_indices(
 ):
     """Получить топ индексов."""
     try:
-        indexes = await IndexDAO.get_top_indexes(session=session, type=type)
-        result = [
-            IndexForTable.model_validate({
-                **ins.__dict__,
-                "id": index + 1
-            })
-            for index, ins in enumerate(indexes)
-        ]
-
-        return result
+        indexes = await IndexDAO.get_top_indexes(session=session, type=type, columns=index_for_table_serializer.columns)
+        return json_response(index_for_table_serializer.dump(indexes, start_id=1))
 
     except Exception as e:
         logger.error(f"Ошибка при получении индексов: {str(e)}", exc_info=True)
@@ -43,24 +37,22 @@ async def get_indices(
 
 @router.get("", response_model=List[IndexForTable])
 async def get_page(
+        response: Response,
         page: int = Query(1, ge=1),
-        per_page: int = Query(40, le=100),
+        per_page: int = Query(40, ge=1, le=100),
+        after: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor (keyset-пагинация вместо page)"),
         session: AsyncSession = Depends(get_session)
 ):
     """Получить список облигаций с пагинацией и сквозной нумерацией."""
     try:
-        indexes = await BaseDao.get_page(session=session, instrument_type="index", page=page, per_page=per_page)
-        start_index = (page - 1) * per_page + 1
-        result = [
-            IndexForTable.model_validate({
-                **ins.__dict__,
-                "id": start_index + index
-            })
-            for index, ins in enumerate(indexes)
-        ]
-
-        return result
+        indexes, start_index = await fetch_page(
+            session=session, response=response, instrument_type="index",
+            page=page, per_page=per_page, after=after, columns=index_for_table_serializer.columns
+        )
+        return json_response(index_for_table_serializer.dump(indexes, start_id=start_index), response)
 
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         logger.error(f"Ошибка при получении индексов: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Внутренняя ошибка сервера")
@@ -72,8 +64,13 @@ async def get_marketdata_stock(secid: str,
                                ):
     """Получить рыночные данные по тикеру"""
     try:
-        index = await BaseDao.get_marketdata_by_secid(session=session, secid=secid.upper())
-        return index
+        index = await BaseDao.get_marketdata_by_secid(
+            session=session, secid=secid.upper(), columns=index_full_info_serializer.columns
+        )
     except Exception as e:
         logger.error(f"Ошибка при получении индексов: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Внутренняя ошибка сервера")
+
+    if index is None:
+        raise HTTPException(status_code=404, detail="Инструмент не найден")
+    return json_response(index_full_info_serializer.dump_one(index))
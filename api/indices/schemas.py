@@ -1,6 +1,9 @@
 from typing import Optional
 from pydantic import BaseModel, ConfigDict
 
+from api.common.serialization import RowSerializer
+
+
 class IndexForTable(BaseModel):
     id: Optional[int] = None
     secid: Optional[str] = None
@@ -33,4 +36,8 @@ class IndexFullInfo(BaseModel):
     annual_high: Optional[float] = None
     annual_low: Optional[float] = None
 
-    model_config = {"from_attributes": True}
\ No newline at end of file
+    model_config = {"from_attributes": True}
+
+
+index_for_table_serializer = RowSerializer(IndexForTable)
+index_full_info_serializer = RowSerializer(IndexFullInfo)
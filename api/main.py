@@ -1,11 +1,34 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from api.stocks.routes import router as stocks_router
 from api.bonds.routes import router as bonds_router
 from api.funds.routes import router as funds_router
 from api.indices.routes import router as indexes_router
 from api.common.routes import router as commons_router
+from api.common.caching import conditional_get
+from api.database.notifications import listener, MARKET_DATA_CHANNEL, DATASET_VERSION_CHANNEL
+from api.database.snapshot import market_snapshot
+from api.database.versions import dataset_versions, SNAPSHOT_DATASETS
+from api.settings import settings
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.SNAPSHOT_ENABLED:
+        dataset_versions.delegate(SNAPSHOT_DATASETS)
+        listener.subscribe(MARKET_DATA_CHANNEL, market_snapshot.request_refresh)
+        await market_snapshot.start()
+    listener.subscribe(DATASET_VERSION_CHANNEL, dataset_versions.request_refresh)
+    await dataset_versions.start()
+    await listener.start()
+    yield
+    await listener.stop()
+    await dataset_versions.stop()
+    await market_snapshot.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+app.middleware("http")(conditional_get)
 
 
 app.include_router(stocks_router)
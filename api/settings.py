@@ -13,6 +13,15 @@ class Settings(BaseSettings):
     SCHEDULER_INITIAL_LOAD: bool = True
     SCHEDULER_HEALTH_CHECK_INTERVAL: int = 60
 
+    # In-memory снимок market_data
+    SNAPSHOT_ENABLED: bool = True
+    SNAPSHOT_FULL_RELOAD_INTERVAL: int = 3600  # сек, страховочная полная перезагрузка
+    SNAPSHOT_RELOAD_OVERLAP: int = 300  # сек, перекрытие окна инкрементальной догрузки
+    LISTENER_RECONNECT_DELAY: int = 5
+
+    # HTTP-кеширование (ETag / Cache-Control)
+    HTTP_CACHE_MAX_AGE: int = 0
+
     @property
     def DATABASE_URL(self) -> str:
         return (
@@ -1,13 +1,18 @@
 # markets/stocks/router.py
 
 import logging
-from fastapi import APIRouter, Query, Depends, HTTPException
+from fastapi import APIRouter, Query, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
 from api.database.engine import get_session
+from api.common.pagination import fetch_page
+from api.common.serialization import json_response
 from api.database.dao import BaseDao, StockDAO
-from api.stocks.schemas import StockForTable, StockForTop, StockFullInfo
+from api.stocks.schemas import (
+    StockForTable, StockForTop, StockFullInfo,
+    stock_for_table_serializer, stock_for_top_serializer, stock_full_info_serializer,
+)
 
 # Простой логгер
 logger = logging.getLogger(__name__)
@@ -22,23 +27,22 @@ router = APIRouter(prefix="/stocks", tags=["Stocks"])
 
 @router.get("", response_model=List[StockForTable])
 async def get_page(
+        response: Response,
         page: int = Query(1, ge=1, description="Номер страницы, начиная с 1"),
-        per_page: int = Query(40, le=100, description="Количество записей на страницу, максимум 100"),
+        per_page: int = Query(40, ge=1, le=100, description="Количество записей на страницу, максимум 100"),
+        after: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor (keyset-пагинация вместо page)"),
         session: AsyncSession = Depends(get_session)
 ):
     """Получить список акций с пагинацией и сквозной нумерацией."""
     try:
-        stocks = await BaseDao.get_page(session=session, instrument_type="stock", page=page, per_page=per_page)
-        start_index = (page - 1) * per_page + 1
-        result = [
-            StockForTable.model_validate({
-                **stock.__dict__,
-                "id": start_index + index
-            })
-            for index, stock in enumerate(stocks)
-        ]
-        return result
+        stocks, start_index = await fetch_page(
+            session=session, response=response, instrument_type="stock",
+            page=page, per_page=per_page, after=after, columns=stock_for_table_serializer.columns
+        )
+        return json_response(stock_for_table_serializer.dump(stocks, start_id=start_index), response)
 
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         logger.error(f"Ошибка при получении акций: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Внутренняя ошибка сервера")
@@ -56,15 +60,10 @@ async def get_top_stocks(
 ):
     """Получить топ акций по выбранному типу."""
     try:
-        stocks = await StockDAO.get_top_stocks(session=session, type=type, limit=limit)
-        result = [
-            StockForTop.model_validate({
-                **stock.__dict__,
-                "id": index + 1
-            })
-            for index, stock in enumerate(stocks)
-        ]
-        return result
+        stocks = await StockDAO.get_top_stocks(
+            session=session, type=type, limit=limit, columns=stock_for_top_serializer.columns
+        )
+        return json_response(stock_for_top_serializer.dump(stocks, start_id=1))
 
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
@@ -78,8 +77,13 @@ async def get_marketdata_stock(secid: str,
                                ):
     """Получить рыночные данные по тикеру"""
     try:
-        stock = await BaseDao.get_marketdata_by_secid(session=session, secid=secid.upper())
-        return stock
+        stock = await BaseDao.get_marketdata_by_secid(
+            session=session, secid=secid.upper(), columns=stock_full_info_serializer.columns
+        )
     except Exception as e:
         logger.error(f"Ошибка при получении акций: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Внутренняя ошибка сервера")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Внутренняя ошибка сервера")
+
+    if stock is None:
+        raise HTTPException(status_code=404, detail="Инструмент не найден")
+    return json_response(stock_full_info_serializer.dump_one(stock))
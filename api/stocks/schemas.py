@@ -1,6 +1,8 @@
 from typing import Optional
 from pydantic import BaseModel
 
+from api.common.serialization import RowSerializer
+
 
 class StockForTable(BaseModel):
     id: Optional[int] = None
@@ -38,4 +40,9 @@ class StockFullInfo(BaseModel):
     low_price: Optional[float] = None
 
 
-    model_config = {"from_attributes": True}
\ No newline at end of file
+    model_config = {"from_attributes": True}
+
+
+stock_for_table_serializer = RowSerializer(StockForTable)
+stock_for_top_serializer = RowSerializer(StockForTop)
+stock_full_info_serializer = RowSerializer(StockFullInfo)
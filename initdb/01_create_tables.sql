@@ -1,3 +1,6 @@
+-- Схема для пустой базы. Изменения схемы и индексы для существующих баз —
+-- версионные миграции scheduler/database/migrations (применяются при старте шедулера).
+
 -- Таблица market_data
 CREATE TABLE IF NOT EXISTS market_data (
     id SERIAL PRIMARY KEY,
@@ -63,12 +66,73 @@ CREATE TABLE IF NOT EXISTS market_caps (
 );
 
 
+-- Таблица leaderboards: готовые топ-K списки, пересчитываются шедулером после каждого upsert
+CREATE TABLE IF NOT EXISTS leaderboards (
+    instrument_type VARCHAR(10) NOT NULL,
+    metric VARCHAR(20) NOT NULL,
+    bucket VARCHAR(20) NOT NULL DEFAULT '',
+    rank INTEGER NOT NULL,
+    market_data_id INTEGER NOT NULL,
+    computed_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc') NOT NULL,
+    PRIMARY KEY (instrument_type, metric, bucket, rank)
+);
+
+
+-- Таблица dataset_versions: версия каждого набора данных, увеличивается при каждом коммите шедулера
+CREATE TABLE IF NOT EXISTS dataset_versions (
+    dataset VARCHAR(32) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc') NOT NULL
+);
+
+
 CREATE TABLE IF NOT EXISTS coupons (
     secid VARCHAR(51) PRIMARY KEY,
     data JSONB NOT NULL,
-    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc') NOT NULL
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc') NOT NULL,
+    next_event_date DATE  -- ближайшее будущее событие на момент загрузки: после него кеш устаревает
 );
 
+-- Таблица bond_events: разобранные купоны, оферты, амортизации и погашения из bondization.json
+CREATE TABLE IF NOT EXISTS bond_events (
+    secid VARCHAR(51) NOT NULL,
+    seq INTEGER NOT NULL,  -- порядок события в ответе по бумаге (как после parse_bond_payments)
+    event_type VARCHAR(16) NOT NULL,  -- COUPON, OFFER, AMORTIZATION, MATURITY
+    event_date DATE NOT NULL,
+    face_value DOUBLE PRECISION,
+    payment_amount DOUBLE PRECISION,
+    payment_amount_rub DOUBLE PRECISION,
+    payment_percent DOUBLE PRECISION,
+    record_date DATE,
+    start_date DATE,
+    offer_start_date DATE,
+    offer_end_date DATE,
+    offer_price_percent DOUBLE PRECISION,
+    offer_status VARCHAR(64),
+    currency VARCHAR(10),
+    PRIMARY KEY (secid, seq)
+);
+
+CREATE INDEX IF NOT EXISTS ix_bond_events_secid_event_date ON bond_events (secid, event_date);
+-- Ведущая колонка event_date обслуживает диапазоны, хвост (secid, seq) — порядок keyset-пагинации календаря
+CREATE INDEX IF NOT EXISTS ix_bond_events_event_date ON bond_events (event_date, secid, seq);
+
+-- Таблица candles_backfill: чекпоинты догрузки истории свечей (диапазон дат по тикеру и курсор страниц ISS)
+CREATE TABLE IF NOT EXISTS candles_backfill (
+    ticker VARCHAR(20) NOT NULL,
+    date_from DATE NOT NULL,
+    date_till DATE NOT NULL,
+    boardid VARCHAR(20) NOT NULL,
+    instrument_type VARCHAR(10) NOT NULL,
+    next_start INTEGER NOT NULL DEFAULT 0,  -- с какой строки истории продолжить незавершённый диапазон
+    rows_loaded INTEGER NOT NULL DEFAULT 0,
+    done BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc') NOT NULL,
+    PRIMARY KEY (ticker, date_from)
+);
+
+CREATE INDEX IF NOT EXISTS ix_candles_backfill_pending ON candles_backfill (ticker) WHERE NOT done;
+
 CREATE TABLE companies (
     secid TEXT PRIMARY KEY,
     description TEXT,
@@ -16,4 +16,9 @@ WITH (
     NULL '',
     QUOTE '"',
     ESCAPE '"'
-);
\ No newline at end of file
+);
+
+-- Справочник компаний статичен и грузится только здесь
+INSERT INTO dataset_versions (dataset, version)
+VALUES ('companies', 1)
+ON CONFLICT (dataset) DO NOTHING;
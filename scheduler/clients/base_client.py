@@ -1,11 +1,16 @@
 # base_client.py
+import asyncio
 import httpx
-from typing import Optional
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 from tenacity import retry, stop_after_attempt, wait_exponential
+from scheduler.clients.rate_limiter import RateLimiter
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Размер кеша ответов, ниже которого истёкшие записи не вычищаются при вставке
+CACHE_SWEEP_MIN_SIZE = 64
+
 
 class BaseHTTPClient:
     def __init__(
@@ -18,20 +23,37 @@ class BaseHTTPClient:
         retry_attempts: int = 3,
         retry_min_wait: float = 2,
         retry_max_wait: float = 10,
+        rate_limiter: Optional[RateLimiter] = None,
+        http2: bool = False,
     ):
         self.base_url = base_url
+        self.rate_limiter = rate_limiter
         self.retry_config = {
             "stop": stop_after_attempt(retry_attempts),
             "wait": wait_exponential(multiplier=1, min=retry_min_wait, max=retry_max_wait)
         }
-        self.client = client or httpx.AsyncClient(
-            base_url=base_url,
-            timeout=timeout,
-            limits=httpx.Limits(
-                max_connections=max_connections,
-                max_keepalive_connections=max_keepalive
-            )
-        )
+        self.client = client or self._create_client(base_url, timeout, max_connections, max_keepalive, http2)
+
+        # Кеш ответов: ключ запроса → (момент истечения по часам цикла, ответ).
+        # Истёкшие записи удаляются при обращении и чисткой при вставке — как только размер
+        # кеша вырастет вдвое с прошлой чистки, — иначе каждый ключ (страницы /iss/history,
+        # bondization по бумагам) держал бы документ ISS до конца жизни процесса
+        self._cache: Dict[Tuple, Tuple[float, Any]] = {}
+        self._sweep_at = CACHE_SWEEP_MIN_SIZE
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_coalesced = 0
+
+    @staticmethod
+    def _create_client(base_url: str, timeout: float, max_connections: int, max_keepalive: int, http2: bool) -> httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        try:
+            return httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits, http2=http2)
+        except ImportError:
+            # HTTP/2 требует пакет h2 (httpx[http2]); без него работаем по HTTP/1.1
+            logger.warning(f"HTTP/2 недоступен для {base_url} — пакет h2 не установлен, используем HTTP/1.1")
+            return httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits)
 
     async def close(self):
         if self.client:
@@ -43,15 +65,80 @@ class BaseHTTPClient:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.close()
 
+    async def _get_text(self, endpoint: str, params: dict = None, cache_ttl: Optional[float] = None) -> str:
+        """
+        GET текстового ответа (XML ЦБ). cache_ttl (сек) включает для эндпоинта кеш ответа:
+        повторный запрос в пределах TTL не идёт в сеть. Одинаковые запросы, которые
+        выполняются одновременно, всегда схлопываются в один (single-flight).
+        Закешированный ответ общий для всех вызывающих — изменять его нельзя.
+        """
+        return await self._cached("text", self._fetch_text, endpoint, params, cache_ttl)
+
+    async def _get_bytes(self, endpoint: str, params: dict = None, cache_ttl: Optional[float] = None) -> bytes:
+        """То же без декодирования: тело ответа как есть, разбор — на стороне вызывающего."""
+        return await self._cached("bytes", self._fetch_bytes, endpoint, params, cache_ttl)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "coalesced": self.cache_coalesced,
+            "size": len(self._cache),
+        }
+
+    async def _cached(
+        self,
+        kind: str,
+        fetch: Callable[[str, Optional[dict]], Awaitable[Any]],
+        endpoint: str,
+        params: Optional[dict],
+        cache_ttl: Optional[float],
+    ) -> Any:
+        key = (kind, endpoint, tuple(sorted((params or {}).items())))
+        loop = asyncio.get_running_loop()
+
+        if cache_ttl:
+            cached = self._cache.get(key)
+            if cached is not None:
+                if cached[0] > loop.time():
+                    self.cache_hits += 1
+                    return cached[1]
+                del self._cache[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.cache_coalesced += 1
+        else:
+            self.cache_misses += 1
+            task = asyncio.ensure_future(fetch(endpoint, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # shield: отмена одного ожидающего не отменяет загрузку для остальных
+        value = await asyncio.shield(task)
+        if cache_ttl:
+            self._cache[key] = (loop.time() + cache_ttl, value)
+            if len(self._cache) >= self._sweep_at:
+                self._sweep_cache(loop.time())
+        return value
+
+    def _sweep_cache(self, now: float):
+        """Удаляет истёкшие ответы; следующая чистка — когда кеш снова вырастет вдвое (амортизированно O(1))."""
+        for key in [key for key, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[key]
+        self._sweep_at = max(CACHE_SWEEP_MIN_SIZE, 2 * len(self._cache))
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10)
     )
-    async def _get_json(self, endpoint: str, params: dict = None) -> dict:
+    async def _fetch_text(self, endpoint: str, params: dict = None) -> str:
+        if self.rate_limiter:
+            await self.rate_limiter.acquire()
         try:
             response = await self.client.get(endpoint, params=params)
             response.raise_for_status()
-            return response.json()
+            return response.text
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP ошибка при запросе {endpoint}: {e}")
             raise
@@ -63,14 +150,16 @@ class BaseHTTPClient:
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10)
     )
-    async def _get_text(self, endpoint: str, params: dict = None) -> str:
+    async def _fetch_bytes(self, endpoint: str, params: dict = None) -> bytes:
+        if self.rate_limiter:
+            await self.rate_limiter.acquire()
         try:
             response = await self.client.get(endpoint, params=params)
             response.raise_for_status()
-            return response.text
+            return response.content
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP ошибка при запросе {endpoint}: {e}")
             raise
         except httpx.RequestError as e:
             logger.error(f"Ошибка сети при запросе {endpoint}: {e}")
-            raise
\ No newline at end of file
+            raise
@@ -1,6 +1,7 @@
 import xml.etree.ElementTree as ET
 from typing import List, Dict
 from scheduler.clients.base_client import BaseHTTPClient
+from scheduler.settings import settings
 
 
 def parse_cbr_xml(xml_text: str) -> List[Dict]:
@@ -35,7 +36,8 @@ class CBRClient(BaseHTTPClient):
             base_url="https://cbr.ru",  # ✅ Без пробелов!
             client=client,
             max_connections=10,
-            max_keepalive=5
+            max_keepalive=5,
+            http2=settings.HTTP2_ENABLED
         )
 
     async def get_currency_today(self) -> List[Dict]:
@@ -0,0 +1,115 @@
+# scheduler/clients/iss.py
+import re
+from collections.abc import Mapping as MappingABC
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence
+
+import orjson
+
+
+class IssSection(NamedTuple):
+    """Секция ответа ISS (securities, marketdata, coupons, ...): имена колонок и строки значений."""
+    columns: List[str]
+    data: List[List[Any]]
+
+
+# Ответ ISS: имя секции → колонки и строки. Общий формат для всех процессоров —
+# и разобранный словарь, и IssDocument, который разбирается при первом обращении
+IssResponse = Mapping[str, IssSection]
+
+# Отсутствующая секция: процессоры читают .columns/.data без проверок на None
+EMPTY_SECTION = IssSection([], [])
+
+
+def parse_iss(content: bytes) -> Dict[str, IssSection]:
+    """
+    Тело ответа ISS (JSON в формате columns/data) → секции.
+    Разбор — один проход orjson по байтам ответа; строки не копируются и не перекладываются в словари.
+    Блоки без columns (например, служебные) пропускаются.
+    """
+    payload = orjson.loads(content)
+    return {
+        name: IssSection(block.get("columns") or [], block.get("data") or [])
+        for name, block in payload.items()
+        if isinstance(block, dict) and "columns" in block
+    }
+
+
+def iss_to_dict(sections: IssResponse) -> Dict[str, Dict[str, list]]:
+    """Секции обратно в JSON-совместимый вид ISS — для хранения в БД (кеш bondization)."""
+    return {
+        name: {"columns": section.columns, "data": section.data}
+        for name, section in sections.items()
+    }
+
+
+class IssDocument(MappingABC):
+    """
+    Ответ ISS как сырые байты, которые разбираются в секции при первом чтении.
+    Клиент отдаёт документ без разбора, поэтому JSON-декодирование происходит там, где
+    документ читают: в пуле CPU-стадий, а не в цикле событий шедулера. Передаётся в пул
+    тоже байтами — pickle тела ответа в разы дешевле, чем pickle разобранных секций.
+    Проверки наличия секций ('securities' in doc, has_sections) до разбора ищут ключи
+    прямо в байтах и разбирают документ, только если быстрый поиск не дал ответа.
+    """
+    __slots__ = ("content", "_sections")
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self._sections: Optional[Dict[str, IssSection]] = None
+
+    @property
+    def sections(self) -> Dict[str, IssSection]:
+        if self._sections is None:
+            self._sections = parse_iss(self.content)
+        return self._sections
+
+    @property
+    def parsed(self) -> bool:
+        return self._sections is not None
+
+    def __getitem__(self, name: str) -> IssSection:
+        return self.sections[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.sections)
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def __bool__(self) -> bool:
+        if self._sections is None and _ANY_SECTION.search(self.content):
+            return True
+        return bool(self.sections)
+
+    def __contains__(self, name: object) -> bool:
+        if self._sections is None and isinstance(name, str) and _section_key(name).search(self.content):
+            return True
+        return name in self.sections
+
+    def has_sections(self, names: Sequence[str]) -> bool:
+        """Все секции names есть в ответе и у каждой непустой список колонок."""
+        if self._sections is None and all(_section_columns(name).search(self.content) for name in names):
+            return True
+        return all(self.sections.get(name, EMPTY_SECTION).columns for name in names)
+
+    def __reduce__(self):
+        # В другой процесс уходят только байты: разбор там дешевле, чем pickle секций
+        return IssDocument, (self.content,)
+
+    def __repr__(self) -> str:
+        state = "parsed" if self._sections is not None else "raw"
+        return f"<IssDocument {len(self.content)} bytes, {state}>"
+
+
+# Быстрые проверки по байтам: ключи секций встречаются только на верхнем уровне документа,
+# строки данных ISS — массивы, поэтому "<имя>": перед { бывает только у секции
+_ANY_SECTION = re.compile(rb'"columns"\s*:')
+
+
+def _section_key(name: str) -> "re.Pattern[bytes]":
+    return re.compile(rb'"' + re.escape(name.encode()) + rb'"\s*:\s*\{')
+
+
+def _section_columns(name: str) -> "re.Pattern[bytes]":
+    # С iss.meta=off секция начинается с columns; непустой список — сразу строка с именем колонки
+    return re.compile(rb'"' + re.escape(name.encode()) + rb'"\s*:\s*\{\s*"columns"\s*:\s*\[\s*"')
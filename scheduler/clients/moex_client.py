@@ -1,5 +1,44 @@
+import asyncio
+from datetime import date
+import logging
+import httpx
+from tenacity import RetryError
 from scheduler.clients.base_client import BaseHTTPClient
-from typing import Dict
+from scheduler.clients.iss import EMPTY_SECTION, IssDocument, IssResponse
+from scheduler.clients.rate_limiter import RateLimiter
+from scheduler.settings import settings
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Общий лимит запросов к ISS на все экземпляры клиента и все задачи процесса
+moex_rate_limiter = RateLimiter(settings.MOEX_RATE_LIMIT)
+
+# Набор данных (stocks, funds, indexes, bonds) → секция → колонки, которые читают его процессоры.
+# Заполняется при импорте процессоров через declare_columns. Запрос строится по объединению
+# колонок всех процессоров набора, поэтому котировки и свечи по одному эндпоинту
+# запрашивают один и тот же документ и делят кеш ответов.
+ISS_COLUMNS: Dict[str, Dict[str, List[str]]] = {}
+
+
+def declare_columns(dataset: str, **sections: Iterable[str]) -> None:
+    """Объявляет колонки ISS, которые процессор читает из секций набора данных."""
+    declared = ISS_COLUMNS.setdefault(dataset, {})
+    for section, names in sections.items():
+        columns = declared.setdefault(section, [])
+        for name in names:
+            if name not in columns:
+                columns.append(name)
+
+
+def _rejection(error: BaseException) -> Optional[httpx.HTTPStatusError]:
+    # 4xx — ISS не принял параметры запроса; 5xx и сетевые ошибки к проекции отношения не имеют
+    if isinstance(error, RetryError):
+        error = error.last_attempt.exception()
+    if isinstance(error, httpx.HTTPStatusError) and 400 <= error.response.status_code < 500:
+        return error
+    return None
+
 
 class MOEXClient(BaseHTTPClient):
     def __init__(self, client=None):
@@ -7,51 +46,171 @@ class MOEXClient(BaseHTTPClient):
             base_url="https://iss.moex.com/iss",  # ← убраны пробелы!
             client=client,
             max_connections=20,
-            max_keepalive=10
+            max_keepalive=10,
+            rate_limiter=moex_rate_limiter,
+            http2=settings.HTTP2_ENABLED
         )
+        # Наборы данных, для которых ISS отклонил проекцию: дальше запрашиваются целиком
+        self._full_datasets: Set[str] = set()
+
+    async def _get_iss(self, endpoint: str, params: dict = None, cache_ttl: Optional[float] = None) -> IssDocument:
+        """
+        GET документа ISS: секции {section: IssSection(columns, data)} поверх байтов ответа.
+        Разбор orjson откладывается до первого чтения (IssDocument) — тяжёлые ответы
+        разбираются уже в пуле CPU-стадий, а не в цикле событий.
+        В кеше лежит сам документ — как и раньше, изменять его нельзя.
+        """
+        return await self._cached("iss", self._fetch_iss, endpoint, params, cache_ttl)
+
+    async def _fetch_iss(self, endpoint: str, params: dict = None) -> IssDocument:
+        return IssDocument(await self._fetch_bytes(endpoint, params))
+
+    @staticmethod
+    def _projection_params(columns: Dict[str, Sequence[str]]) -> Dict[str, str]:
+        """Секция → нужные колонки в параметры ISS: iss.only и <section>.columns."""
+        params = {"iss.meta": "off", "iss.only": ",".join(columns)}
+        for section, names in columns.items():
+            params[f"{section}.columns"] = ",".join(names)
+        return params
+
+    @staticmethod
+    def _projection_accepted(data: IssDocument, columns: Dict[str, Sequence[str]]) -> bool:
+        """
+        ISS ответил на проекцию: все запрошенные секции на месте и у каждой есть колонки.
+        Проверка идёт по байтам ответа, документ при этом не разбирается.
+        """
+        return data.has_sections(list(columns))
 
-    async def _fetch_securities(self, engine: str, market: str, board: str = None):
+    async def _fetch_securities(self, engine: str, market: str, board: str = None, dataset: str = None) -> IssResponse:
+        """
+        dataset — имя набора из ISS_COLUMNS: запрашиваются только объявленные процессорами
+        секции и колонки. Если ISS отклонил проекцию (4xx или ответ без нужных секций),
+        документ запрашивается целиком — и для этого набора так и дальше, до перезапуска.
+        """
         if board:
             path = f"/engines/{engine}/markets/{market}/boards/{board}/securities.json"
         else:
             path = f"/engines/{engine}/markets/{market}/securities.json"
-        return await self._get_json(path)
 
-    # === НОВЫЙ МЕТОД ===
-    async def get_marketdata_for_candles(self) -> Dict:
+        columns = ISS_COLUMNS.get(dataset) if dataset not in self._full_datasets else None
+        if columns:
+            try:
+                # Тот же документ забирают и задачи котировок, и задачи свечей — кешируем на короткий TTL
+                data = await self._get_iss(
+                    path, params=self._projection_params(columns), cache_ttl=settings.MOEX_CACHE_TTL
+                )
+                if self._projection_accepted(data, columns):
+                    return data
+                reason = "в ответе нет запрошенных секций"
+            except Exception as e:
+                rejection = _rejection(e)
+                if rejection is None:
+                    raise
+                reason = f"HTTP {rejection.response.status_code}"
+            logger.warning(f"ISS отклонил проекцию колонок для {dataset} ({reason}) — запрашиваем документ целиком")
+            self._full_datasets.add(dataset)
+
+        return await self._get_iss(path, cache_ttl=settings.MOEX_CACHE_TTL)
+
+    async def get_stocks(self) -> IssResponse:
+        """Акции на основном рынке (TQBR)"""
+        return await self._fetch_securities("stock", "shares", "TQBR", dataset="stocks")
+
+    async def get_bond_boards(self) -> List[str]:
         """
-        Получает только marketdata по акциям с TQBR: SECID, LAST, VOLTODAY.
-        Используется для ежедневного формирования свечей.
+        Режимы торгов рынка облигаций, на которых сейчас идут торги (TQOB, TQCB, TQIR, ...).
+        Если ISS не ответил — список из настроек MOEX_BOND_BOARDS.
         """
-        path = (
-            "/engines/stock/markets/shares/boards/TQBR/securities.json"
-            "?iss.only=marketdata"
-            "&marketdata.columns=SECID,LAST,VOLTODAY"
-        )
-        return await self._get_json(path)
+        try:
+            data = await self._get_iss(
+                "/engines/stock/markets/bonds/boards.json",
+                params={"iss.meta": "off", "iss.only": "boards", "boards.columns": "boardid,is_traded"},
+                cache_ttl=settings.MOEX_BOND_BOARDS_TTL,
+            )
+            block = data.get("boards", EMPTY_SECTION)
+            idx = {col: i for i, col in enumerate(block.columns)}
+            boards = [row[idx["boardid"]] for row in block.data if row[idx["is_traded"]]]
+            if boards:
+                return boards
+            logger.warning("ISS вернул пустой список режимов облигаций — используем MOEX_BOND_BOARDS")
+        except Exception as e:
+            logger.warning(f"Не удалось получить режимы облигаций ({e}) — используем MOEX_BOND_BOARDS")
+        return list(settings.MOEX_BOND_BOARDS)
 
-    # === остальные методы без изменений ===
-    async def get_stocks(self) -> Dict:
-        """Акции на основном рынке (TQBR)"""
-        return await self._fetch_securities("stock", "shares", "TQBR")
+    async def get_bonds_board(self, board: str) -> IssResponse:
+        """Облигации одного режима торгов"""
+        return await self._fetch_securities("stock", "bonds", board, dataset="bonds")
 
-    async def get_bonds(self) -> Dict:
-        """Облигации"""
-        return await self._fetch_securities("stock", "bonds")
+    async def iter_bonds_by_board(self) -> AsyncIterator[Tuple[str, IssResponse]]:
+        """
+        Рынок облигаций по режимам торгов: все режимы запрашиваются параллельно,
+        пары (board, данные) отдаются по мере готовности — обработка первого режима
+        идёт, пока остальные ещё качаются. Режим, который не удалось получить,
+        пропускается с предупреждением.
+        """
+        async def fetch(board: str) -> Tuple[str, Optional[IssResponse]]:
+            try:
+                return board, await self.get_bonds_board(board)
+            except Exception as e:
+                logger.warning(f"Не удалось получить облигации режима {board}: {e}")
+                return board, None
 
-    async def get_indexes(self) -> Dict:
+        tasks = [asyncio.ensure_future(fetch(board)) for board in await self.get_bond_boards()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                board, data = await next_done
+                if data is not None:
+                    yield board, data
+        finally:
+            # Потребитель мог прервать обход — не оставляем висящих запросов
+            for task in tasks:
+                task.cancel()
+
+    async def get_indexes(self) -> IssResponse:
         """Индексы Московской биржи"""
-        return await self._fetch_securities("stock", "index")
+        return await self._fetch_securities("stock", "index", dataset="indexes")
 
-    async def get_tqtf_funds(self) -> Dict:
+    async def get_tqtf_funds(self) -> IssResponse:
         """ETF на площадке TQTF"""
-        return await self._fetch_securities("stock", "shares", "TQTF")
+        return await self._fetch_securities("stock", "shares", "TQTF", dataset="funds")
 
-    async def get_tqif_funds(self) -> Dict:
+    async def get_tqif_funds(self) -> IssResponse:
         """Интервалы или фонды на TQIF (если актуально)"""
-        return await self._fetch_securities("stock", "shares", "TQIF")
+        return await self._fetch_securities("stock", "shares", "TQIF", dataset="funds")
+
+    async def get_bondization(self, secid: str) -> IssResponse:
+        """Купоны, оферты и амортизации по облигации"""
+        path = f"/securities/{secid}/bondization.json"
+        return await self._get_iss(path, params={"iss.meta": "off", "limit": "unlimited"})
 
-    async def get_capitalization(self) -> Dict:
+    async def get_capitalization(self) -> IssResponse:
         """Капитализация акций на Московской бирже"""
         path = "/statistics/engines/stock/capitalization.json"
-        return await self._get_json(path)
\ No newline at end of file
+        return await self._get_iss(path)
+
+    async def get_history(
+            self,
+            engine: str,
+            market: str,
+            board: str,
+            secid: str,
+            date_from: date,
+            date_till: date,
+            columns: Sequence[str],
+            start: int = 0,
+    ) -> IssResponse:
+        """
+        Страница дневной истории бумаги на режиме торгов (до 100 торговых дней).
+        Секция history — только нужные колонки; history.cursor — INDEX, TOTAL, PAGESIZE
+        для перехода к следующей странице (start).
+        """
+        path = f"/history/engines/{engine}/markets/{market}/boards/{board}/securities/{secid}.json"
+        params = {
+            "iss.meta": "off",
+            "iss.only": "history,history.cursor",
+            "history.columns": ",".join(columns),
+            "from": date_from.isoformat(),
+            "till": date_till.isoformat(),
+            "start": str(start),
+        }
+        return await self._get_iss(path, params=params)
@@ -0,0 +1,27 @@
+# rate_limiter.py
+import asyncio
+
+
+class RateLimiter:
+    """
+    Ограничитель частоты запросов: не больше rate запросов в секунду
+    суммарно для всех корутин, которые делят один экземпляр.
+    Слоты выдаются равномерно, без всплесков в начале каждой секунды.
+    """
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self._interval:
+            return
+
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -0,0 +1,58 @@
+# shared.py
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from scheduler.clients.cbr_client import CBRClient
+from scheduler.clients.moex_client import MOEXClient
+
+logger = logging.getLogger(__name__)
+
+
+class SharedClients:
+    """
+    Долгоживущие HTTP-клиенты шедулера: один MOEXClient и один CBRClient на процесс.
+    Все задачи работают через общий пул keep-alive соединений, поэтому DNS, TCP и TLS
+    до iss.moex.com и cbr.ru не оплачиваются заново в каждом запуске.
+    Закрываются один раз — в shutdown() шедулера.
+    """
+
+    def __init__(self):
+        self._moex: Optional[MOEXClient] = None
+        self._cbr: Optional[CBRClient] = None
+
+    @property
+    def moex(self) -> MOEXClient:
+        if self._moex is None or self._moex.client.is_closed:
+            self._moex = MOEXClient()
+        return self._moex
+
+    @property
+    def cbr(self) -> CBRClient:
+        if self._cbr is None or self._cbr.client.is_closed:
+            self._cbr = CBRClient()
+        return self._cbr
+
+    async def close(self):
+        for name, client in (("MOEX", self._moex), ("CBR", self._cbr)):
+            if client is not None:
+                logger.info(f"📊 Кеш ответов {name}: {client.cache_stats()}")
+                await client.close()
+        self._moex = None
+        self._cbr = None
+        logger.info("✅ HTTP-клиенты закрыты")
+
+
+shared_clients = SharedClients()
+
+
+@asynccontextmanager
+async def moex_client() -> AsyncIterator[MOEXClient]:
+    """Общий MOEXClient для задачи; в отличие от `async with MOEXClient()` не закрывает пул на выходе."""
+    yield shared_clients.moex
+
+
+@asynccontextmanager
+async def cbr_client() -> AsyncIterator[CBRClient]:
+    """Общий CBRClient для задачи."""
+    yield shared_clients.cbr
@@ -0,0 +1,250 @@
+# scheduler/database/bulk.py
+import logging
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Date, Float, Integer, Numeric, String, Table, bindparam, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scheduler.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Сколько значений (строк × колонок) отправлять одним запросом. Число параметров
+# у unnest равно числу колонок и от размера батча не зависит, поэтому предел
+# задаёт только объём одного сообщения и длительность транзакции.
+MAX_BATCH_VALUES = 200_000
+
+# Колонки, которые заполняет сама БД: в INSERT не передаются
+SERVER_COLUMNS = ("id", "created_at", "updated_at")
+
+_dialect = postgresql.dialect()
+
+
+def _unbounded(type_):
+    """
+    Тип элемента массива unnest без длины и точности: VARCHAR(36) → VARCHAR, NUMERIC(10, 6) → NUMERIC.
+    Ограничения колонки проверяет присваивание при INSERT, как у обычного INSERT: явный CAST
+    к VARCHAR(n)[] (и в тексте запроса, и в bind-cast asyncpg) молча обрезал бы длинные значения,
+    а на колонках ключа конфликта склеивал бы разные ключи в одну строку.
+    """
+    type_ = type_.copy()
+    for attr in ("length", "precision", "scale"):
+        if getattr(type_, attr, None) is not None:
+            setattr(type_, attr, None)
+    return type_
+
+
+def _to_integer(value):
+    # Как присваивание numeric → integer в Postgres: округление половины от нуля, а не отбрасывание
+    # дробной части (asyncpg молча делает int(10.9) == 10). Объём индексов приходит из ISS float'ом.
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        value = Decimal(value)
+    elif not isinstance(value, Decimal):
+        value = Decimal(str(value).strip())
+    return int(value.to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def _to_float(value):
+    return float(value) if isinstance(value, (str, Decimal)) else value
+
+
+def _to_numeric(value):
+    return Decimal(value.strip()) if isinstance(value, str) else value
+
+
+def _to_string(value):
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _converter(type_) -> Optional[Callable[[Any], Any]]:
+    """
+    Приведение значения к Python-типу колонки до отправки в asyncpg. Бинарный протокол (и COPY,
+    и массивы unnest) не делает преобразований, которые сделал бы текстовый INSERT: строка в
+    BIGINT не пролезает, float в BIGINT обрезается. None — значение передаётся как есть.
+    """
+    if isinstance(type_, Integer):
+        return _to_integer
+    if isinstance(type_, Float):
+        return _to_float
+    if isinstance(type_, Numeric):
+        return _to_numeric
+    if isinstance(type_, String):
+        return _to_string
+    if isinstance(type_, Date):
+        return _to_date
+    return None
+
+
+class BulkWriter:
+    """
+    Массовая запись в таблицу через INSERT ... SELECT * FROM unnest($1::type[], $2::type[], ...).
+    Каждая колонка — один параметр-массив, поэтому:
+      * текст запроса один и тот же при любом числе строк — asyncpg кеширует prepared statement;
+      * лимит Postgres в 32767 параметров не достижим, сколько бы колонок ни добавилось;
+      * батч любого размера — один round trip.
+    Набор колонок фиксирован (все колонки таблицы, кроме серверных). Отсутствующие в строке
+    ключи передаются как NULL — при coalesce=True они не затирают значения в БД.
+    Строки, в которых после COALESCE ничего не меняется, не перезаписываются (IS DISTINCT FROM):
+    нет мёртвых версий, WAL и нового updated_at. write() возвращает число реально записанных строк.
+
+    Большие объёмы (вся вселенная облигаций, догрузка истории свечей) идут через бинарный COPY
+    во временную staging-таблицу и один INSERT ... SELECT с тем же ON CONFLICT.
+    Если COPY не удался, запись откатывается до savepoint и повторяется через unnest;
+    такие откаты пишутся в лог с ошибкой и считаются в copy_fallbacks.
+    Значения приводятся к типам колонок один раз до записи — одинаково для COPY и unnest.
+    """
+
+    def __init__(
+            self,
+            table: Table,
+            conflict: Optional[Sequence[str]] = None,
+            on_conflict: str = "error",
+            touch_updated_at: bool = False,
+            exclude: Iterable[str] = SERVER_COLUMNS,
+    ):
+        """
+        conflict — колонки уникального ключа для ON CONFLICT.
+        on_conflict — "error" (без ON CONFLICT), "nothing" (DO NOTHING) или "coalesce"
+        (DO UPDATE SET col = COALESCE(EXCLUDED.col, table.col) — только если что-то изменилось).
+        touch_updated_at — проставлять updated_at при обновлении (ON CONFLICT не вызывает onupdate).
+        """
+        if on_conflict not in ("error", "nothing", "coalesce"):
+            raise ValueError(f"Неизвестная стратегия ON CONFLICT: {on_conflict}")
+
+        excluded = set(exclude)
+        self.table = table
+        self.columns = [column for column in table.columns if column.name not in excluded]
+        self.names = [column.name for column in self.columns]
+        self.converters = [
+            (i, converter)
+            for i, column in enumerate(self.columns)
+            if (converter := _converter(column.type)) is not None
+        ]
+        self.copies = 0
+        self.copy_fallbacks = 0
+        self.batch_size = max(1, MAX_BATCH_VALUES // len(self.columns))
+
+        quote = _dialect.identifier_preparer.quote
+        column_list = ", ".join(quote(name) for name in self.names)
+        conflict_clause = self._conflict_clause(conflict or (), on_conflict, touch_updated_at)
+        arrays = ", ".join(
+            f"CAST(:p{i} AS {_unbounded(column.type).compile(dialect=_dialect)}[])"
+            for i, column in enumerate(self.columns)
+        )
+
+        self.statement = text(
+            f"INSERT INTO {quote(table.name)} ({column_list}) SELECT * FROM unnest({arrays}){conflict_clause} RETURNING 1"
+        ).bindparams(*(
+            bindparam(f"p{i}", type_=postgresql.ARRAY(_unbounded(column.type)))
+            for i, column in enumerate(self.columns)
+        ))
+
+        # Staging: временная таблица с теми же колонками, живёт до конца транзакции
+        self.stage_name = f"_stage_{table.name}"
+        self.stage_ddl = (
+            f"CREATE TEMP TABLE IF NOT EXISTS {quote(self.stage_name)} ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {quote(table.name)} WITH NO DATA"
+        )
+        self.stage_merge = (
+            f"INSERT INTO {quote(table.name)} ({column_list}) "
+            f"SELECT {column_list} FROM {quote(self.stage_name)}{conflict_clause} RETURNING 1"
+        )
+
+    def _conflict_clause(self, conflict: Sequence[str], on_conflict: str, touch_updated_at: bool) -> str:
+        quote = _dialect.identifier_preparer.quote
+        table_name = quote(self.table.name)
+        sql = ""
+
+        if on_conflict == "nothing":
+            sql += f" ON CONFLICT ({', '.join(quote(name) for name in conflict)}) DO NOTHING"
+        elif on_conflict == "coalesce":
+            updated = [name for name in self.names if name not in conflict]
+            values = [f"COALESCE(EXCLUDED.{quote(name)}, {table_name}.{quote(name)})" for name in updated]
+            assignments = [f"{quote(name)} = {value}" for name, value in zip(updated, values)]
+            if touch_updated_at:
+                assignments.append(f"{quote('updated_at')} = timezone('utc', now())")
+            current = ", ".join(f"{table_name}.{quote(name)}" for name in updated)
+            sql += (
+                f" ON CONFLICT ({', '.join(quote(name) for name in conflict)}) DO UPDATE SET {', '.join(assignments)}"
+                # Неизменившиеся строки не трогаем: ни новой версии строки, ни нового updated_at
+                f" WHERE ROW({current}) IS DISTINCT FROM ROW({', '.join(values)})"
+            )
+
+        return sql
+
+    def _records(self, rows: Sequence[Dict]) -> List[Tuple]:
+        """Строки-словари → кортежи в порядке names со значениями, приведёнными к типам колонок."""
+        names = self.names
+        converters = self.converters
+        records = []
+        for row in rows:
+            values = [row.get(name) for name in names]
+            for i, converter in converters:
+                if values[i] is not None:
+                    values[i] = converter(values[i])
+            records.append(tuple(values))
+        return records
+
+    def _params(self, records: Sequence[Tuple]) -> Dict[str, List]:
+        # Транспонирование строк в колонки: один список значений на параметр
+        return {f"p{i}": list(values) for i, values in enumerate(zip(*records))}
+
+    async def write(self, db: AsyncSession, rows: Sequence[Dict]) -> int:
+        """
+        Записывает строки (COPY для больших объёмов, иначе unnest).
+        Возвращает число вставленных или изменённых строк — пропущенные дубликаты и
+        неизменившиеся строки не считаются.
+        """
+        # Ошибка приведения — ошибка данных: поднимается сразу, а не как откат COPY на unnest
+        records = self._records(rows)
+        if settings.BULK_COPY_ENABLED and len(records) >= settings.BULK_COPY_MIN_ROWS:
+            try:
+                # savepoint: ошибка COPY не должна ронять внешнюю транзакцию
+                async with db.begin_nested():
+                    changed = await self.copy(db, records)
+                self.copies += 1
+                return changed
+            except Exception as e:
+                self.copy_fallbacks += 1
+                logger.error(
+                    f"{self.table.name}: COPY {len(records)} строк не удался ({e.__class__.__name__}: {e}) — "
+                    f"пишем через unnest (откатов на unnest: {self.copy_fallbacks} из {self.copies + self.copy_fallbacks})"
+                )
+
+        return await self.insert(db, records)
+
+    async def copy(self, db: AsyncSession, records: Sequence[Tuple]) -> int:
+        """Бинарный COPY во временную таблицу и один set-based INSERT ... SELECT в целевую."""
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        pg = raw.driver_connection
+
+        await pg.execute(self.stage_ddl)
+        # Таблица могла остаться от предыдущей записи в этой же транзакции
+        await pg.execute(f"TRUNCATE {self.stage_name}")
+        await pg.copy_records_to_table(self.stage_name, records=records, columns=self.names)
+        changed = len(await pg.fetch(self.stage_merge))
+        logger.debug(f"{self.table.name}: COPY {len(records)} строк, записано {changed}")
+        return changed
+
+    async def insert(self, db: AsyncSession, records: Sequence[Tuple]) -> int:
+        """INSERT ... unnest батчами по batch_size."""
+        changed = 0
+        for i in range(0, len(records), self.batch_size):
+            batch = records[i:i + self.batch_size]
+            result = await db.execute(self.statement, self._params(batch))
+            written = len(result.all())
+            changed += written
+            logger.debug(f"{self.table.name}: батч {i // self.batch_size + 1} — {len(batch)} строк, записано {written}")
+        return changed
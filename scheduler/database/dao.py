@@ -1,63 +1,103 @@
 import time
 import logging
-from typing import List, Dict
+from typing import Any, List, Dict, Iterable, Optional, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy import func
-from scheduler.database.models import MarketData, MarketCap, Candle
-from datetime import datetime
+from sqlalchemy import func, text, select, or_, delete
+from scheduler.database.models import MarketData, MarketCap, Candle, CandleBackfill, DatasetVersion, Coupons, BondEvents
+from scheduler.database.leaderboards import rebuild_leaderboards
+from scheduler.database.bulk import BulkWriter
+from datetime import date, datetime, timedelta
 
 logger = logging.getLogger(__name__)
 BATCH_SIZE = 1000
 
+# Массовая запись: COPY через staging для больших объёмов, иначе unnest — один текст запроса на таблицу
+market_data_writer = BulkWriter(
+    MarketData.__table__, conflict=("secid", "boardid"), on_conflict="coalesce", touch_updated_at=True
+)
+candles_writer = BulkWriter(Candle.__table__, conflict=("ticker", "date"), on_conflict="nothing")
+bond_events_writer = BulkWriter(BondEvents.__table__)
 
-async def upsert_market_data(db: AsyncSession, data: List[Dict]):
+# Тип инструмента → дата последнего пересчёта топов. Фильтры топов зависят от current_date,
+# поэтому раз в день они пересчитываются даже без изменившихся строк
+_leaderboards_built_on: Dict[str, date] = {}
+
+# Каналы LISTEN/NOTIFY, по которым API узнаёт о новых данных
+MARKET_DATA_CHANNEL = "market_data_changed"
+DATASET_VERSION_CHANNEL = "dataset_version_changed"
+
+
+async def notify_market_data_changed(db: AsyncSession, instrument_types: Iterable[str]):
+    """
+    Ставит в очередь транзакции уведомление для API.
+    Postgres доставляет NOTIFY только после COMMIT, поэтому подписчики
+    никогда не увидят сигнал раньше самих данных.
+    """
+    payload = ",".join(sorted(set(instrument_types)))
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": MARKET_DATA_CHANNEL, "payload": payload}
+    )
+
+
+async def bump_dataset_version(db: AsyncSession, dataset: str):
+    """
+    Увеличивает версию набора данных (stocks, bonds, candles, ...) в той же транзакции,
+    что и запись самих данных. API строит по версии ETag и отвечает 304 без запроса к БД.
+    """
+    stmt = insert(DatasetVersion).values(
+        dataset=dataset,
+        version=1,
+        updated_at=func.timezone("utc", func.now())
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["dataset"],
+        set_={
+            "version": DatasetVersion.version + 1,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    await db.execute(stmt)
+    await db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": DATASET_VERSION_CHANNEL, "payload": dataset}
+    )
+
+
+async def upsert_market_data(db: AsyncSession, data: List[Dict], dataset: Optional[str] = None) -> int:
     """
     Массовый upsert с замером времени выполнения.
     Поля со значением None НЕ перезаписывают существующие значения в БД —
     сохраняется старое значение (защита от затирания данными NULL).
+    Строки без изменений не перезаписываются; если не изменилось ничего, топы,
+    уведомление API и версия набора не трогаются.
+    dataset — имя набора данных, версия которого увеличивается при коммите.
+    Возвращает число вставленных или изменённых строк.
     """
     if not data:
         logger.info("Нет данных для upsert — пропускаем.")
-        return
+        return 0
 
     total = len(data)
-    logger.info(f"Начинаем upsert {total} записей (батч по {BATCH_SIZE})...")
+    logger.info(f"Начинаем upsert {total} записей (батч по {market_data_writer.batch_size})...")
 
     start_time = time.time()
 
     try:
-        for i in range(0, total, BATCH_SIZE):
-            batch_start = time.time()
-            batch = data[i:i + BATCH_SIZE]
-
-            stmt = insert(MarketData.__table__).values(batch)
-            excluded = stmt.excluded
-            table = MarketData.__table__
-
-            # Обновляем только если новое значение НЕ NULL
-            update_dict = {}
-            for col in batch[0].keys():
-                if col in ('secid', 'boardid'):
-                    continue
-                # COALESCE(new_value, old_value): если new IS NULL → оставить old
-                update_dict[col] = func.coalesce(excluded[col], table.c[col])
-
-            stmt = stmt.on_conflict_do_update(
-                index_elements=['secid', 'boardid'],
-                set_=update_dict
-            )
-
-            await db.execute(stmt)
-            await db.flush()
-
-            batch_duration = time.time() - batch_start
-            logger.debug(f"Батч {i // BATCH_SIZE + 1}: {len(batch)} записей → {batch_duration:.3f} сек")
+        # COALESCE(new_value, old_value): если new IS NULL → оставить old;
+        # updated_at проставляется явно — по нему API догружает изменения инкрементально
+        changed = await market_data_writer.write(db, data)
 
+        instrument_types = {row["instrument_type"] for row in data}
+        published = await _publish_market_data(db, instrument_types, changed, dataset)
         await db.commit()
+        if published:
+            _leaderboards_built_on.update(dict.fromkeys(instrument_types, date.today()))
 
         total_duration = time.time() - start_time
-        logger.info(f"Успешно upserted {total} записей за {total_duration:.3f} сек")
+        logger.info(f"Успешно upserted {total} записей за {total_duration:.3f} сек (изменилось {changed})")
+        return changed
 
     except Exception as e:
         await db.rollback()
@@ -66,7 +106,57 @@ async def upsert_market_data(db: AsyncSession, data: List[Dict]):
         raise
 
 
-async def upsert_market_cap_data(db: AsyncSession, data: List[Dict]):
+async def _publish_market_data(
+        db: AsyncSession, instrument_types: Iterable[str], changed: int, dataset: Optional[str]
+) -> bool:
+    """
+    Пересчёт топов, уведомление API и версия набора — если строки изменились
+    или топы ещё не пересчитывались сегодня. Без коммита; True, если что-то сделано.
+    """
+    today = date.today()
+    new_day = any(_leaderboards_built_on.get(t) != today for t in instrument_types)
+    if not (changed or new_day):
+        return False
+    await rebuild_leaderboards(db, instrument_types)
+    await notify_market_data_changed(db, instrument_types)
+    if dataset:
+        await bump_dataset_version(db, dataset)
+    return True
+
+
+async def write_market_data(db: AsyncSession, data: List[Dict]) -> int:
+    """
+    Пачка строк market_data с той же семантикой, что у upsert_market_data, но без пересчёта
+    топов и уведомлений: так пишет конвейер, который коммитит набор по частям.
+    После последней пачки — publish_market_data. Возвращает число изменённых строк.
+    """
+    if not data:
+        return 0
+
+    start_time = time.time()
+    try:
+        changed = await market_data_writer.write(db, data)
+        await db.commit()
+        logger.info(f"Записано {len(data)} строк за {time.time() - start_time:.3f} сек (изменилось {changed})")
+        return changed
+
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Ошибка при записи пачки market_data: {e}", exc_info=True)
+        raise
+
+
+async def publish_market_data(
+        db: AsyncSession, instrument_types: Iterable[str], changed: int, dataset: Optional[str] = None
+):
+    """Завершение записи по пачкам: топы, NOTIFY и версия набора — один раз на весь набор."""
+    instrument_types = set(instrument_types)
+    if await _publish_market_data(db, instrument_types, changed, dataset):
+        await db.commit()
+        _leaderboards_built_on.update(dict.fromkeys(instrument_types, date.today()))
+
+
+async def upsert_market_cap_data(db: AsyncSession, data: List[Dict], dataset: Optional[str] = None):
     """
     Upsert 1–2 записей рыночной капитализации.
     Ожидает список вида:
@@ -99,6 +189,8 @@ async def upsert_market_cap_data(db: AsyncSession, data: List[Dict]):
             set_={"cap": stmt.excluded.cap}
         )
         await db.execute(stmt)
+        if dataset:
+            await bump_dataset_version(db, dataset)
         await db.commit()
 
         duration = time.time() - start_time
@@ -111,7 +203,7 @@ async def upsert_market_cap_data(db: AsyncSession, data: List[Dict]):
         raise
 
 
-async def insert_daily_candles(db: AsyncSession, candles: List[Dict]) -> None:
+async def insert_daily_candles(db: AsyncSession, candles: List[Dict], dataset: Optional[str] = None) -> int:
     """
     Вставляет дневные свечи. Игнорирует дубликаты по (ticker, date).
 
@@ -123,34 +215,250 @@ async def insert_daily_candles(db: AsyncSession, candles: List[Dict]) -> None:
     """
     if not candles:
         logger.info("📭 Нет свечей для вставки — пропускаем.")
-        return
+        return 0
 
     total = len(candles)
-    logger.info(f"📥 Начинаем вставку {total} свечей (батч по {BATCH_SIZE})...")
+    logger.info(f"📥 Начинаем вставку {total} свечей (батч по {candles_writer.batch_size})...")
 
     start_time = time.time()
 
     try:
-        for i in range(0, total, BATCH_SIZE):
-            batch = candles[i:i + BATCH_SIZE]
-            batch_start = time.time()
+        # Дубликаты по составному первичному ключу (ticker, date) игнорируются
+        inserted = await candles_writer.write(db, candles)
 
-            stmt = insert(Candle).values(batch)
-            stmt = stmt.on_conflict_do_nothing(
-                index_elements=["ticker", "date"]  # ← составной первичный ключ
+        if dataset and inserted:
+            await bump_dataset_version(db, dataset)
+        await db.commit()
+        total_duration = time.time() - start_time
+        logger.info(f"✅ Вставлено {inserted} из {total} свечей за {total_duration:.3f} сек (дубликаты проигнорированы)")
+        return inserted
+
+    except Exception as e:
+        await db.rollback()
+        total_duration = time.time() - start_time
+        logger.error(f"❌ Ошибка при вставке свечей: {e} (время до ошибки: {total_duration:.3f} сек)", exc_info=True)
+        raise
+
+
+async def get_candles_last_date(db: AsyncSession) -> Optional[date]:
+    """Последняя дата в candles — по ней шедулер понимает, что пропустил ночные задачи."""
+    result = await db.execute(select(func.max(Candle.date)))
+    return result.scalar()
+
+
+async def get_backfill_status(db: AsyncSession) -> Tuple[int, int]:
+    """
+    (всего диапазонов, незавершённых) в чекпоинтах догрузки истории: 0 всего — догрузка
+    ещё не запускалась, незавершённые — процесс остановили посреди прохода.
+    """
+    result = await db.execute(
+        select(func.count(), func.count().filter(CandleBackfill.done.is_(False))).select_from(CandleBackfill)
+    )
+    total, pending = result.one()
+    return total, pending
+
+
+async def get_backfill_universe(db: AsyncSession, instrument_types: Sequence[str]) -> List[Tuple[str, str, str]]:
+    """
+    Бумаги, по которым ведутся свечи: (ticker, boardid, instrument_type).
+    Если бумага торгуется на нескольких режимах, берётся самый ликвидный.
+    """
+    result = await db.execute(
+        text(
+            "SELECT DISTINCT ON (secid) secid, boardid, instrument_type"
+            " FROM market_data"
+            " WHERE instrument_type = ANY(:types) AND boardid IS NOT NULL AND length(secid) <= 20"
+            " ORDER BY secid, volume DESC NULLS LAST"
+        ),
+        {"types": list(instrument_types)}
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def get_candle_islands(db: AsyncSession, since: date, gap_days: int) -> Dict[str, List[Tuple[date, date]]]:
+    """
+    Непрерывные участки свечей по тикерам начиная с since: соседние свечи, между которыми
+    не больше gap_days дней (выходные, праздники), считаются одним участком.
+    Всё, что между участками, — кандидаты на догрузку.
+    """
+    result = await db.execute(
+        text(
+            "SELECT ticker, MIN(date), MAX(date) FROM ("
+            "  SELECT ticker, date, SUM(new_island) OVER (PARTITION BY ticker ORDER BY date) AS island FROM ("
+            "    SELECT ticker, date,"
+            "      CASE WHEN date - LAG(date) OVER (PARTITION BY ticker ORDER BY date) <= :gap_days"
+            "      THEN 0 ELSE 1 END AS new_island"
+            "    FROM candles WHERE date >= :since"
+            "  ) marked"
+            ") islands"
+            " GROUP BY ticker, island"
+            " ORDER BY ticker, MIN(date)"
+        ),
+        {"since": since, "gap_days": gap_days}
+    )
+    islands: Dict[str, List[Tuple[date, date]]] = {}
+    for ticker, start, end in result.all():
+        islands.setdefault(ticker, []).append((start, end))
+    return islands
+
+
+async def get_backfill_ranges(db: AsyncSession) -> List[CandleBackfill]:
+    """Все чекпоинты догрузки: завершённые диапазоны покрыты, незавершённые продолжаются."""
+    result = await db.execute(select(CandleBackfill).order_by(CandleBackfill.ticker, CandleBackfill.date_from))
+    return list(result.scalars().all())
+
+
+async def add_backfill_ranges(db: AsyncSession, ranges: List[Dict[str, Any]]):
+    """Новые диапазоны догрузки (done = FALSE, курсор с нуля); уже заведённые не трогаются."""
+    for i in range(0, len(ranges), BATCH_SIZE):
+        stmt = insert(CandleBackfill).values(ranges[i:i + BATCH_SIZE])
+        await db.execute(stmt.on_conflict_do_nothing(index_elements=["ticker", "date_from"]))
+    await db.commit()
+
+
+async def collapse_backfill_ranges(db: AsyncSession, tickers: Sequence[str]):
+    """
+    Схлопывает завершённые диапазоны тикера в один [min(date_from), max(date_till)].
+    Вызывается, только когда у тикера не осталось пропусков, — иначе таблица росла бы
+    на строку за каждый проход.
+    """
+    if not tickers:
+        return
+    merged = (await db.execute(
+        select(
+            CandleBackfill.ticker,
+            func.min(CandleBackfill.date_from),
+            func.max(CandleBackfill.date_till),
+            func.min(CandleBackfill.boardid),
+            func.min(CandleBackfill.instrument_type),
+            func.sum(CandleBackfill.rows_loaded),
+        )
+        .where(CandleBackfill.ticker.in_(tickers), CandleBackfill.done.is_(True))
+        .group_by(CandleBackfill.ticker)
+    )).all()
+    await db.execute(delete(CandleBackfill).where(CandleBackfill.ticker.in_(tickers), CandleBackfill.done.is_(True)))
+    rows = [
+        {
+            "ticker": ticker, "date_from": date_from, "date_till": date_till, "boardid": boardid,
+            "instrument_type": instrument_type, "next_start": 0, "rows_loaded": rows_loaded, "done": True,
+        }
+        for ticker, date_from, date_till, boardid, instrument_type, rows_loaded in merged
+    ]
+    for i in range(0, len(rows), BATCH_SIZE):
+        await db.execute(insert(CandleBackfill).values(rows[i:i + BATCH_SIZE]))
+    await db.commit()
+
+
+async def save_backfill_batch(db: AsyncSession, candles: List[Dict], checkpoints: List[Dict[str, Any]]) -> int:
+    """
+    Свечи из истории и чекпоинты диапазонов — в одной транзакции: после перезапуска
+    курсор никогда не опережает записанные строки. Дубликаты по (ticker, date) игнорируются.
+    checkpoints — [{"ticker", "date_from", "next_start", "rows", "done"}, ...], rows — сколько
+    строк добавилось в диапазон с прошлого чекпоинта. Возвращает число вставленных свечей.
+    """
+    start_time = time.time()
+    try:
+        inserted = await candles_writer.write(db, candles) if candles else 0
+        if checkpoints:
+            await db.execute(
+                text(
+                    "UPDATE candles_backfill SET next_start = :next_start, rows_loaded = rows_loaded + :rows,"
+                    " done = :done, updated_at = NOW() AT TIME ZONE 'utc'"
+                    " WHERE ticker = :ticker AND date_from = :date_from"
+                ),
+                checkpoints
+            )
+        await db.commit()
+        logger.info(
+            f"📥 История: вставлено {inserted} из {len(candles)} свечей, "
+            f"чекпоинтов {len(checkpoints)} за {time.time() - start_time:.3f} сек"
+        )
+        return inserted
+
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"❌ Ошибка при записи истории свечей: {e}", exc_info=True)
+        raise
+
+
+async def get_bonds_for_coupon_refresh(db: AsyncSession, ttl_hours: int) -> List[str]:
+    """
+    Облигации, по которым кеш bondization нужно (пере)загрузить:
+    записи нет, истёк TTL или уже наступило ближайшее событие, известное на момент загрузки.
+    """
+    stale_before = datetime.utcnow() - timedelta(hours=ttl_hours)
+    stmt = (
+        select(MarketData.secid)
+        .outerjoin(Coupons, Coupons.secid == MarketData.secid)
+        .where(
+            MarketData.instrument_type == "bond",
+            or_(
+                Coupons.secid.is_(None),
+                Coupons.updated_at < stale_before,
+                Coupons.next_event_date <= func.current_date(),
+            )
+        )
+        .distinct()
+        .order_by(MarketData.secid)
+    )
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def replace_bond_events(db: AsyncSession, secids: List[str], events: List[Dict]):
+    """
+    Полностью заменяет события по перечисленным бумагам: график выплат у эмитента
+    может меняться целиком, поэтому проще удалить старые строки, чем сверять их.
+    """
+    await db.execute(delete(BondEvents).where(BondEvents.secid.in_(secids)))
+    await bond_events_writer.write(db, events)
+
+
+async def upsert_coupons(db: AsyncSession, rows: List[Dict], dataset: Optional[str] = None):
+    """
+    Массовый upsert кеша bondization и разобранных событий (bond_events).
+    Ожидает список вида [{"secid": "SU26238RMFS4", "data": {...}, "next_event_date": date(...), "events": [...]}, ...]
+    """
+    if not rows:
+        logger.info("Нет данных bondization — пропускаем upsert.")
+        return
+
+    start_time = time.time()
+
+    try:
+        now = datetime.utcnow()
+        for i in range(0, len(rows), BATCH_SIZE):
+            chunk = rows[i:i + BATCH_SIZE]
+            batch = [
+                {"secid": row["secid"], "data": row["data"], "next_event_date": row["next_event_date"], "updated_at": now}
+                for row in chunk
+            ]
+            stmt = insert(Coupons).values(batch)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["secid"],
+                set_={
+                    "data": stmt.excluded.data,
+                    "updated_at": stmt.excluded.updated_at,
+                    "next_event_date": stmt.excluded.next_event_date,
+                }
             )
             await db.execute(stmt)
+            await replace_bond_events(
+                db,
+                [row["secid"] for row in chunk],
+                [event for row in chunk for event in row.get("events", [])]
+            )
             await db.flush()
 
-            batch_duration = time.time() - batch_start
-            logger.debug(f"Батч {i // BATCH_SIZE + 1}: {len(batch)} свечей → {batch_duration:.3f} сек")
-
+        if dataset:
+            await bump_dataset_version(db, dataset)
         await db.commit()
-        total_duration = time.time() - start_time
-        logger.info(f"✅ Успешно вставлено до {total} свечей за {total_duration:.3f} сек (дубликаты проигнорированы)")
+
+        duration = time.time() - start_time
+        logger.info(f"✅ Успешно upserted {len(rows)} записей bondization за {duration:.3f} сек")
 
     except Exception as e:
         await db.rollback()
-        total_duration = time.time() - start_time
-        logger.error(f"❌ Ошибка при вставке свечей: {e} (время до ошибки: {total_duration:.3f} сек)", exc_info=True)
-        raise
\ No newline at end of file
+        duration = time.time() - start_time
+        logger.error(f"❌ Ошибка при upsert bondization: {e} (время: {duration:.3f} сек)", exc_info=True)
+        raise
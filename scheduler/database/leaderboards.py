@@ -0,0 +1,129 @@
+# scheduler/database/leaderboards.py
+import time
+import logging
+from typing import Iterable, List, NamedTuple, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import and_, asc, delete, desc, func, literal, select
+from scheduler.database.models import MarketData, Leaderboard
+
+logger = logging.getLogger(__name__)
+
+# Сколько позиций хранить в каждом топе: максимум limit среди эндпоинтов API
+LEADERBOARD_SIZE = 20
+
+
+class LeaderboardSpec(NamedTuple):
+    instrument_type: str
+    metric: str
+    bucket: str
+    where: object
+    order_by: object
+
+
+def _years_left():
+    # date - date в Postgres даёт число дней
+    return (MarketData.maturity_date - func.current_date()) / 365.25
+
+
+def _specs() -> List[LeaderboardSpec]:
+    """
+    Описания всех топов. Фильтры и сортировки повторяют прежние запросы API
+    один в один, включая порядок NULL (Postgres: NULLS FIRST для DESC).
+    Явный instrument_type = 'bond' результат не меняет (даты погашения и купонов есть только
+    у облигаций), но позволяет планировщику взять частичные индексы из миграции 0002.
+    """
+    today = func.current_date()
+    is_stock = MarketData.instrument_type == "stock"
+    is_bond = MarketData.instrument_type == "bond"
+    is_index = MarketData.instrument_type == "index"
+    has_change = and_(MarketData.change_percent.isnot(None), MarketData.change_percent != 0)
+    bond_base = and_(is_bond, MarketData.list_level == 1, MarketData.maturity_date > today)
+
+    specs = [
+        # === Акции (StockDAO.get_top_stocks) ===
+        LeaderboardSpec("stock", "volatility", "", and_(is_stock, MarketData.volatility_percent.isnot(None)),
+                        desc(MarketData.volatility_percent)),
+        LeaderboardSpec("stock", "volume", "", and_(is_stock, MarketData.volume.isnot(None)),
+                        desc(MarketData.volume)),
+        LeaderboardSpec("stock", "rising", "", and_(is_stock, has_change), desc(MarketData.change_percent)),
+        LeaderboardSpec("stock", "falling", "", and_(is_stock, has_change), asc(MarketData.change_percent)),
+
+        # === Облигации (BondDAO.get_top_bonds) ===
+        LeaderboardSpec("bond", "liquidity", "", bond_base, desc(MarketData.volume)),
+        LeaderboardSpec("bond", "duration", "", bond_base, desc(MarketData.duration_years)),
+        LeaderboardSpec(
+            "bond", "discount", "",
+            and_(bond_base, MarketData.last_price < MarketData.facevalue, MarketData.facevalue > 0),
+            desc((MarketData.facevalue - MarketData.last_price) / MarketData.facevalue * 100),
+        ),
+        LeaderboardSpec("bond", "coupon", "", bond_base, desc(MarketData.couponpercent)),
+
+        # === События по облигациям (BondDAO.get_events) ===
+        LeaderboardSpec("bond", "payment", "", and_(is_bond, MarketData.next_coupon_date >= today),
+                        asc(MarketData.next_coupon_date)),
+        LeaderboardSpec("bond", "repayment", "", and_(is_bond, MarketData.maturity_date >= today),
+                        asc(MarketData.maturity_date)),
+
+        # === Индексы (IndexDAO.get_top_indexes) ===
+        LeaderboardSpec("index", "rising", "", is_index, desc(MarketData.change_percent)),
+        LeaderboardSpec("index", "falling", "", is_index, asc(MarketData.change_percent)),
+        LeaderboardSpec("index", "volume", "", is_index, desc(MarketData.volume)),
+        LeaderboardSpec("index", "volatility", "", and_(is_index, MarketData.volatility_percent.isnot(None)),
+                        desc(MarketData.volatility_percent)),
+    ]
+
+    # === Доходности по срокам до погашения (BondDAO.get_top_yields) ===
+    yields_base = and_(
+        is_bond,
+        MarketData.list_level == 1,
+        MarketData.maturity_date > today,
+        MarketData.effectiveyield > 0,
+        MarketData.effectiveyield < 100,
+        MarketData.accruedint.isnot(None),
+    )
+    for bucket, min_years, max_years in (("short", 0, 1), ("medium", 1, 5), ("long", 5, None)):
+        duration_filter = _years_left() > min_years
+        if max_years is not None:
+            duration_filter = and_(duration_filter, _years_left() <= max_years)
+        specs.append(LeaderboardSpec(
+            "bond", "yield", bucket, and_(yields_base, duration_filter), desc(MarketData.effectiveyield)
+        ))
+
+    return specs
+
+
+async def rebuild_leaderboards(db: AsyncSession, instrument_types: Optional[Iterable[str]] = None):
+    """
+    Пересчитывает топ-K списки для указанных типов инструментов (по умолчанию — для всех).
+    Вызывается внутри транзакции upsert, поэтому API видит топы согласованными с данными.
+    """
+    start = time.time()
+    specs = _specs()
+    types = set(instrument_types) if instrument_types is not None else {s.instrument_type for s in specs}
+    specs = [spec for spec in specs if spec.instrument_type in types]
+    if not specs:
+        return
+
+    await db.execute(delete(Leaderboard).where(Leaderboard.instrument_type.in_(types)))
+
+    for spec in specs:
+        ranked = (
+            select(
+                literal(spec.instrument_type),
+                literal(spec.metric),
+                literal(spec.bucket),
+                func.row_number().over(order_by=(spec.order_by, MarketData.id)),
+                MarketData.id,
+            )
+            .where(spec.where)
+            .order_by(spec.order_by, MarketData.id)
+            .limit(LEADERBOARD_SIZE)
+        )
+        await db.execute(
+            insert(Leaderboard).from_select(
+                ["instrument_type", "metric", "bucket", "rank", "market_data_id"], ranked
+            )
+        )
+
+    logger.debug(f"Пересчитано {len(specs)} топов ({', '.join(sorted(types))}) за {time.time() - start:.3f} сек")
@@ -0,0 +1,63 @@
+# scheduler/database/migrate.py
+import logging
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+from scheduler.database.engine import engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+# Один и тот же ключ у всех экземпляров шедулера: миграции не применяются параллельно
+MIGRATIONS_LOCK_ID = 7_241_001
+
+
+def list_migrations() -> List[Tuple[str, Path]]:
+    """Файлы вида 0001_name.sql в порядке номеров; версия — имя файла без .sql."""
+    return sorted((path.stem, path) for path in MIGRATIONS_DIR.glob("[0-9][0-9][0-9][0-9]_*.sql"))
+
+
+async def run_migrations():
+    """
+    Применяет новые миграции из scheduler/database/migrations.
+    initdb отрабатывает только на пустом томе, поэтому изменения схемы для уже
+    существующих баз живут здесь; применённые версии хранятся в schema_migrations.
+    Каждая миграция — отдельная транзакция: при ошибке она откатывается целиком.
+    """
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATIONS_LOCK_ID})
+        try:
+            await conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                " version VARCHAR(255) PRIMARY KEY,"
+                " applied_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc') NOT NULL"
+                ")"
+            ))
+            await conn.commit()
+
+            result = await conn.execute(text("SELECT version FROM schema_migrations"))
+            applied = set(result.scalars().all())
+            await conn.commit()
+
+            pending = [(version, path) for version, path in list_migrations() if version not in applied]
+            if not pending:
+                logger.info("✅ Схема БД актуальна")
+                return
+
+            raw = await conn.get_raw_connection()
+            for version, path in pending:
+                start = time.time()
+                # Файл целиком — несколько команд, поэтому через asyncpg без параметров
+                async with raw.driver_connection.transaction():
+                    await raw.driver_connection.execute(path.read_text(encoding="utf-8"))
+                    await raw.driver_connection.execute(
+                        "INSERT INTO schema_migrations (version) VALUES ($1)", version
+                    )
+                logger.info(f"🧱 Применена миграция {version} за {time.time() - start:.2f} сек")
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATIONS_LOCK_ID})
+            await conn.commit()
@@ -0,0 +1,46 @@
+-- Таблицы и колонки, появившиеся после первого релиза.
+-- В свежей базе их уже создал initdb, поэтому всё через IF NOT EXISTS.
+
+CREATE TABLE IF NOT EXISTS leaderboards (
+    instrument_type VARCHAR(10) NOT NULL,
+    metric VARCHAR(20) NOT NULL,
+    bucket VARCHAR(20) NOT NULL DEFAULT '',
+    rank INTEGER NOT NULL,
+    market_data_id INTEGER NOT NULL,
+    computed_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc') NOT NULL,
+    PRIMARY KEY (instrument_type, metric, bucket, rank)
+);
+
+CREATE TABLE IF NOT EXISTS dataset_versions (
+    dataset VARCHAR(32) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc') NOT NULL
+);
+
+INSERT INTO dataset_versions (dataset, version)
+VALUES ('companies', 1)
+ON CONFLICT (dataset) DO NOTHING;
+
+ALTER TABLE coupons ADD COLUMN IF NOT EXISTS next_event_date DATE;
+
+CREATE TABLE IF NOT EXISTS bond_events (
+    secid VARCHAR(51) NOT NULL,
+    seq INTEGER NOT NULL,
+    event_type VARCHAR(16) NOT NULL,
+    event_date DATE NOT NULL,
+    face_value DOUBLE PRECISION,
+    payment_amount DOUBLE PRECISION,
+    payment_amount_rub DOUBLE PRECISION,
+    payment_percent DOUBLE PRECISION,
+    record_date DATE,
+    start_date DATE,
+    offer_start_date DATE,
+    offer_end_date DATE,
+    offer_price_percent DOUBLE PRECISION,
+    offer_status VARCHAR(64),
+    currency VARCHAR(10),
+    PRIMARY KEY (secid, seq)
+);
+
+CREATE INDEX IF NOT EXISTS ix_bond_events_secid_event_date ON bond_events (secid, event_date);
+CREATE INDEX IF NOT EXISTS ix_bond_events_event_date ON bond_events (event_date, secid, seq);
@@ -0,0 +1,52 @@
+-- Индексы под запросы API и пересчёт топов шедулером.
+-- Сортировки в индексах совпадают с ORDER BY запросов (включая хвост id),
+-- поэтому ORDER BY ... LIMIT читает первые K записей индекса без сортировки.
+
+-- Страницы списков, keyset-пагинация (id > курсор), индексы main/sector
+CREATE INDEX IF NOT EXISTS ix_market_data_type_id
+    ON market_data (instrument_type, id);
+
+-- Инкрементальная дозагрузка снимка API (updated_at > synced_until)
+CREATE INDEX IF NOT EXISTS ix_market_data_updated_at
+    ON market_data (updated_at);
+
+-- Топы акций и индексов
+CREATE INDEX IF NOT EXISTS ix_market_data_type_volume
+    ON market_data (instrument_type, volume DESC, id);
+CREATE INDEX IF NOT EXISTS ix_market_data_type_volatility
+    ON market_data (instrument_type, volatility_percent DESC, id);
+CREATE INDEX IF NOT EXISTS ix_market_data_type_change_desc
+    ON market_data (instrument_type, change_percent DESC, id);
+CREATE INDEX IF NOT EXISTS ix_market_data_type_change_asc
+    ON market_data (instrument_type, change_percent, id);
+
+-- Топы облигаций первого уровня листинга
+CREATE INDEX IF NOT EXISTS ix_market_data_bond_l1_volume
+    ON market_data (volume DESC, id)
+    WHERE list_level = 1 AND instrument_type = 'bond';
+CREATE INDEX IF NOT EXISTS ix_market_data_bond_l1_duration
+    ON market_data (duration_years DESC, id)
+    WHERE list_level = 1 AND instrument_type = 'bond';
+CREATE INDEX IF NOT EXISTS ix_market_data_bond_l1_coupon
+    ON market_data (couponpercent DESC, id)
+    WHERE list_level = 1 AND instrument_type = 'bond';
+CREATE INDEX IF NOT EXISTS ix_market_data_bond_l1_yield
+    ON market_data (effectiveyield DESC, id)
+    WHERE list_level = 1 AND instrument_type = 'bond';
+CREATE INDEX IF NOT EXISTS ix_market_data_bond_l1_maturity
+    ON market_data (maturity_date)
+    WHERE list_level = 1 AND instrument_type = 'bond';
+
+-- События по облигациям: ближайшие купоны и погашения
+CREATE INDEX IF NOT EXISTS ix_market_data_bond_next_coupon
+    ON market_data (next_coupon_date, id)
+    WHERE instrument_type = 'bond';
+CREATE INDEX IF NOT EXISTS ix_market_data_bond_maturity
+    ON market_data (maturity_date, id)
+    WHERE instrument_type = 'bond';
+
+-- Выборка бумаг для предзагрузки bondization (устаревшие записи и наступившие события)
+CREATE INDEX IF NOT EXISTS ix_coupons_updated_at ON coupons (updated_at);
+CREATE INDEX IF NOT EXISTS ix_coupons_next_event_date ON coupons (next_event_date);
+
+ANALYZE market_data;
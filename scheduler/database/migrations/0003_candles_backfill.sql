@@ -0,0 +1,18 @@
+-- Чекпоинты догрузки истории свечей из /iss/history.
+-- Каждая строка — диапазон дат по тикеру: done = FALSE — диапазон ещё качается,
+-- next_start — курсор страниц ISS, с которого продолжить после перезапуска.
+
+CREATE TABLE IF NOT EXISTS candles_backfill (
+    ticker VARCHAR(20) NOT NULL,
+    date_from DATE NOT NULL,
+    date_till DATE NOT NULL,
+    boardid VARCHAR(20) NOT NULL,
+    instrument_type VARCHAR(10) NOT NULL,
+    next_start INTEGER NOT NULL DEFAULT 0,
+    rows_loaded INTEGER NOT NULL DEFAULT 0,
+    done BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT (NOW() AT TIME ZONE 'utc') NOT NULL,
+    PRIMARY KEY (ticker, date_from)
+);
+
+CREATE INDEX IF NOT EXISTS ix_candles_backfill_pending ON candles_backfill (ticker) WHERE NOT done;
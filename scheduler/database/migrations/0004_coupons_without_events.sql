@@ -0,0 +1,6 @@
+-- bond_events пишет только шедулер, API больше не разбирает coupons.data сам.
+-- Кеш bondization, сохранённый API до появления bond_events, событий не имеет:
+-- удаляем такие записи, чтобы предзагрузка при старте шедулера скачала и разобрала их заново.
+
+DELETE FROM coupons c
+WHERE NOT EXISTS (SELECT 1 FROM bond_events e WHERE e.secid = c.secid);
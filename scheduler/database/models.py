@@ -8,7 +8,10 @@ from sqlalchemy import (
     DateTime,
     Date,
     UniqueConstraint,
-    BIGINT
+    JSON,
+    Float,
+    BIGINT,
+    Boolean
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
@@ -82,9 +85,79 @@ class Candle(Base):
     volume: Mapped[int] = mapped_column(BIGINT, nullable=False)
 
 
+class CandleBackfill(Base):
+    __tablename__ = "candles_backfill"
+
+    ticker: Mapped[str] = mapped_column(String(20), primary_key=True)
+    date_from: Mapped[date] = mapped_column(Date, primary_key=True)
+    date_till: Mapped[date] = mapped_column(Date, nullable=False)
+    boardid: Mapped[str] = mapped_column(String(20), nullable=False)
+    instrument_type: Mapped[str] = mapped_column(String(10), nullable=False)
+    next_start: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rows_loaded: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    done: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+
 class MarketCap(Base):
     __tablename__ = "market_caps"
 
     timestamp: Mapped[date] = mapped_column(Date, primary_key=True)
     cap: Mapped[float] = mapped_column(Numeric(24, 6), nullable=False)
 
+
+
+class Coupons(Base):
+    __tablename__ = "coupons"
+
+    secid: Mapped[str] = mapped_column(String(51), primary_key=True)
+    data: Mapped[dict] = mapped_column(JSON, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+    next_event_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+
+
+class BondEvents(Base):
+    __tablename__ = "bond_events"
+
+    secid: Mapped[str] = mapped_column(String(51), primary_key=True)
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    event_type: Mapped[str] = mapped_column(String(16), nullable=False)
+    event_date: Mapped[date] = mapped_column(Date, nullable=False)
+    face_value: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    payment_amount: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    payment_amount_rub: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    payment_percent: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    record_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    start_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    offer_start_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    offer_end_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    offer_price_percent: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    offer_status: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    currency: Mapped[Optional[str]] = mapped_column(String(10), nullable=True)
+
+
+class Leaderboard(Base):
+    __tablename__ = "leaderboards"
+
+    instrument_type: Mapped[str] = mapped_column(String(10), primary_key=True)
+    metric: Mapped[str] = mapped_column(String(20), primary_key=True)
+    bucket: Mapped[str] = mapped_column(String(20), primary_key=True, default="")
+    rank: Mapped[int] = mapped_column(Integer, primary_key=True)
+    market_data_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False
+    )
+
+
+class DatasetVersion(Base):
+    __tablename__ = "dataset_versions"
+
+    dataset: Mapped[str] = mapped_column(String(32), primary_key=True)
+    version: Mapped[int] = mapped_column(BIGINT, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False
+    )
@@ -0,0 +1,100 @@
+# scheduler/executor.py
+import asyncio
+import logging
+import multiprocessing
+import signal
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+
+from scheduler.settings import settings
+
+logger = logging.getLogger("scheduler.executor")
+
+T = TypeVar("T")
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+
+def _init_worker():
+    """Инициализация процесса пула: логи в формате шедулера плюс имя воркера; Ctrl+C обрабатывает родитель."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(processName)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)],
+        # spawn импортирует main.py шедулера в воркере заново — его basicConfig заменяем
+        force=True,
+    )
+
+
+class CpuExecutor:
+    """
+    Пул для CPU-стадий задач: разбор JSON ответов ISS и преобразование их в строки для БД.
+    Пока стадия считается в пуле, цикл событий шедулера продолжает обслуживать сетевые
+    запросы и запросы к БД остальных задач.
+
+    Режим — settings.CPU_EXECUTOR:
+    - process — пул процессов (spawn): настоящий параллелизм, аргументы и результат идут
+      через pickle, поэтому в пул передаются IssDocument (сырые байты), а обратно — списки строк;
+    - thread — пул потоков: без сериализации, но чистый Python делит GIL с циклом событий;
+    - inline — прямо в цикле событий, как раньше (для отладки).
+    Пул создаётся при первой задаче и закрывается в shutdown() шедулера.
+    """
+
+    def __init__(self):
+        self._pool: Optional[Executor] = None
+
+    @property
+    def mode(self) -> str:
+        mode = settings.CPU_EXECUTOR
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"CPU_EXECUTOR должен быть одним из {EXECUTOR_MODES}, получено {mode!r}")
+        return mode
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            workers = settings.CPU_EXECUTOR_WORKERS
+            if self.mode == "process":
+                # spawn: воркеры не наследуют цикл событий, соединения с БД и открытые сокеты родителя
+                self._pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cpu")
+            logger.info(f"⚙️ Пул CPU-стадий: {self.mode}, воркеров: {workers}")
+        return self._pool
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Выполнить func(*args) в пуле. func и аргументы должны быть pickle-совместимы (функции уровня модуля)."""
+        if self.mode == "inline":
+            return func(*args)
+
+        pool = self._get_pool()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, partial(func, *args))
+        except BrokenProcessPool:
+            # Воркер упал (OOM, сигнал) — пул непригоден; следующая задача создаст новый
+            logger.error("❌ Пул процессов CPU-стадий сломан — будет пересоздан")
+            if self._pool is pool:
+                self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    async def close(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+            logger.info("✅ Пул CPU-стадий остановлен")
+
+
+cpu_executor = CpuExecutor()
+
+
+async def run_cpu(func: Callable[..., T], *args: Any) -> T:
+    """CPU-стадия задачи вне цикла событий — через общий пул шедулера."""
+    return await cpu_executor.run(func, *args)
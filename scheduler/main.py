@@ -4,6 +4,7 @@ import asyncio
 import signal
 import logging
 import sys
+import time
 from contextlib import AsyncExitStack
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
@@ -14,6 +15,7 @@ from sqlalchemy.ext.asyncio import create_async_engine
 # Импорты обновлённых задач — теперь они содержат полную логику внутри
 from scheduler.processors.for_stocks import update_stocks
 from scheduler.processors.for_bonds import update_bonds
+from scheduler.processors.for_bonds_coupons import update_bond_coupons
 from scheduler.processors.for_funds import update_etf_tqtf, update_etf_tqif
 from scheduler.processors.for_indices import update_indexes
 from scheduler.processors.for_currencies import update_currencies
@@ -22,10 +24,15 @@ from scheduler.processors.for_stocks_candles import update_daily_candles
 from scheduler.processors.for_bonds_candles import update_bond_daily_candles
 from scheduler.processors.for_indices_candles import update_indices_daily_candles
 from scheduler.processors.for_funds_candles import update_tqif_candles, update_tqtf_candles
+from scheduler.processors.for_candles_backfill import backfill_candles, backfill_candles_after_downtime
 # Базовые компоненты
 from scheduler.database.engine import engine
+from scheduler.database.migrate import run_migrations
+from scheduler.clients.shared import shared_clients
+from scheduler.executor import cpu_executor
 from scheduler.settings import settings
 import pytz
+from datetime import datetime
 
 logging.basicConfig(
     level=logging.INFO,
@@ -72,35 +79,64 @@ async def wait_for_db(max_retries: int = 30, delay: int = 2):
     raise RuntimeError("❌ БД не стала доступна за отведённое время")
 
 
+async def run_initial_job(job, semaphore: asyncio.Semaphore):
+    """Одна задача первоначальной загрузки: под семафором, с таймаутом; ошибки не мешают остальным."""
+    async with semaphore:
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(job(), timeout=settings.INITIAL_LOAD_JOB_TIMEOUT)
+            status = "ok"
+        except asyncio.TimeoutError:
+            status = "таймаут"
+            logger.error(f"Таймаут первоначальной загрузки: {job.__name__}")
+        except Exception as e:
+            status = "ошибка"
+            logger.error(f"Ошибка в первоначальной загрузке ({job.__name__}): {e}")
+        return job.__name__, status, time.monotonic() - start
+
+
 async def initial_load():
     if not settings.SCHEDULER_INITIAL_LOAD:
         logger.info("⏭️  Пропускаем первоначальную загрузку (настройка)")
         return
 
-    logger.info("🔄 Запуск первоначальной загрузки...")
-    tasks = [
-        update_stocks(),
-        update_bonds(),
-        update_etf_tqtf(),
-        update_etf_tqif(),
-        update_indexes(),
-        update_currencies(),
-        update_capitalization(),
+    logger.info(
+        f"🔄 Запуск первоначальной загрузки (параллельно до {settings.INITIAL_LOAD_CONCURRENCY}, "
+        f"таймаут {settings.INITIAL_LOAD_JOB_TIMEOUT:.0f} сек на задачу)..."
+    )
+    jobs = [
+        update_stocks,
+        update_bonds,
+        update_etf_tqtf,
+        update_etf_tqif,
+        update_indexes,
+        update_currencies,
+        update_capitalization,
     ]
 
-    for task in tasks:
-        try:
-            await task
-        except Exception as e:
-            logger.error(f"Ошибка в первоначальной загрузке: {e}")
+    start = time.monotonic()
+    semaphore = asyncio.Semaphore(settings.INITIAL_LOAD_CONCURRENCY)
+    results = await asyncio.gather(*(run_initial_job(job, semaphore) for job in jobs))
 
-    logger.info("✅ Первоначальная загрузка завершена")
+    # Разбивка по задачам: общее время теперь ≈ самой долгой задаче, а не сумме
+    for name, status, duration in sorted(results, key=lambda r: r[2], reverse=True):
+        logger.info(f"   ⏱️  {name:<24} {duration:7.2f} сек  {status}")
+    logger.info(f"✅ Первоначальная загрузка завершена за {time.monotonic() - start:.2f} сек")
 
 
 def setup_scheduler():
     try:
         scheduler.add_job(update_stocks, IntervalTrigger(minutes=10), id="update_stocks", misfire_grace_time=300, max_instances=1)
         scheduler.add_job(update_bonds, IntervalTrigger(minutes=15), id="update_bonds", misfire_grace_time=300, max_instances=1)
+        # Предзагрузка bondization: первый запуск сразу, чтобы прогреть кеш после деплоя
+        scheduler.add_job(
+            update_bond_coupons,
+            IntervalTrigger(hours=1),
+            id="update_bond_coupons",
+            next_run_time=datetime.now(moscow_tz),
+            misfire_grace_time=1800,
+            max_instances=1
+        )
         scheduler.add_job(update_etf_tqtf, IntervalTrigger(minutes=20), id="update_etf_tqtf", misfire_grace_time=600, max_instances=1)
         scheduler.add_job(update_etf_tqif, IntervalTrigger(minutes=30), id="update_etf_tqif", misfire_grace_time=300, max_instances=1)
         scheduler.add_job(update_indexes, IntervalTrigger(minutes=30), id="update_indexes", misfire_grace_time=900, max_instances=1)
@@ -142,6 +178,22 @@ def setup_scheduler():
             misfire_grace_time=7200,
             max_instances=1
         )
+        # === Догрузка истории свечей: еженедельный поиск пропусков и новых бумаг ===
+        scheduler.add_job(
+            backfill_candles,
+            CronTrigger(day_of_week="sun", hour=3, minute=0, timezone=moscow_tz),
+            id="candles_backfill",
+            misfire_grace_time=86400,
+            max_instances=1
+        )
+        # После простоя — сразу после старта, не дожидаясь воскресенья
+        if settings.CANDLES_BACKFILL_ON_STARTUP:
+            scheduler.add_job(
+                backfill_candles_after_downtime,
+                id="candles_backfill_startup",
+                next_run_time=datetime.now(moscow_tz),
+                max_instances=1
+            )
     except Exception as e:
         logger.error(f"❌ Ошибка настройки планировщика: {e}")
         raise
@@ -155,8 +207,14 @@ async def main():
             lambda s=sig: asyncio.create_task(shutdown(s.name))
         )
 
+    # Общие HTTP-клиенты живут до остановки процесса и закрываются в shutdown()
+    exit_stack.push_async_callback(shared_clients.close)
+    # Пул процессов для разбора и обработки ответов вне цикла событий
+    exit_stack.push_async_callback(cpu_executor.close)
+
     try:
         await wait_for_db()
+        await run_migrations()
         await initial_load()
 
         setup_scheduler()
@@ -0,0 +1,243 @@
+# scheduler/pipeline.py
+"""
+Конвейер задачи: источник → стадии обработки → запись, связанные ограниченными очередями.
+Стадии работают одновременно: запись первых пачек в БД идёт, пока следующие режимы торгов
+или страницы ещё качаются и разбираются. Когда очередь заполнена, предыдущая стадия ждёт —
+в памяти никогда не лежит больше queue_size элементов между стадиями и одной пачки записи.
+По итогам прогона в лог пишется время каждой стадии: сколько она работала и сколько
+простояла на заполненной очереди.
+"""
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from scheduler.settings import settings
+
+logger = logging.getLogger("scheduler.pipeline")
+
+# Конец потока: каждый воркер стадии получает свой экземпляр и завершается
+_DONE = object()
+
+
+class StageStats:
+    """
+    Счётчики стадии: элементы на входе/выходе, время работы и простоя на заполненной очереди
+    (у стадии с несколькими воркерами — сумма по воркерам). Для записи items_out — число строк,
+    result — сумма того, что вернула запись (изменённые или вставленные строки).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.result = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.items_in}→{self.items_out} шт, "
+            f"работа {self.busy:.2f} с, ожидание очереди {self.blocked:.2f} с"
+        )
+
+
+async def once(awaitable: Awaitable[Any]) -> AsyncIterator[Any]:
+    """Источник из одного запроса: для задач, которые получают весь набор одним документом."""
+    yield await awaitable
+
+
+async def each(items: Iterable[Any]) -> AsyncIterator[Any]:
+    """Источник из готового списка заданий (например, диапазонов догрузки)."""
+    for item in items:
+        yield item
+
+
+class Pipeline:
+    """
+    Пример:
+        stats = await (
+            Pipeline("Bonds")
+            .source("fetch", client.iter_bonds_by_board())
+            .stage("parse", parse_board, workers=settings.CPU_EXECUTOR_WORKERS)
+            .sink("write", write_rows)
+            .run()
+        )
+
+    source — асинхронный итератор элементов (документов, страниц);
+    stage — корутина элемент → результат; None отбрасывается, workers — сколько элементов
+      обрабатывается одновременно (порядок при workers > 1 не сохраняется). Стадия может быть
+      асинхронным генератором: каждый его элемент сразу уходит дальше (страницы одного запроса);
+    sink — корутина пачка строк → число записанных; на вход приходят списки строк,
+      sink собирает их в пачки по batch_size и записывает по мере накопления.
+      Если задан weight (элемент → число строк), элементы не разворачиваются, а копятся
+      целиком и уходят в sink списком элементов — так вместе со строками доходит служебное
+      состояние (например, курсор для чекпоинта).
+    Ошибка любой стадии останавливает весь конвейер и пробрасывается из run(); пачки, записанные
+    до неё, уже закоммичены — сколько, видно в stats (см. sinks.publish_partial).
+    """
+
+    def __init__(self, name: str, queue_size: Optional[int] = None):
+        self.name = name
+        self.queue_size = queue_size or settings.PIPELINE_QUEUE_SIZE
+        self._source: Optional[AsyncIterable[Any]] = None
+        self._source_stats: Optional[StageStats] = None
+        self._stages: List[tuple] = []
+        self._sink: Optional[tuple] = None
+
+    def source(self, name: str, items: AsyncIterable[Any]) -> "Pipeline":
+        self._source = items
+        self._source_stats = StageStats(name)
+        return self
+
+    def stage(self, name: str, func: Callable[[Any], Awaitable[Any]], workers: int = 1) -> "Pipeline":
+        self._stages.append((StageStats(name), func, max(1, workers)))
+        return self
+
+    def sink(
+            self,
+            name: str,
+            func: Callable[[List[Any]], Awaitable[Any]],
+            batch_size: Optional[int] = None,
+            weight: Optional[Callable[[Any], int]] = None,
+    ) -> "Pipeline":
+        self._sink = (StageStats(name), func, batch_size or settings.PIPELINE_BATCH_SIZE, weight)
+        return self
+
+    @property
+    def stats(self) -> Dict[str, StageStats]:
+        """Счётчики стадий по именам. Если run() упал — то, что стадии успели сделать до ошибки."""
+        stages = [self._source_stats, *(stats for stats, _, _ in self._stages), self._sink and self._sink[0]]
+        return {stage.name: stage for stage in stages if stage is not None}
+
+    async def run(self) -> Dict[str, StageStats]:
+        if self._source is None or self._sink is None:
+            raise ValueError(f"Конвейер {self.name}: нужны source и sink")
+
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(len(self._stages) + 1)]
+        # Сколько воркеров читает каждую очередь — столько маркеров конца в неё кладётся
+        readers = [workers for _, _, workers in self._stages] + [1]
+
+        tasks = [asyncio.ensure_future(self._run_source(queues[0], readers[0]))]
+        for i, (stats, func, workers) in enumerate(self._stages):
+            remaining = [workers]
+            tasks += [
+                asyncio.ensure_future(self._run_stage(stats, func, queues[i], queues[i + 1], readers[i + 1], remaining))
+                for _ in range(workers)
+            ]
+        tasks.append(asyncio.ensure_future(self._run_sink(queues[-1])))
+
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        stats = self.stats
+        logger.info(
+            f"[{self.name}] ⏱ Конвейер за {time.perf_counter() - start:.2f} с — "
+            + "; ".join(str(stage) for stage in stats.values())
+        )
+        return stats
+
+    @staticmethod
+    async def _put(queue: asyncio.Queue, item: Any, stats: StageStats):
+        if queue.full():
+            waited = time.perf_counter()
+            await queue.put(item)
+            stats.blocked += time.perf_counter() - waited
+        else:
+            queue.put_nowait(item)
+
+    async def _emit(self, out: asyncio.Queue, result: Any, stats: StageStats):
+        if result is not None:
+            stats.items_out += 1
+            await self._put(out, result, stats)
+
+    async def _run_source(self, out: asyncio.Queue, readers: int):
+        stats = self._source_stats
+        items = self._source.__aiter__()
+        while True:
+            started = time.perf_counter()
+            try:
+                item = await items.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                stats.busy += time.perf_counter() - started
+            stats.items_in += 1
+            stats.items_out += 1
+            await self._put(out, item, stats)
+        for _ in range(readers):
+            await out.put(_DONE)
+
+    async def _run_stage(
+            self,
+            stats: StageStats,
+            func: Callable[[Any], Awaitable[Any]],
+            inbox: asyncio.Queue,
+            out: asyncio.Queue,
+            readers: int,
+            remaining: List[int],
+    ):
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                break
+            stats.items_in += 1
+            started = time.perf_counter()
+            output = func(item)
+            if inspect.isasyncgen(output):
+                async for result in output:
+                    stats.busy += time.perf_counter() - started
+                    await self._emit(out, result, stats)
+                    started = time.perf_counter()
+                stats.busy += time.perf_counter() - started
+            else:
+                result = await output
+                stats.busy += time.perf_counter() - started
+                await self._emit(out, result, stats)
+
+        # Последний завершившийся воркер стадии закрывает поток для следующей
+        remaining[0] -= 1
+        if not remaining[0]:
+            for _ in range(readers):
+                await out.put(_DONE)
+
+    async def _run_sink(self, inbox: asyncio.Queue):
+        stats, func, batch_size, weight = self._sink
+        batch: List[Any] = []
+        batch_weight = 0
+
+        async def flush(items: List[Any], rows: int):
+            started = time.perf_counter()
+            written = await func(items)
+            stats.busy += time.perf_counter() - started
+            stats.items_out += rows
+            if isinstance(written, int):
+                stats.result += written
+
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                break
+            stats.items_in += 1
+            if weight is not None:
+                batch.append(item)
+                batch_weight += weight(item)
+                if batch_weight >= batch_size:
+                    await flush(batch, batch_weight)
+                    batch, batch_weight = [], 0
+                continue
+
+            rows: Iterable[Any] = item
+            batch.extend(rows)
+            while len(batch) >= batch_size:
+                await flush(batch[:batch_size], batch_size)
+                del batch[:batch_size]
+        if batch:
+            await flush(batch, batch_weight if weight is not None else len(batch))
@@ -0,0 +1,193 @@
+# scheduler/processors/columnar.py
+"""
+Колоночная обработка секций ISS на NumPy.
+Секция транспонируется один раз, дальше каждая колонка — массив значений и маска заполненных;
+соединения и производные метрики считаются над массивами целиком, а не построчно через словари.
+Семантика конвертеров повторяет построчный код процессоров: float(x) if x is not None,
+int(x) if x, strptime по уникальным значениям — результат совпадает до бита.
+"""
+import datetime
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from scheduler.clients.iss import EMPTY_SECTION, IssResponse
+
+logger = logging.getLogger(__name__)
+
+# Предел для колонок NUMERIC(10,6)
+MAX_NUMERIC_10_6 = 9999.999999
+
+# Колонка значений и маска заполненных: (values, mask)
+Column = Tuple[np.ndarray, np.ndarray]
+
+
+def section_columns(raw_data: IssResponse, name: str) -> Tuple[Dict[str, tuple], int]:
+    """Секция → (имя колонки → кортеж значений, число строк). Транспонирование — один проход zip на C."""
+    columns, data = raw_data.get(name, EMPTY_SECTION)
+    if not data:
+        return {column: () for column in columns}, 0
+    return dict(zip(columns, zip(*data))), len(data)
+
+
+def _present(values: Sequence, truthy: bool) -> Tuple[np.ndarray, np.ndarray]:
+    arr = np.array(values, dtype=object)
+    if truthy:
+        mask = np.fromiter(map(bool, values), dtype=bool, count=len(values))
+    else:
+        mask = np.not_equal(arr, None)
+    return arr, mask
+
+
+def floats(values: Sequence, truthy: bool = False, strict: bool = True) -> Column:
+    """
+    Колонка → float64 и маска. truthy=False — как `float(x) if x is not None`, truthy=True — как `float(x) if x`.
+    strict=False — непреобразуемое значение считается пустым (как try/except вокруг float()).
+    """
+    arr, mask = _present(values, truthy)
+    out = np.zeros(len(arr), dtype=np.float64)
+    try:
+        out[mask] = arr[mask].astype(np.float64)
+    except (TypeError, ValueError):
+        if strict:
+            raise
+        for i in np.flatnonzero(mask):
+            try:
+                out[i] = float(arr[i])
+            except (TypeError, ValueError):
+                mask[i] = False
+    return out, mask
+
+
+def ints(values: Sequence, truthy: bool = False) -> Column:
+    """Колонка → int64 и маска: как `int(x) if x is not None` (truthy=False) или `int(x) if x` (truthy=True)."""
+    arr, mask = _present(values, truthy)
+    out = np.zeros(len(arr), dtype=np.int64)
+    out[mask] = arr[mask].astype(np.int64)
+    return out, mask
+
+
+def parse_date(value) -> Optional[datetime.date]:
+    if not value:
+        return None
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+    except Exception:
+        return None
+
+
+def _wellformed_date(value) -> bool:
+    return (
+        isinstance(value, str) and len(value) == 10 and value[4] == "-" and value[7] == "-"
+        and value[:4].isdigit() and value[5:7].isdigit() and value[8:].isdigit() and value[:4] != "0000"
+    )
+
+
+def dates(values: Sequence) -> List[Optional[datetime.date]]:
+    """
+    Даты YYYY-MM-DD. Каждое уникальное значение разбирается один раз: корректные — одним
+    вызовом datetime64[D] на весь набор, остальное (заглушки 0000-00-00, 30 февраля, ...) — через parse_date.
+    """
+    unique = set(values)
+    parsed: Dict[Any, Optional[datetime.date]] = {}
+    wellformed = [value for value in unique if _wellformed_date(value)]
+    try:
+        parsed.update(zip(wellformed, np.array(wellformed, dtype="datetime64[D]").tolist()))
+    except ValueError:
+        # Хотя бы одна дата не существует — весь набор разбираем построчно
+        parsed.clear()
+    for value in unique:
+        if value not in parsed:
+            parsed[value] = parse_date(value)
+    return [parsed[value] for value in values]
+
+
+def keys(*parts: Sequence) -> np.ndarray:
+    """Составной ключ соединения (SECID, BOARDID, ...) → массив строк."""
+    result = np.array(parts[0], dtype=str)
+    for part in parts[1:]:
+        result = np.char.add(np.char.add(result, "\x1f"), np.array(part, dtype=str))
+    return result
+
+
+def last_index(key: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Уникальные ключи (отсортированы) и индекс последнего вхождения каждого —
+    как у словаря, в котором поздняя строка перезаписывает раннюю.
+    """
+    uniq, reversed_first = np.unique(key[::-1], return_index=True)
+    return uniq, len(key) - 1 - reversed_first
+
+
+def first_order(key: np.ndarray) -> np.ndarray:
+    """
+    Индексы строк с уникальными ключами в порядке первого вхождения, значение — из последнего:
+    ровно то, что даёт обход dict, заполненного построчно.
+    """
+    uniq, first = np.unique(key, return_index=True)
+    _, last = last_index(key)
+    return last[np.argsort(first)]
+
+
+def lookup(index: Tuple[np.ndarray, np.ndarray], query: np.ndarray) -> np.ndarray:
+    """Соединение по ключу: для каждого ключа query — индекс строки из last_index(...), -1 если пары нет."""
+    uniq, positions = index
+    if not len(uniq) or not len(query):
+        return np.full(len(query), -1, dtype=np.int64)
+    at = np.minimum(np.searchsorted(uniq, query), len(uniq) - 1)
+    return np.where(uniq[at] == query, positions[at], -1)
+
+
+def take(column: Column, rows: np.ndarray) -> Column:
+    """Значения колонки по индексам соединения; строки без пары (-1) — пустые."""
+    values, mask = column
+    found = rows >= 0
+    if not len(values):
+        return np.zeros(len(rows), dtype=values.dtype), np.zeros(len(rows), dtype=bool)
+    safe = np.where(found, rows, 0)
+    return values[safe], mask[safe] & found
+
+
+def take_raw(values: Sequence, rows: np.ndarray) -> List[Any]:
+    """Исходные значения (строки, числа как есть) по индексам соединения; -1 → None."""
+    return [values[i] if i >= 0 else None for i in rows.tolist()]
+
+
+def optional(column: Column, convert: Callable = None) -> List[Any]:
+    """Колонка → список Python-значений, пустые — None."""
+    values, mask = column
+    if convert is None:
+        return [v if m else None for v, m in zip(values.tolist(), mask.tolist())]
+    return [convert(v) if m else None for v, m in zip(values.tolist(), mask.tolist())]
+
+
+def rounded(column: Column, digits: int) -> List[Optional[float]]:
+    """
+    Округление, совпадающее с round(x, digits) до бита.
+    rint(x * 10**digits) / 10**digits даёт тот же результат, пока x * 10**digits далеко от
+    середины между целыми и меньше 2**40: целое N тогда определено однозначно, а деление двух
+    точных double — ближайший double к N / 10**digits, как и у round(). Остальные значения
+    (почти ровно ...5, огромные, inf/nan) округляются через round() поштучно.
+    """
+    values, mask = column
+    scale = 10.0 ** digits
+    with np.errstate(invalid="ignore", over="ignore"):
+        scaled = values * scale
+        result = (np.rint(scaled) / scale).tolist()
+        exact = (np.abs(scaled) < 2.0 ** 40) & (np.abs(scaled - np.floor(scaled) - 0.5) > 1e-3)
+    for i in np.flatnonzero(mask & ~exact).tolist():
+        result[i] = round(float(values[i]), digits)
+    return [v if m else None for v, m in zip(result, mask.tolist())]
+
+
+def numeric_10_6(column: Column) -> List[Optional[float]]:
+    """Значения для NUMERIC(10,6): выход за ±MAX_NUMERIC_10_6 обрезается с предупреждением, остальное — round(x, 6)."""
+    values, mask = column
+    over = mask & (np.abs(values) > MAX_NUMERIC_10_6)
+    result = rounded(column, 6)
+    for i in np.flatnonzero(over).tolist():
+        v = float(values[i])
+        logger.warning(f"Значение {v} обрезано до ±{MAX_NUMERIC_10_6} для NUMERIC(10,6)")
+        result[i] = MAX_NUMERIC_10_6 if v > 0 else -MAX_NUMERIC_10_6
+    return result
@@ -1,17 +1,26 @@
-import json
 from datetime import date, timedelta
-from typing import List, Dict, Any
+from typing import Any, Dict, List, Tuple
 import logging
 import time
 
-from scheduler.clients.moex_client import MOEXClient
-from scheduler.database.dao import insert_daily_candles
-from scheduler.database.engine import get_db
+from scheduler.clients.iss import EMPTY_SECTION, IssResponse
+from scheduler.clients.moex_client import declare_columns
+from scheduler.clients.shared import moex_client
+from scheduler.executor import run_cpu
+from scheduler.pipeline import Pipeline
+from scheduler.processors.sinks import publish_candles_batches, publish_partial, write_candles_batch
+from scheduler.settings import settings
 
 logger = logging.getLogger("scheduler.bond_candles")
 
+declare_columns(
+    "bonds",
+    marketdata_yields=("SECID", "BOARDID", "PRICE"),
+    marketdata=("SECID", "BOARDID", "VALTODAY"),
+)
 
-def get_bond_candles(raw_data: Dict) -> List[Dict[str, Any]]:
+
+def get_bond_candles(raw_data: IssResponse) -> List[Dict[str, Any]]:
     """
     Формирует список свечей для облигаций за вчерашний день.
 
@@ -27,8 +36,8 @@ def get_bond_candles(raw_data: Dict) -> List[Dict[str, Any]]:
     target_date = date.today() - timedelta(days=1)
 
     # === 1. Парсим marketdata_yields (источник облигаций и цены) ===
-    yields_data = raw_data.get("marketdata_yields", {}).get("data", [])
-    yields_columns = raw_data.get("marketdata_yields", {}).get("columns", [])
+    yields_data = raw_data.get("marketdata_yields", EMPTY_SECTION).data
+    yields_columns = raw_data.get("marketdata_yields", EMPTY_SECTION).columns
     if not yields_data or not yields_columns:
         return []
 
@@ -64,8 +73,8 @@ def get_bond_candles(raw_data: Dict) -> List[Dict[str, Any]]:
         return []
 
     # === 2. Парсим marketdata (для объёмов) ===
-    market_data = raw_data.get("marketdata", {}).get("data", [])
-    market_columns = raw_data.get("marketdata", {}).get("columns", [])
+    market_data = raw_data.get("marketdata", EMPTY_SECTION).data
+    market_columns = raw_data.get("marketdata", EMPTY_SECTION).columns
     if not market_data or not market_columns:
         # Если нет marketdata — все объёмы считаются 0 → исключаем все облигации
         return []
@@ -117,6 +126,12 @@ def get_bond_candles(raw_data: Dict) -> List[Dict[str, Any]]:
     return result
 
 
+async def parse_bond_candles(item: Tuple[str, IssResponse]) -> List[Dict[str, Any]]:
+    """Стадия конвейера: ответ одного режима торгов → свечи (в пуле CPU-стадий)."""
+    board, raw_data = item
+    return await run_cpu(get_bond_candles, raw_data)
+
+
 async def update_bond_daily_candles():
     """
     Ежедневная задача: формирует и сохраняет свечи по облигациям за вчерашний день.
@@ -126,28 +141,32 @@ async def update_bond_daily_candles():
 
     start_time = time.time()
 
-    async with MOEXClient() as client:
+    async with moex_client() as client:
         try:
-            # Предполагается, что этот метод возвращает:
-            # {
-            #   "marketdata_yields": { "columns": [...], "data": [...] },
-            #   "marketdata": { "columns": [...], "data": [...] }
-            # }
-            raw_data = await client.get_bonds()
-            if not raw_data:
-                logger.warning("[Bond Candles] ❌ Пустой ответ от API")
-                return
-
-            candles = get_bond_candles(raw_data)
-            if not candles:
+            # Те же запросы по режимам, что у котировок облигаций (колонки набора bonds общие):
+            # если котировки обновлялись в пределах MOEX_CACHE_TTL, ответы берутся из кеша.
+            # Каждый режим — {"marketdata_yields": IssSection, "marketdata": IssSection, ...}
+            # Режимы разбираются в пуле CPU-стадий по мере прихода, свечи пишутся пачками
+            pipeline = (
+                Pipeline("Bond Candles")
+                .source("fetch", client.iter_bonds_by_board())
+                .stage("parse", parse_bond_candles, workers=settings.CPU_EXECUTOR_WORKERS)
+                .sink("write", write_candles_batch)
+            )
+            try:
+                stats = await pipeline.run()
+            except Exception:
+                await publish_partial(pipeline, publish_candles_batches)
+                raise
+            saved = stats["write"].items_out
+            if not saved:
                 logger.warning("[Bond Candles] 📭 Нет валидных свечей для облигаций")
                 return
 
-            async with get_db() as db:
-                await insert_daily_candles(db, candles)
+            await publish_candles_batches(stats["write"].result)
 
             duration = time.time() - start_time
-            logger.info(f"[Bond Candles] ✅ Сохранено {len(candles)} свечей за {duration:.2f} сек")
+            logger.info(f"[Bond Candles] ✅ Сохранено {saved} свечей за {duration:.2f} сек")
 
         except Exception as e:
             logger.error(f"[Bond Candles] ❌ Ошибка: {e}", exc_info=True)
@@ -0,0 +1,200 @@
+# scheduler/processors/for_bonds_coupons.py
+
+import asyncio
+import time
+import logging
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from scheduler.clients.iss import EMPTY_SECTION, IssResponse, iss_to_dict
+from scheduler.clients.moex_client import MOEXClient
+from scheduler.clients.shared import moex_client
+from scheduler.database.dao import get_bonds_for_coupon_refresh, upsert_coupons
+from scheduler.database.engine import get_db
+from scheduler.settings import settings
+
+logger = logging.getLogger("scheduler.bonds_coupons")
+
+# Секция bondization → колонка с датой события
+EVENT_DATE_COLUMNS = {
+    "coupons": "coupondate",
+    "offers": "offerdate",
+    "amortizations": "amortdate",
+}
+
+# Колонки таблицы bond_events
+BOND_EVENT_COLUMNS = (
+    "secid", "seq", "event_type", "event_date", "face_value", "payment_amount",
+    "payment_amount_rub", "payment_percent", "record_date", "start_date",
+    "offer_start_date", "offer_end_date", "offer_price_percent", "offer_status", "currency",
+)
+
+
+def _to_float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _to_date(value) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        # ISS иногда отдаёт заглушки вроде 0000-00-00
+        return None
+
+
+def _section_rows(raw_data: IssResponse, section: str) -> List[Dict]:
+    columns, data = raw_data.get(section, EMPTY_SECTION)
+    return [dict(zip(columns, row)) for row in data]
+
+
+def parse_bond_events(secid: str, raw_data: IssResponse) -> List[Dict]:
+    """
+    Раскладывает bondization.json в строки таблицы bond_events — единственный разбор
+    bondization: шедулер один пишет bond_events, API их только читает.
+    Порядок (seq): купоны, оферты, амортизации, затем стабильная сортировка по дате события.
+    """
+    events: List[Dict] = []
+
+    for coupon in _section_rows(raw_data, "coupons"):
+        events.append({
+            "event_type": "COUPON",
+            "event_date": coupon.get("coupondate"),
+            "face_value": _to_float(coupon.get("facevalue")),
+            "payment_amount": _to_float(coupon.get("value")),
+            "payment_amount_rub": _to_float(coupon.get("value_rub")),
+            "payment_percent": _to_float(coupon.get("valueprc")),
+            "record_date": _to_date(coupon.get("recorddate")),
+            "start_date": _to_date(coupon.get("startdate")),
+            "currency": coupon.get("faceunit"),
+        })
+
+    for offer in _section_rows(raw_data, "offers"):
+        events.append({
+            "event_type": "OFFER",
+            "event_date": offer.get("offerdate"),
+            "face_value": _to_float(offer.get("facevalue")),
+            "payment_amount": _to_float(offer.get("value")),
+            "payment_amount_rub": _to_float(offer.get("value")),
+            "offer_start_date": _to_date(offer.get("offerdatestart")),
+            "offer_end_date": _to_date(offer.get("offerdateend")),
+            "offer_price_percent": _to_float(offer.get("price")),
+            "offer_status": offer.get("offertype"),
+            "currency": offer.get("faceunit"),
+        })
+
+    for amort in _section_rows(raw_data, "amortizations"):
+        is_maturity = (amort.get("data_source") or "").lower() == "maturity"
+        events.append({
+            "event_type": "MATURITY" if is_maturity else "AMORTIZATION",
+            "event_date": amort.get("amortdate"),
+            "face_value": _to_float(amort.get("facevalue")),
+            "payment_amount": _to_float(amort.get("value")),
+            "payment_amount_rub": _to_float(amort.get("value_rub")),
+            "payment_percent": _to_float(amort.get("valueprc")),
+            "currency": amort.get("faceunit"),
+        })
+
+    # События без даты в календарь не попадают
+    events = [event for event in events if _to_date(event["event_date"]) is not None]
+    events.sort(key=lambda event: event["event_date"])
+
+    # Многострочный INSERT требует одинаковый набор ключей во всех строках
+    return [
+        {
+            **dict.fromkeys(BOND_EVENT_COLUMNS),
+            **event,
+            "secid": secid,
+            "seq": seq,
+            "event_date": _to_date(event["event_date"]),
+        }
+        for seq, event in enumerate(events)
+    ]
+
+
+def get_next_event_date(raw_data: IssResponse, today: Optional[date] = None) -> Optional[date]:
+    """
+    Ближайшая дата купона, оферты или амортизации строго после today.
+    Когда она наступит, кеш по бумаге считается устаревшим (next_event_date <= current_date);
+    событие сегодняшнего дня уже не ближайшее — иначе бумага перезагружалась бы весь день.
+    """
+    today_str = (today or date.today()).isoformat()
+    nearest = None
+
+    for section, date_column in EVENT_DATE_COLUMNS.items():
+        columns, data = raw_data.get(section, EMPTY_SECTION)
+        if date_column not in columns:
+            continue
+        idx = columns.index(date_column)
+        for row in data:
+            value = row[idx]
+            # Даты ISS в формате YYYY-MM-DD сравниваются лексикографически
+            if value and value > today_str and (nearest is None or value < nearest):
+                nearest = value
+
+    if nearest is None:
+        return None
+    try:
+        return datetime.strptime(nearest, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+async def fetch_bondization_batch(client: MOEXClient, secids: List[str], semaphore: asyncio.Semaphore) -> List[Dict]:
+    """Параллельно скачивает bondization для пачки бумаг; ошибки по отдельным бумагам не валят пачку."""
+
+    async def fetch_one(secid: str) -> Optional[Dict]:
+        async with semaphore:
+            try:
+                raw_data = await client.get_bondization(secid)
+            except Exception as e:
+                logger.warning(f"[Bond Coupons] Не удалось получить bondization для {secid}: {e}")
+                return None
+        return {
+            "secid": secid,
+            # В БД кеш хранится в JSON-виде ISS: его читает API
+            "data": iss_to_dict(raw_data),
+            "next_event_date": get_next_event_date(raw_data),
+            "events": parse_bond_events(secid, raw_data),
+        }
+
+    results = await asyncio.gather(*(fetch_one(secid) for secid in secids))
+    return [row for row in results if row is not None]
+
+
+async def update_bond_coupons():
+    """
+    Предзагрузка купонов/оферт/амортизаций по всей вселенной облигаций.
+    Обновляются только бумаги без кеша, с истёкшим TTL или с уже наступившим событием.
+    """
+    logger.info("[Bond Coupons] Запуск предзагрузки bondization...")
+    start_time = time.time()
+
+    try:
+        async with get_db() as db:
+            secids = await get_bonds_for_coupon_refresh(db, settings.COUPONS_PREFETCH_TTL_HOURS)
+
+        if not secids:
+            logger.info("[Bond Coupons] Кеш актуален — обновлять нечего")
+            return
+
+        logger.info(f"[Bond Coupons] К обновлению {len(secids)} облигаций")
+        semaphore = asyncio.Semaphore(settings.COUPONS_PREFETCH_CONCURRENCY)
+        batch_size = settings.COUPONS_PREFETCH_BATCH_SIZE
+        saved = 0
+
+        async with moex_client() as client:
+            for i in range(0, len(secids), batch_size):
+                rows = await fetch_bondization_batch(client, secids[i:i + batch_size], semaphore)
+                if not rows:
+                    continue
+                async with get_db() as db:
+                    await upsert_coupons(db, rows, dataset="coupons")
+                saved += len(rows)
+
+        duration = time.time() - start_time
+        logger.info(f"[Bond Coupons] ✅ Обновлено {saved} из {len(secids)} облигаций за {duration:.2f} сек")
+
+    except Exception as e:
+        logger.error(f"[Bond Coupons] ❌ Ошибка: {e}", exc_info=True)
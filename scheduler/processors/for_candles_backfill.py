@@ -0,0 +1,314 @@
+# scheduler/processors/for_candles_backfill.py
+"""
+Догрузка истории дневных свечей из /iss/history.
+Ночные задачи добавляют по одной свече на тикер за вчерашний день, поэтому любой простой,
+пропущенный cron или новая бумага оставляют в candles дыру навсегда. Догрузка находит
+пропущенные диапазоны (ticker, даты), параллельно листает историю по каждому тикеру под общим
+MOEX_RATE_LIMIT и пишет свечи пачками через COPY. Прогресс хранится в candles_backfill:
+курсор страниц фиксируется в той же транзакции, что и свечи, поэтому прерванный проход
+продолжается с места остановки.
+"""
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from scheduler.clients.iss import EMPTY_SECTION, IssResponse
+from scheduler.clients.moex_client import MOEXClient
+from scheduler.clients.shared import moex_client
+from scheduler.database.dao import (
+    add_backfill_ranges, collapse_backfill_ranges, get_backfill_ranges, get_backfill_status,
+    get_backfill_universe, get_candle_islands, get_candles_last_date, save_backfill_batch,
+)
+from scheduler.database.engine import get_db
+from scheduler.pipeline import Pipeline, each
+from scheduler.processors.sinks import publish_candles_batches, publish_partial
+from scheduler.settings import settings
+
+logger = logging.getLogger("scheduler.candles_backfill")
+
+# Страница /iss/history — до 100 торговых дней, это ≈ 140 календарных. Пропуски, между
+# которыми меньше, дешевле забрать одним диапазоном: уже записанные свечи просто проигнорируются
+MERGE_GAP_DAYS = 140
+
+# Догрузка и плановый поиск пропусков не должны листать одни и те же диапазоны одновременно
+_backfill_lock = asyncio.Lock()
+
+
+class HistorySource(NamedTuple):
+    """Рынок ISS и колонки истории, из которых собирается свеча."""
+    engine: str
+    market: str
+    close_columns: Tuple[str, ...]  # первая непустая — цена закрытия
+    volume_column: str
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return ("TRADEDATE", *self.close_columns, self.volume_column)
+
+
+# Тип инструмента → источник истории. Объём — в тех же единицах, что у ночных задач свечей:
+# штуки для акций и фондов (VOLTODAY), деньги для облигаций и индексов (VALTODAY)
+HISTORY_SOURCES: Dict[str, HistorySource] = {
+    "stock": HistorySource("stock", "shares", ("CLOSE", "LEGALCLOSEPRICE"), "VOLUME"),
+    "fund": HistorySource("stock", "shares", ("CLOSE", "LEGALCLOSEPRICE"), "VOLUME"),
+    "bond": HistorySource("stock", "bonds", ("CLOSE", "LEGALCLOSEPRICE"), "VALUE"),
+    "index": HistorySource("stock", "index", ("CLOSE",), "VALUE"),
+}
+
+
+class BackfillRange(NamedTuple):
+    """Диапазон догрузки из candles_backfill; next_start — курсор страниц ISS."""
+    ticker: str
+    boardid: str
+    instrument_type: str
+    date_from: date
+    date_till: date
+    next_start: int = 0
+
+
+class HistoryPage(NamedTuple):
+    """Страница истории: свечи и состояние диапазона после неё — для чекпоинта."""
+    range: BackfillRange
+    rows: List[Dict[str, Any]]
+    next_start: int
+    done: bool
+
+
+def missing_ranges(
+        target_from: date,
+        target_till: date,
+        covered: Sequence[Tuple[date, date]],
+        merge_days: int = MERGE_GAP_DAYS,
+) -> List[Tuple[date, date]]:
+    """
+    Части [target_from, target_till], не покрытые ни одним из covered (участки свечей
+    и уже заведённые диапазоны). Пропуски ближе merge_days друг к другу склеиваются.
+    """
+    one_day = timedelta(days=1)
+    gaps: List[Tuple[date, date]] = []
+    cursor = target_from
+    for start, end in sorted(covered):
+        if cursor > target_till or start > target_till:
+            break
+        if end < cursor:
+            continue
+        if start > cursor:
+            gaps.append((cursor, start - one_day))
+        cursor = max(cursor, end + one_day)
+    if cursor <= target_till:
+        gaps.append((cursor, target_till))
+
+    merged: List[Tuple[date, date]] = []
+    for start, end in gaps:
+        if merged and (start - merged[-1][1]).days <= merge_days:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def parse_history_page(raw_data: IssResponse, item: BackfillRange, start: int) -> Tuple[List[Dict[str, Any]], int, bool]:
+    """
+    Страница /iss/history → (свечи, курсор следующей страницы, диапазон дочитан).
+    Правила отбора те же, что у ночных задач: без цены закрытия или с нулевым объёмом — пропуск.
+    """
+    source = HISTORY_SOURCES[item.instrument_type]
+    columns, data = raw_data.get("history", EMPTY_SECTION)
+    idx = {column: i for i, column in enumerate(columns)}
+    close_idx = [idx[column] for column in source.close_columns if column in idx]
+
+    rows = []
+    for row in data:
+        try:
+            close = next((row[i] for i in close_idx if row[i] is not None), None)
+            volume = row[idx[source.volume_column]]
+            if close is None or volume in (None, "", 0, "0"):
+                continue
+            volume = int(float(volume))
+            if volume <= 0:
+                continue
+            rows.append({
+                "ticker": item.ticker,
+                "date": datetime.strptime(row[idx["TRADEDATE"]], "%Y-%m-%d").date(),
+                "close": float(close),
+                "volume": volume,
+            })
+        except (KeyError, IndexError, TypeError, ValueError):
+            # Битые строки пропускаем, как и в ночных задачах
+            continue
+
+    cursor_columns, cursor_data = raw_data.get("history.cursor", EMPTY_SECTION)
+    if cursor_data and {"INDEX", "TOTAL", "PAGESIZE"}.issubset(cursor_columns):
+        cursor = dict(zip(cursor_columns, cursor_data[0]))
+        next_start = int(cursor["INDEX"]) + int(cursor["PAGESIZE"])
+        return rows, next_start, next_start >= int(cursor["TOTAL"])
+
+    # Без курсора листаем, пока ISS не вернёт пустую страницу
+    return rows, start + len(data), not data
+
+
+async def fetch_history_pages(client: MOEXClient, item: BackfillRange) -> AsyncIterator[HistoryPage]:
+    """
+    Стадия конвейера: страницы истории диапазона по порядку, начиная с сохранённого курсора.
+    Если ISS не ответил, диапазон остаётся незавершённым и продолжится при следующем запуске.
+    """
+    source = HISTORY_SOURCES[item.instrument_type]
+    start = item.next_start
+    while True:
+        try:
+            raw_data = await client.get_history(
+                source.engine, source.market, item.boardid, item.ticker,
+                item.date_from, item.date_till, source.columns, start,
+            )
+        except Exception as e:
+            logger.warning(f"[Candles Backfill] {item.ticker}: история с {start} не получена ({e}) — продолжим позже")
+            return
+
+        rows, next_start, done = parse_history_page(raw_data, item, start)
+        # Курсор не сдвинулся — дальше страниц нет
+        done = done or next_start <= start
+        yield HistoryPage(item, rows, next_start, done)
+        if done:
+            return
+        start = next_start
+
+
+async def write_history_pages(pages: List[HistoryPage]) -> int:
+    """Стадия записи: свечи пачки и последний курсор каждого её диапазона — одной транзакцией."""
+    checkpoints: Dict[Tuple[str, date], Dict[str, Any]] = {}
+    for page in pages:
+        key = (page.range.ticker, page.range.date_from)
+        previous = checkpoints.get(key)
+        checkpoints[key] = {
+            "ticker": page.range.ticker,
+            "date_from": page.range.date_from,
+            "next_start": page.next_start,
+            "rows": len(page.rows) + (previous["rows"] if previous else 0),
+            "done": page.done,
+        }
+
+    candles = [row for page in pages for row in page.rows]
+    async with get_db() as db:
+        return await save_backfill_batch(db, candles, list(checkpoints.values()))
+
+
+async def plan_backfill(today: Optional[date] = None) -> List[BackfillRange]:
+    """
+    Диапазоны к догрузке: незавершённые из прошлых проходов плюс новые пропуски.
+    Покрытым считается всё, где свечи идут без разрывов больше CANDLES_BACKFILL_GAP_DAYS,
+    и всё, что уже было заведено в candles_backfill (история там проверена или проверяется).
+    """
+    target_from = settings.CANDLES_BACKFILL_FROM
+    target_till = (today or date.today()) - timedelta(days=1)
+
+    async with get_db() as db:
+        universe = await get_backfill_universe(db, list(HISTORY_SOURCES))
+        islands = await get_candle_islands(db, target_from, settings.CANDLES_BACKFILL_GAP_DAYS)
+        checkpoints = await get_backfill_ranges(db)
+
+    known: Dict[str, List] = {}
+    for checkpoint in checkpoints:
+        known.setdefault(checkpoint.ticker, []).append(checkpoint)
+
+    ranges = [
+        BackfillRange(c.ticker, c.boardid, c.instrument_type, c.date_from, c.date_till, c.next_start)
+        for c in checkpoints if not c.done
+    ]
+    new_ranges: List[Dict[str, Any]] = []
+    collapse: List[str] = []
+    for ticker, boardid, instrument_type in universe:
+        ticker_checkpoints = known.get(ticker, [])
+        covered = islands.get(ticker, []) + [(c.date_from, c.date_till) for c in ticker_checkpoints]
+        gaps = missing_ranges(target_from, target_till, covered)
+        for date_from, date_till in gaps:
+            new_ranges.append({
+                "ticker": ticker, "date_from": date_from, "date_till": date_till,
+                "boardid": boardid, "instrument_type": instrument_type,
+            })
+            ranges.append(BackfillRange(ticker, boardid, instrument_type, date_from, date_till))
+        if not gaps and len(ticker_checkpoints) > 1 and all(c.done for c in ticker_checkpoints):
+            collapse.append(ticker)
+
+    async with get_db() as db:
+        await add_backfill_ranges(db, new_ranges)
+        await collapse_backfill_ranges(db, collapse)
+    return ranges
+
+
+async def backfill_candles():
+    """
+    Поиск пропусков в candles и догрузка их из истории ISS конвейером:
+    диапазоны → страницы истории (CANDLES_BACKFILL_CONCURRENCY тикеров параллельно) → запись пачками.
+    """
+    if _backfill_lock.locked():
+        logger.info("[Candles Backfill] Догрузка уже идёт — пропускаем запуск")
+        return
+
+    async with _backfill_lock:
+        logger.info("[Candles Backfill] 🕰 Поиск пропусков в истории свечей...")
+        start_time = time.time()
+
+        try:
+            ranges = await plan_backfill()
+            if not ranges:
+                logger.info("[Candles Backfill] ✅ История свечей без пропусков")
+                return
+
+            tickers = len({item.ticker for item in ranges})
+            logger.info(f"[Candles Backfill] К догрузке {len(ranges)} диапазонов по {tickers} тикерам")
+
+            async with moex_client() as client:
+                pipeline = (
+                    Pipeline("Candles Backfill")
+                    .source("plan", each(ranges))
+                    .stage("fetch", partial(fetch_history_pages, client), workers=settings.CANDLES_BACKFILL_CONCURRENCY)
+                    .sink("write", write_history_pages, weight=lambda page: len(page.rows))
+                )
+                try:
+                    stats = await pipeline.run()
+                except Exception:
+                    await publish_partial(pipeline, publish_candles_batches)
+                    raise
+
+            inserted = stats["write"].result
+            await publish_candles_batches(inserted)
+
+            duration = time.time() - start_time
+            logger.info(
+                f"[Candles Backfill] ✅ Догружено {inserted} свечей ({stats['write'].items_out} из истории, "
+                f"{stats['fetch'].items_out} страниц) за {duration:.2f} сек"
+            )
+
+        except Exception as e:
+            logger.error(f"[Candles Backfill] ❌ Ошибка: {e}", exc_info=True)
+
+
+async def backfill_candles_after_downtime():
+    """
+    Запуск шедулера: догрузка нужна, если она ещё ни разу не проходила, если прошлый проход
+    прервался или если последней свече больше CANDLES_BACKFILL_MAX_LAG_DAYS дней (шедулер стоял).
+    """
+    try:
+        async with get_db() as db:
+            last_date = await get_candles_last_date(db)
+            total, pending = await get_backfill_status(db)
+    except Exception as e:
+        logger.error(f"[Candles Backfill] ❌ Не удалось проверить состояние свечей: {e}", exc_info=True)
+        return
+
+    lag = (date.today() - last_date).days if last_date else None
+    if not total:
+        reason = "догрузка ещё не запускалась"
+    elif pending:
+        reason = f"незавершённых диапазонов: {pending}"
+    elif lag is None or lag > settings.CANDLES_BACKFILL_MAX_LAG_DAYS:
+        reason = f"последняя свеча {last_date}" if last_date else "свечей нет"
+    else:
+        logger.info(f"[Candles Backfill] Простоя не было (последняя свеча {last_date}) — догрузка не нужна")
+        return
+
+    logger.info(f"[Candles Backfill] Запуск после простоя: {reason}")
+    await backfill_candles()
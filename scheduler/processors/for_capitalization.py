@@ -1,22 +1,25 @@
 import time
 import logging
-from scheduler.clients.moex_client import MOEXClient
+from collections.abc import Mapping
+from scheduler.clients.iss import EMPTY_SECTION, IssResponse
+from scheduler.clients.shared import moex_client
 from scheduler.database.dao import upsert_market_cap_data
 from scheduler.database.engine import get_db
+from scheduler.executor import run_cpu
 
 logger = logging.getLogger("scheduler.capitalization")
 
-def process_capitalization(raw_data):
+def process_capitalization(raw_data: IssResponse):
     result = []
 
     # capitalization → TRADEDATE = "2025-09-29"
-    cap_section = raw_data.get("capitalization", {}).get("data")
+    cap_section = raw_data.get("capitalization", EMPTY_SECTION).data
     if cap_section:
         cap_value, trade_date = cap_section[0]
         result.append({"timestamp": trade_date, "cap": cap_value})
 
     # issuecapitalization → UPDATETIME = "2025-09-30 15:16:00"
-    issue_section = raw_data.get("issuecapitalization", {}).get("data")
+    issue_section = raw_data.get("issuecapitalization", EMPTY_SECTION).data
     if issue_section:
         cap_value, update_time = issue_section[0]
         date_only = update_time.split(" ")[0]  # ← берём только дату
@@ -29,20 +32,20 @@ async def update_capitalization():
     logger.info("[Capitalization] Запуск сбора данных...")
     start_time = time.time()
 
-    async with MOEXClient() as client:
+    async with moex_client() as client:
         try:
             raw_data = await client.get_capitalization()
-            if not raw_data or not isinstance(raw_data, dict):
+            if not raw_data or not isinstance(raw_data, Mapping):
                 logger.warning("[Capitalization] Пустой или некорректный ответ от API")
                 return
 
-            processed_data = process_capitalization(raw_data)
+            processed_data = await run_cpu(process_capitalization, raw_data)
             if not processed_data:
                 logger.warning("[Capitalization] Нет данных для сохранения после обработки")
                 return
 
             async with get_db() as db:
-                await upsert_market_cap_data(db, processed_data)
+                await upsert_market_cap_data(db, processed_data, dataset="capitalization")
 
             duration = time.time() - start_time
             logger.info(f"[Capitalization] ✅ Успешно сохранено {len(processed_data)} записей за {duration:.2f} сек")
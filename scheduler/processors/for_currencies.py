@@ -3,7 +3,7 @@
 import asyncio
 import logging
 
-from scheduler.clients.cbr_client import CBRClient
+from scheduler.clients.shared import cbr_client
 from scheduler.database.dao import upsert_market_data
 from scheduler.database.engine import get_db
 
@@ -18,7 +18,7 @@ async def update_currencies():
     logger.info("[Currencies] Запуск сбора данных...")
     start_time = asyncio.get_event_loop().time()
 
-    async with CBRClient() as client:
+    async with cbr_client() as client:
         try:
             # CBRClient.get_currency_today() возвращает List[Dict], готовый к upsert
             raw_data = await client.get_currency_today()
@@ -29,7 +29,7 @@ async def update_currencies():
             logger.debug(f"[Currencies] Получено {len(raw_data)} валют")
 
             async with get_db() as db:
-                await upsert_market_data(db, raw_data)
+                await upsert_market_data(db, raw_data, dataset="forex")
 
             duration = asyncio.get_event_loop().time() - start_time
             logger.info(f"[Currencies] ✅ Успешно сохранено {len(raw_data)} валют за {duration:.2f} сек")
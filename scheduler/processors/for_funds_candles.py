@@ -1,31 +1,36 @@
 # scheduler/processors/for_funds_candles.py
 
 from datetime import datetime
-from typing import List, Dict, Any
-from scheduler.clients.moex_client import MOEXClient
-from scheduler.database.dao import insert_daily_candles
-from scheduler.database.engine import get_db
+from typing import Any, Dict, List, Optional
+from scheduler.clients.iss import IssResponse
+from scheduler.clients.moex_client import declare_columns
+from scheduler.clients.shared import moex_client
+from scheduler.executor import run_cpu
+from scheduler.pipeline import Pipeline, once
+from scheduler.processors.sinks import publish_candles_batches, publish_partial, write_candles_batch
 import logging
 import time
 
 logger = logging.getLogger("scheduler.funds_candles")
 
+declare_columns("funds", marketdata=("SECID", "VOLTODAY", "SYSTIME", "CLOSEPRICE", "LAST"))
 
-def get_funds_candles(raw_data: dict) -> List[Dict[str, Any]]:
+
+def get_funds_candles(raw_data: IssResponse) -> List[Dict[str, Any]]:
     """
     Парсит данные по фондам (ETF/ПИФ) с MOEX и возвращает дневные свечи.
     Использует CLOSEPRICE, если доступен; иначе — LAST.
     Работает с любыми boardid (TQTF, TQIF и др.), если структура marketdata одинакова.
 
-    :param raw_data: Ответ от MOEX API (секции securities + marketdata)
+    :param raw_data: Секции ответа MOEX API (securities + marketdata)
     :return: Список свечей: [{"ticker": str, "date": date, "close": float, "volume": int}, ...]
     """
     marketdata = raw_data.get("marketdata")
-    if not marketdata or "data" not in marketdata or "columns" not in marketdata:
+    if not marketdata or not marketdata.columns:
         raise ValueError("Отсутствует или повреждён раздел 'marketdata'")
 
-    columns = marketdata["columns"]
-    rows = marketdata["data"]
+    columns = marketdata.columns
+    rows = marketdata.data
 
     # Обязательные поля (SYSTIME и SECID всегда нужны; CLOSEPRICE или LAST — опционально взаимозаменяемы)
     required_cols = {"SECID", "VOLTODAY", "SYSTIME"}
@@ -103,6 +108,14 @@ def get_funds_candles(raw_data: dict) -> List[Dict[str, Any]]:
     return result
 
 
+async def parse_funds_candles(raw_data: IssResponse) -> Optional[List[Dict[str, Any]]]:
+    """Стадия конвейера: ответ площадки → свечи (в пуле CPU-стадий)."""
+    if not raw_data or "marketdata" not in raw_data:
+        logger.warning("[Funds Candles] ❌ Пустой ответ от API")
+        return None
+    return await run_cpu(get_funds_candles, raw_data)
+
+
 async def update_funds_daily_candles(boardid: str):
     """
     Универсальная задача обновления дневных свечей по фондам на указанной площадке.
@@ -111,30 +124,36 @@ async def update_funds_daily_candles(boardid: str):
 
     start_time = time.time()
 
-    async with MOEXClient() as client:
+    async with moex_client() as client:
         try:
             # Выбираем метод в зависимости от boardid
             if boardid == "TQTF":
-                raw_data = await client.get_tqtf_funds()
+                fetch = client.get_tqtf_funds()
             elif boardid == "TQIF":
-                raw_data = await client.get_tqif_funds()
+                fetch = client.get_tqif_funds()
             else:
                 raise ValueError(f"Не поддерживаемый boardid: {boardid}")
 
-            if not raw_data or "marketdata" not in raw_data:
-                logger.warning(f"[Funds Candles | {boardid}] ❌ Пустой ответ от API")
-                return
-
-            candles = get_funds_candles(raw_data)  # ← boardid больше не передаётся
-            if not candles:
+            pipeline = (
+                Pipeline(f"Funds Candles | {boardid}")
+                .source("fetch", once(fetch))
+                .stage("parse", parse_funds_candles)
+                .sink("write", write_candles_batch)
+            )
+            try:
+                stats = await pipeline.run()
+            except Exception:
+                await publish_partial(pipeline, publish_candles_batches)
+                raise
+            saved = stats["write"].items_out
+            if not saved:
                 logger.warning(f"[Funds Candles | {boardid}] 📭 Нет валидных свечей для сохранения")
                 return
 
-            async with get_db() as db:
-                await insert_daily_candles(db, candles)
+            await publish_candles_batches(stats["write"].result)
 
             duration = time.time() - start_time
-            logger.info(f"[Funds Candles | {boardid}] ✅ Сохранено {len(candles)} свечей за {duration:.2f} сек")
+            logger.info(f"[Funds Candles | {boardid}] ✅ Сохранено {saved} свечей за {duration:.2f} сек")
 
         except Exception as e:
             logger.error(f"[Funds Candles | {boardid}] ❌ Ошибка: {e}", exc_info=True)
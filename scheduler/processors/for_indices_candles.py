@@ -1,11 +1,13 @@
 # scheduler/processors/for_indices_candles.py
 
-import json
 from datetime import datetime
-from typing import List, Dict, Any
-from scheduler.clients.moex_client import MOEXClient
-from scheduler.database.dao import insert_daily_candles
-from scheduler.database.engine import get_db
+from typing import Any, Dict, List, Optional
+from scheduler.clients.iss import IssResponse
+from scheduler.clients.moex_client import declare_columns
+from scheduler.clients.shared import moex_client
+from scheduler.executor import run_cpu
+from scheduler.pipeline import Pipeline, once
+from scheduler.processors.sinks import publish_candles_batches, publish_partial, write_candles_batch
 import logging
 import time
 
@@ -14,21 +16,23 @@ logger = logging.getLogger("scheduler.indices_candles")
 # Допустимые площадки для индексов
 VALID_BOARDIDS = {"RTSI", "SNDX"}
 
+declare_columns("indexes", marketdata=("SECID", "BOARDID", "TRADEDATE", "CURRENTVALUE", "VALTODAY"))
 
-def get_indices_candles(raw_data: dict) -> List[Dict[str, Any]]:
+
+def get_indices_candles(raw_data: IssResponse) -> List[Dict[str, Any]]:
     """
     Парсит ответ от API Московской биржи по индексам и возвращает список свечей.
     Дата берётся из поля TRADEDATE (уже в формате YYYY-MM-DD).
 
-    :param raw_data: Словарь с данными от API (ожидается структура как от /iss/engines/stock/markets/index/...)
+    :param raw_data: Секции ответа API (как от /iss/engines/stock/markets/index/...)
     :return: Список словарей: [{"ticker": str, "date": date, "close": float, "volume": int}, ...]
     """
     marketdata = raw_data.get("marketdata")
     if not marketdata:
         raise ValueError("Отсутствует ключ 'marketdata' в ответе")
 
-    columns = marketdata.get("columns")
-    rows = marketdata.get("data")
+    columns = marketdata.columns
+    rows = marketdata.data
 
     if not columns or not rows:
         return []
@@ -95,6 +99,14 @@ def get_indices_candles(raw_data: dict) -> List[Dict[str, Any]]:
     return result
 
 
+async def parse_indices_candles(raw_data: IssResponse) -> Optional[List[Dict[str, Any]]]:
+    """Стадия конвейера: ответ по индексам → свечи (в пуле CPU-стадий)."""
+    if not raw_data or "marketdata" not in raw_data:
+        logger.warning("[Indices Candles] ❌ Пустой или некорректный ответ от API")
+        return None
+    return await run_cpu(get_indices_candles, raw_data)
+
+
 async def update_indices_daily_candles():
     """
     Ежедневная задача: получает данные по индексам с MOEX и сохраняет дневные свечи.
@@ -104,26 +116,29 @@ async def update_indices_daily_candles():
 
     start_time = time.time()
 
-    async with MOEXClient() as client:
+    async with moex_client() as client:
         try:
-            # Получаем данные по индексам (тот же эндпоинт, что и в for_indices.py)
-            raw_data = await client.get_indexes()
-            if not raw_data or "marketdata" not in raw_data:
-                logger.warning("[Indices Candles] ❌ Пустой или некорректный ответ от API")
-                return
-
-            # Парсим свечи
-            candles = get_indices_candles(raw_data)
-            if not candles:
+            # Тот же эндпоинт, что и в for_indices.py: запрос → свечи → запись пачками
+            pipeline = (
+                Pipeline("Indices Candles")
+                .source("fetch", once(client.get_indexes()))
+                .stage("parse", parse_indices_candles)
+                .sink("write", write_candles_batch)
+            )
+            try:
+                stats = await pipeline.run()
+            except Exception:
+                await publish_partial(pipeline, publish_candles_batches)
+                raise
+            saved = stats["write"].items_out
+            if not saved:
                 logger.warning("[Indices Candles] 📭 Нет валидных свечей для сохранения")
                 return
 
-            # Сохраняем в БД
-            async with get_db() as db:
-                await insert_daily_candles(db, candles)
+            await publish_candles_batches(stats["write"].result)
 
             duration = time.time() - start_time
-            logger.info(f"[Indices Candles] ✅ Сохранено {len(candles)} свечей за {duration:.2f} сек")
+            logger.info(f"[Indices Candles] ✅ Сохранено {saved} свечей за {duration:.2f} сек")
 
         except Exception as e:
             logger.error(f"[Indices Candles] ❌ Ошибка при обновлении свечей: {e}", exc_info=True)
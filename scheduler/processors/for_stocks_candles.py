@@ -1,32 +1,31 @@
-import json
 from datetime import date, timedelta
-from typing import List, Dict, Any
-from scheduler.clients.moex_client import MOEXClient
-from scheduler.database.dao import insert_daily_candles  # ← твоя новая функция вставки
-from scheduler.database.engine import get_db
+from typing import Any, Dict, List, Optional
+from scheduler.clients.iss import IssResponse
+from scheduler.clients.moex_client import declare_columns
+from scheduler.clients.shared import moex_client
+from scheduler.executor import run_cpu
+from scheduler.pipeline import Pipeline, once
+from scheduler.processors.sinks import publish_candles_batches, publish_partial, write_candles_batch
 import logging
 import time
 
 logger = logging.getLogger("scheduler.candles")
 
-def get_stocks_candles(raw_data: str) -> List[Dict[str, Any]]:
+declare_columns("stocks", marketdata=("SECID", "LAST", "VOLTODAY"))
+
+def get_stocks_candles(raw_data: IssResponse) -> List[Dict[str, Any]]:
     """
     Парсит ответ от API Московской биржи и возвращает список свечей за вчерашний день.
 
-    :param raw_data: Строка JSON с данными от API (должна содержать ключ "marketdata")
+    :param raw_data: Секции ответа API (должна быть секция "marketdata")
     :return: Список словарей с ключами: ticker, date, close, volume
     """
-    try:
-        data = json.loads(raw_data)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Некорректный JSON: {e}")
-
-    marketdata = data.get("marketdata")
+    marketdata = raw_data.get("marketdata")
     if not marketdata:
         raise ValueError("Отсутствует ключ 'marketdata' в ответе")
 
-    columns = marketdata.get("columns")
-    rows = marketdata.get("data")
+    columns = marketdata.columns
+    rows = marketdata.data
 
     if not columns or not rows:
         return []
@@ -73,6 +72,14 @@ def get_stocks_candles(raw_data: str) -> List[Dict[str, Any]]:
     return result
 
 
+async def parse_stocks_candles(raw_data: IssResponse) -> Optional[List[Dict[str, Any]]]:
+    """Стадия конвейера: ответ рынка акций → свечи (в пуле CPU-стадий)."""
+    if not raw_data or "marketdata" not in raw_data:
+        logger.warning("[Candles] ❌ Пустой или некорректный ответ от API")
+        return None
+    return await run_cpu(get_stocks_candles, raw_data)
+
+
 async def update_daily_candles():
     """
     Ежедневная задача: получает данные с MOEX за вчерашний день и сохраняет свечи.
@@ -82,29 +89,29 @@ async def update_daily_candles():
 
     start_time = time.time()
 
-    async with MOEXClient() as client:
+    async with moex_client() as client:
         try:
-            # 1. Получаем только marketdata с нужными колонками
-            raw_data = await client.get_stocks()
-            if not raw_data or "marketdata" not in raw_data:
-                logger.warning("[Candles] ❌ Пустой или некорректный ответ от API")
-                return
-
-            # 2. Преобразуем в JSON-строку (если твоя функция требует str)
-            raw_json_str = json.dumps(raw_data, ensure_ascii=False)
-
-            # 3. Парсим в список свечей (с вчерашней датой и без null)
-            candles = get_stocks_candles(raw_json_str)
-            if not candles:
+            # Запрос → свечи (с вчерашней датой и без null) → запись пачками, дубликаты игнорируются
+            pipeline = (
+                Pipeline("Candles")
+                .source("fetch", once(client.get_stocks()))
+                .stage("parse", parse_stocks_candles)
+                .sink("write", write_candles_batch)
+            )
+            try:
+                stats = await pipeline.run()
+            except Exception:
+                await publish_partial(pipeline, publish_candles_batches)
+                raise
+            saved = stats["write"].items_out
+            if not saved:
                 logger.warning("[Candles] 📭 Нет валидных свечей для сохранения")
                 return
 
-            # 4. Сохраняем в БД (игнорируем дубликаты)
-            async with get_db() as db:
-                await insert_daily_candles(db, candles)
+            await publish_candles_batches(stats["write"].result)
 
             duration = time.time() - start_time
-            logger.info(f"[Candles] ✅ Сохранено {len(candles)} свечей за {duration:.2f} сек")
+            logger.info(f"[Candles] ✅ Сохранено {saved} свечей за {duration:.2f} сек")
 
         except Exception as e:
             logger.error(f"[Candles] ❌ Ошибка при обновлении свечей: {e}", exc_info=True)
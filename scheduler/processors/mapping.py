@@ -0,0 +1,265 @@
+# scheduler/processors/mapping.py
+"""
+Декларативный маппинг секций ISS (marketdata + securities) в строки market_data.
+Процессор описывает поля, их типы, фильтры и производные метрики (Mapping), а движок
+один раз на схему ответа — набор колонок секции — генерирует специализированную функцию
+разбора строки: позиции колонок, нормализация "" → None, приведение типов и формулы метрик
+вшиты в код, поэтому в цикле по строкам нет ни поиска по col_idx, ни обхода словарей
+маппинга, ни вызовов функций на каждую метрику.
+"""
+import logging
+import textwrap
+from itertools import repeat
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from scheduler.clients.iss import IssResponse
+
+logger = logging.getLogger("scheduler.mapping")
+
+# Имена, занятые самим сгенерированным кодом: ключи строк с такими именами недопустимы
+_RESERVED = {"row", "infos", "sec", "info", "boards", "EMPTY"}
+
+_EMPTY: Dict[str, Any] = {}
+
+
+class Metric(NamedTuple):
+    """
+    Производная метрика. code — фрагмент Python, который читает ключи строки как локальные
+    переменные (отсутствующие колонки — None) и присваивает targets.
+    sec_inputs — ключи данных бумаги из securities, которые нужны формуле.
+    """
+    targets: Tuple[str, ...]
+    code: str
+    sec_inputs: Tuple[str, ...] = ()
+
+
+# Изменение к цене закрытия прошлого дня (PREVPRICE из securities)
+CHANGE_FROM_PREV = Metric(
+    targets=("change_abs", "change_percent"),
+    sec_inputs=("prev_price",),
+    code="""
+        if last_price is not None and prev_price is not None and prev_price != 0:
+            change_abs = round(last_price - prev_price, 8)
+            change_percent = round((last_price - prev_price) / prev_price * 100, 6)
+        else:
+            change_abs = None
+            change_percent = None
+    """,
+)
+
+# Изменение к открытию — только если биржа не отдала LASTCHANGE/LASTCHANGEPRC
+CHANGE_FROM_OPEN = Metric(
+    targets=("change_abs", "change_percent"),
+    code="""
+        if change_abs is None and last_price is not None and open_price is not None:
+            change_abs = round(last_price - open_price, 8)
+        if change_percent is None and last_price is not None and open_price:
+            change_percent = round((last_price - open_price) / open_price * 100, 6)
+    """,
+)
+
+# Внутридневная волатильность: (HIGH - LOW) / OPEN в процентах
+VOLATILITY = Metric(
+    targets=("volatility_percent",),
+    code="""
+        if high_price is not None and low_price is not None and open_price is not None and open_price != 0:
+            volatility_percent = round((high_price - low_price) / open_price * 100, 6)
+        else:
+            volatility_percent = None
+    """,
+)
+
+
+class Mapping:
+    """
+    Описание разбора ответа ISS в строки market_data.
+
+    fields — колонка marketdata → ключ строки (SECID и BOARDID обязательны);
+    sec_fields — колонка securities → ключ данных бумаги (соединение по SECID);
+    sec_output — какие ключи данных бумаги попадают в строку; sec_defaults — значения,
+      если у бумаги такого ключа нет (в том числе если бумаги нет в securities);
+    types — ключ → конвертер непустого значения; ошибка конвертации даёт None;
+    metrics / sec_metrics — производные метрики строки и данных бумаги (в sec_metrics доступен secid);
+    boards — допустимые BOARDID (фильтр обеих секций); require_security — пропускать строки
+      без бумаги в securities; skip_empty — колонки marketdata, при пустом или нулевом
+      значении которых строка пропускается.
+    Порядок ключей строки: secid, boardid, instrument_type, поля marketdata, sec_output, метрики.
+    """
+
+    def __init__(
+            self,
+            instrument_type: str,
+            fields: Dict[str, str],
+            sec_fields: Dict[str, str],
+            sec_output: Sequence[str],
+            types: Optional[Dict[str, Callable[[Any], Any]]] = None,
+            metrics: Sequence[Metric] = (),
+            sec_metrics: Sequence[Metric] = (),
+            sec_defaults: Optional[Dict[str, Any]] = None,
+            boards: Optional[Iterable[str]] = None,
+            require_security: bool = False,
+            skip_empty: Sequence[str] = (),
+    ):
+        self.instrument_type = instrument_type
+        self.fields = dict(fields)
+        self.sec_fields = dict(sec_fields)
+        self.sec_output = tuple(sec_output)
+        self.types = dict(types or {})
+        self.metrics = tuple(metrics)
+        self.sec_metrics = tuple(sec_metrics)
+        self.sec_defaults = dict(sec_defaults or {})
+        self.boards = frozenset(boards) if boards is not None else None
+        self.require_security = require_security
+        self.skip_empty = tuple(skip_empty)
+
+        names = {*self.fields.values(), *self.sec_fields.values(), *self.sec_output}
+        names.update(target for metric in (*self.metrics, *self.sec_metrics) for target in metric.targets)
+        invalid = sorted(name for name in names if not name.isidentifier() or name in _RESERVED)
+        if invalid:
+            raise ValueError(f"Недопустимые ключи в маппинге {instrument_type}: {invalid}")
+
+        # Схема секции (кортеж колонок) → сгенерированная функция разбора строки
+        self._market_converters: Dict[Tuple[str, ...], Callable] = {}
+        self._sec_converters: Dict[Tuple[str, ...], Callable] = {}
+
+    def process(self, raw_data: IssResponse) -> List[Dict[str, Any]]:
+        market = raw_data.get("marketdata")
+        if not market or not market.columns:
+            logger.warning("'marketdata' missing or invalid")
+            return []
+
+        securities = raw_data.get("securities")
+        if not securities or not securities.columns:
+            logger.warning("'securities' missing or invalid")
+            return []
+
+        if "SECID" not in securities.columns:
+            logger.error("'SECID' column not found in securities")
+            return []
+        if not {"SECID", "BOARDID"}.issubset(market.columns):
+            logger.error("Required columns missing in marketdata")
+            return []
+
+        sec_convert = self._converter(self._sec_converters, self._compile_securities, securities.columns)
+        infos: Dict[Any, Dict[str, Any]] = {}
+        for row in securities.data:
+            parsed = sec_convert(row)
+            if parsed is not None:
+                infos[parsed[0]] = parsed[1]
+
+        convert = self._converter(self._market_converters, self._compile_marketdata, market.columns)
+        return [item for item in map(convert, market.data, repeat(infos)) if item is not None]
+
+    @staticmethod
+    def _converter(cache: Dict, compile_fn: Callable, columns: Sequence[str]) -> Callable:
+        key = tuple(columns)
+        convert = cache.get(key)
+        if convert is None:
+            convert = cache[key] = compile_fn(key)
+        return convert
+
+    def _value_lines(self, target: str, position: int, namespace: Dict[str, Any]) -> List[str]:
+        """Чтение колонки в локальную переменную target: "" → None и приведение типа."""
+        lines = [
+            f"{target} = row[{position}]",
+            f"if {target} == '':",
+            f"    {target} = None",
+        ]
+        convert = self.types.get(target)
+        if convert is not None:
+            namespace[f"convert_{target}"] = convert
+            lines += [
+                f"if {target} is not None:",
+                "    try:",
+                f"        {target} = convert_{target}({target})",
+                "    except (ValueError, TypeError):",
+                f"        {target} = None",
+            ]
+        return lines
+
+    @staticmethod
+    def _metric_lines(metrics: Sequence[Metric]) -> List[str]:
+        return [line for metric in metrics for line in textwrap.dedent(metric.code).strip("\n").splitlines()]
+
+    def _compile_securities(self, columns: Tuple[str, ...]) -> Callable:
+        """Строка securities → (secid, данные бумаги) или None, если строка отфильтрована."""
+        idx = {column: i for i, column in enumerate(columns)}
+        namespace: Dict[str, Any] = {"boards": self.boards}
+        lines = [
+            f"if len(row) != {len(columns)}:",
+            "    return None",
+            f"secid = row[{idx['SECID']}]",
+        ]
+        if self.boards is not None:
+            board = f"row[{idx['BOARDID']}]" if "BOARDID" in idx else "None"
+            lines += [f"if {board} not in boards:", "    return None"]
+
+        present = []
+        for source, target in self.sec_fields.items():
+            if source in idx:
+                lines += self._value_lines(target, idx[source], namespace)
+                present.append(target)
+            else:
+                lines.append(f"{target} = None")
+
+        keys = list(dict.fromkeys([*present, *(t for metric in self.sec_metrics for t in metric.targets)]))
+        lines += self._metric_lines(self.sec_metrics)
+        lines.append("info = {" + ", ".join(f"{key!r}: {key}" for key in keys) + "}")
+        lines.append("return secid, info")
+        return self._build("row", lines, namespace)
+
+    def _compile_marketdata(self, columns: Tuple[str, ...]) -> Callable:
+        """Строка marketdata + данные бумаг → строка market_data или None, если строка отфильтрована."""
+        idx = {column: i for i, column in enumerate(columns)}
+        namespace: Dict[str, Any] = {"boards": self.boards, "EMPTY": _EMPTY}
+        lines = [
+            f"if len(row) != {len(columns)}:",
+            "    return None",
+        ]
+        if self.boards is not None:
+            lines += [f"if row[{idx['BOARDID']}] not in boards:", "    return None"]
+        if self.require_security:
+            lines += [
+                f"sec = infos.get(row[{idx['SECID']}])",
+                "if sec is None:",
+                "    return None",
+            ]
+        else:
+            lines.append(f"sec = infos.get(row[{idx['SECID']}], EMPTY)")
+        for source in self.skip_empty:
+            if source in idx:
+                lines += [f"if row[{idx[source]}] in (None, '', 0, '0'):", "    return None"]
+
+        lines += [f"secid = row[{idx['SECID']}]", f"boardid = row[{idx['BOARDID']}]"]
+        present = []
+        for source, target in self.fields.items():
+            if source in idx:
+                lines += self._value_lines(target, idx[source], namespace)
+                present.append(target)
+            elif target not in ("secid", "boardid"):
+                # Колонки нет в ответе: формулы видят None, в строку ключ не попадает
+                lines.append(f"{target} = None")
+
+        sec_names = list(dict.fromkeys([
+            *self.sec_output,
+            *(name for metric in self.metrics for name in metric.sec_inputs),
+        ]))
+        for name in sec_names:
+            namespace[f"default_{name}"] = self.sec_defaults.get(name)
+            lines.append(f"{name} = sec.get({name!r}, default_{name})")
+
+        lines += self._metric_lines(self.metrics)
+
+        keys = list(dict.fromkeys([
+            "secid", "boardid", "instrument_type", *present, *self.sec_output,
+            *(target for metric in self.metrics for target in metric.targets),
+        ]))
+        namespace["instrument_type"] = self.instrument_type
+        lines.append("return {" + ", ".join(f"{key!r}: {key}" for key in keys) + "}")
+        return self._build("row, infos", lines, namespace)
+
+    def _build(self, args: str, lines: List[str], namespace: Dict[str, Any]) -> Callable:
+        source = f"def convert({args}):\n" + "\n".join(f"    {line}" for line in lines)
+        exec(compile(source, f"<mapping {self.instrument_type}>", "exec"), namespace)
+        logger.debug(f"Сгенерирован разбор для {self.instrument_type}:\n{source}")
+        return namespace["convert"]
@@ -0,0 +1,52 @@
+# scheduler/processors/sinks.py
+"""
+Стадии записи для конвейеров (scheduler.pipeline): каждая пачка — своя транзакция,
+а пересчёт топов, уведомления API и версия набора — один раз после последней пачки.
+"""
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from scheduler.database.dao import bump_dataset_version, insert_daily_candles, publish_market_data, write_market_data
+from scheduler.database.engine import get_db
+from scheduler.pipeline import Pipeline
+
+logger = logging.getLogger("scheduler.sinks")
+
+
+async def write_market_data_batch(rows: List[Dict[str, Any]]) -> int:
+    async with get_db() as db:
+        return await write_market_data(db, rows)
+
+
+async def publish_market_data_batches(instrument_types: Iterable[str], changed: int, dataset: Optional[str] = None):
+    async with get_db() as db:
+        await publish_market_data(db, instrument_types, changed, dataset)
+
+
+async def write_candles_batch(rows: List[Dict[str, Any]]) -> int:
+    # Версия набора поднимается один раз в publish_candles_batches, а не на каждую пачку
+    async with get_db() as db:
+        return await insert_daily_candles(db, rows)
+
+
+async def publish_candles_batches(inserted: int, dataset: str = "candles"):
+    if not inserted:
+        return
+    async with get_db() as db:
+        await bump_dataset_version(db, dataset)
+
+
+async def publish_partial(pipeline: Pipeline, publish: Callable[[int], Awaitable[Any]]):
+    """
+    Конвейер упал, но пачки, записанные до ошибки, уже закоммичены: публикуем их
+    (publish получает result стадии write), иначе топы, API и версия набора отстанут от таблиц
+    до следующего успешного запуска. Ошибка публикации только логируется — наружу уходит исходная.
+    """
+    written = pipeline.stats["write"].result
+    if written <= 0:
+        return
+    try:
+        await publish(written)
+        logger.warning(f"[{pipeline.name}] ⚠️ Конвейер прерван — опубликовано {written} уже записанных строк")
+    except Exception as e:
+        logger.error(f"[{pipeline.name}] ❌ Не удалось опубликовать частично записанные данные: {e}", exc_info=True)
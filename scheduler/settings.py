@@ -1,3 +1,6 @@
+from datetime import date
+from typing import List
+
 from pydantic_settings import BaseSettings
 
 
@@ -12,6 +15,36 @@ class Settings(BaseSettings):
     # Scheduler
     SCHEDULER_INITIAL_LOAD: bool = True
     SCHEDULER_HEALTH_CHECK_INTERVAL: int = 60
+    INITIAL_LOAD_CONCURRENCY: int = 4  # сколько задач первоначальной загрузки идёт одновременно
+    INITIAL_LOAD_JOB_TIMEOUT: float = 300.0  # сек на одну задачу первоначальной загрузки
+    CPU_EXECUTOR: str = "process"  # где считаются разбор и обработка ответов: process | thread | inline
+    CPU_EXECUTOR_WORKERS: int = 2
+    PIPELINE_QUEUE_SIZE: int = 4  # сколько элементов ждёт между стадиями конвейера, дальше — backpressure
+    PIPELINE_BATCH_SIZE: int = 2000  # строк в одной пачке записи конвейера (одна транзакция)
+
+    # MOEX ISS
+    MOEX_RATE_LIMIT: float = 10.0  # запросов в секунду, общий лимит на все задачи
+    MOEX_CACHE_TTL: float = 300.0  # сек; кеш списков бумаг (securities.json), общий для задач котировок и свечей
+    HTTP2_ENABLED: bool = False  # мультиплексирование запросов общих клиентов по HTTP/2 (нужен пакет h2)
+    MOEX_BOND_BOARDS_TTL: float = 86400.0  # сек; кеш списка режимов торгов облигаций
+    # Режимы облигаций на случай, если ISS не отдал список boards.json
+    MOEX_BOND_BOARDS: List[str] = ["TQOB", "TQCB", "TQOD", "TQOE", "TQOY", "TQIR", "TQIU", "TQRD", "TQOW"]
+
+    # Предзагрузка bondization (купоны, оферты, амортизации)
+    COUPONS_PREFETCH_CONCURRENCY: int = 8
+    COUPONS_PREFETCH_TTL_HOURS: int = 20  # API сам на биржу не ходит и отдаёт bond_events из этой предзагрузки
+    COUPONS_PREFETCH_BATCH_SIZE: int = 200
+
+    # Догрузка истории свечей из /iss/history
+    CANDLES_BACKFILL_FROM: date = date(2020, 1, 1)  # с какой даты история должна быть полной
+    CANDLES_BACKFILL_CONCURRENCY: int = 8  # сколько тикеров качается одновременно (общий MOEX_RATE_LIMIT соблюдается)
+    CANDLES_BACKFILL_GAP_DAYS: int = 5  # разрыв между свечами до стольких дней — выходные, а не пропуск
+    CANDLES_BACKFILL_ON_STARTUP: bool = True  # догружать после простоя при запуске шедулера
+    CANDLES_BACKFILL_MAX_LAG_DAYS: int = 3  # простой: последняя свеча старше стольких дней
+
+    # Массовая запись: от этого числа строк — COPY во временную таблицу, меньше — INSERT ... unnest
+    BULK_COPY_ENABLED: bool = True
+    BULK_COPY_MIN_ROWS: int = 1000
 
     @property
     def DATABASE_URL(self) -> str:
@@ -0,0 +1,7 @@
+# tests/__init__.py
+import os
+
+# Настройки api и шедулера читаются при импорте модулей. Тестам и бенчмаркам без БД подключение
+# не нужно, тестам с БД адрес даёт DATABASE_URL (см. test_query_plans.py)
+for name, value in (("POSTGRES_USER", "test"), ("POSTGRES_PASSWORD", "test"), ("POSTGRES_DB", "test")):
+    os.environ.setdefault(name, value)
@@ -0,0 +1,65 @@
+# tests/benchmarks/bench_mapping.py
+"""
+Пропускная способность процессоров акций, фондов и индексов: декларативный маппинг
+(scheduler.processors.mapping) против построчных эталонов из tests/oracles на одних и тех же
+случайных ответах ISS (tests/samples.py). Перед замером результаты сверяются.
+
+    python -m tests.benchmarks.bench_mapping --rows 20000 --repeat 5
+
+Время — лучший из repeat прогонов с выключенным сборщиком мусора; строк в секунду — по marketdata.
+Первый вызов маппинга (генерация кода под схему ответа) в замер не входит, как и в шедулере,
+где схема не меняется между запусками задачи.
+"""
+import argparse
+import gc
+import logging
+import random
+import time
+from typing import Callable, List
+
+from tests.samples import KINDS, market_response
+from tests.test_mapping import ORACLES, PROCESSORS
+
+
+def best_of(func: Callable, raw_data, repeat: int) -> float:
+    timings: List[float] = []
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(raw_data)
+            timings.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="строк marketdata в ответе")
+    parser.add_argument("--repeat", type=int, default=5, help="прогонов на процессор, берётся лучший")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"{'набор':<8} {'строк':>7} {'построчно, мс':>14} {'маппинг, мс':>12} {'строк/с':>11} {'ускорение':>10}")
+    for kind in KINDS:
+        raw_data = market_response(kind, random.Random(args.seed), args.rows)
+        old, new = ORACLES[kind], PROCESSORS[kind]
+
+        expected = old(raw_data)
+        actual = new(raw_data)
+        if actual != expected:
+            raise SystemExit(f"{kind}: результаты маппинга и построчного кода расходятся")
+
+        old_time = best_of(old, raw_data, args.repeat)
+        new_time = best_of(new, raw_data, args.repeat)
+        rows = len(raw_data["marketdata"].data)
+        print(
+            f"{kind:<8} {rows:>7} {old_time * 1000:>14.1f} {new_time * 1000:>12.1f} "
+            f"{rows / new_time:>11,.0f} {old_time / new_time:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# tests/oracles/for_funds_rows.py
+"""
+Эталон для тестов: построчная process_fund_data до декларативного маппинга (scheduler.processors.mapping),
+без изменений — вместе с таблицами полей того времени.
+"""
+import time
+import logging
+from datetime import datetime
+from scheduler.clients.iss import IssResponse
+
+logger = logging.getLogger("tests.oracles.funds")
+
+# Маппинг полей из marketdata → наша модель
+FUND_MARKETDATA_MAP = {
+    "SECID": "secid",
+    "BOARDID": "boardid",
+    "LAST": "last_price",
+    "OPEN": "open_price",
+    "HIGH": "high_price",
+    "LOW": "low_price",
+    "VALTODAY": "volume",
+    "NUMTRADES": "trades_count",
+}
+
+# Поля из securities
+SEC_FIELDS_MAP = {
+    "SHORTNAME": "shortname",
+    "PREVPRICE": "prev_price",
+    "FACEUNIT": "currency",
+    "LISTLEVEL": "list_level",
+}
+
+
+def process_fund_data(raw_data: IssResponse):
+    """
+    Обрабатывает данные по фондам (ETF) с API Мосбиржи и приводит к общей модели.
+    :param raw_data: секции ответа /iss/engines/stock/markets/shares/boards/TQTF|TQIF/securities.json
+    :return: list[dict] — готово к вставке в market_data
+    """
+    start = time.time()
+
+    market = raw_data.get("marketdata")
+    if not market or not market.columns:
+        logger.warning("'marketdata' missing or invalid")
+        return []
+
+    m_columns = market.columns
+    m_rows = market.data
+    m_col_idx = {col: idx for idx, col in enumerate(m_columns)}
+
+    securities = raw_data.get("securities")
+    if not securities or not securities.columns:
+        logger.warning("'securities' missing or invalid")
+        return []
+
+    s_columns = securities.columns
+    s_rows = securities.data
+    s_col_idx = {col: idx for idx, col in enumerate(s_columns)}
+
+    secid_idx = s_col_idx.get("SECID")
+    if secid_idx is None:
+        logger.error("'SECID' column not found in securities")
+        return []
+
+    secid_to_info = {}
+    for row in s_rows:
+        if len(row) != len(s_columns):
+            continue
+
+        secid = row[secid_idx]
+        sec_info = {}
+
+        for moex_field, local_field in SEC_FIELDS_MAP.items():
+            if moex_field not in s_col_idx:
+                continue
+            value = row[s_col_idx[moex_field]]
+            if value == "" or value is None:
+                value = None
+
+            if moex_field == "LISTLEVEL":
+                try:
+                    value = int(value) if value not in (None, "") else None
+                except (ValueError, TypeError):
+                    value = None
+
+            sec_info[local_field] = value
+
+        sec_info["shortname"] = sec_info.get("shortname") or f"Fund {secid}"
+        secid_to_info[secid] = sec_info
+
+    required_market_cols = ["SECID", "BOARDID"]
+    if not all(col in m_col_idx for col in required_market_cols):
+        logger.error("Required columns missing in marketdata")
+        return []
+
+    parsed = []
+    for row in m_rows:
+        if len(row) != len(m_columns):
+            continue
+
+        secid = row[m_col_idx["SECID"]]
+        boardid = row[m_col_idx["BOARDID"]]
+
+        item = {
+            "secid": secid,
+            "boardid": boardid,
+            "instrument_type": "fund",
+        }
+
+        for moex_field, local_field in FUND_MARKETDATA_MAP.items():
+            if moex_field not in m_col_idx:
+                continue
+            value = row[m_col_idx[moex_field]]
+            if value == "" or value is None:
+                value = None
+
+            if local_field in ("last_price", "open_price", "high_price", "low_price"):
+                try:
+                    value = float(value) if value is not None else None
+                except (ValueError, TypeError):
+                    value = None
+            elif local_field == "volume":
+                try:
+                    value = int(float(value)) if value not in (None, "") else None
+                except (ValueError, TypeError):
+                    value = None
+            elif local_field == "trades_count":
+                try:
+                    value = int(value) if value not in (None, "") else None
+                except (ValueError, TypeError):
+                    value = None
+
+            item[local_field] = value
+
+        sec_info = secid_to_info.get(secid, {})
+        item["shortname"] = sec_info.get("shortname")
+        item["currency"] = sec_info.get("currency", "SUR")
+        item["list_level"] = sec_info.get("list_level")
+        prev_price = sec_info.get("prev_price")
+
+        last_price = item.get("last_price")
+        if last_price is not None and prev_price is not None and prev_price != 0:
+            item["change_abs"] = round(last_price - prev_price, 8)
+            item["change_percent"] = round((last_price - prev_price) / prev_price * 100, 6)
+        else:
+            item["change_abs"] = None
+            item["change_percent"] = None
+
+        open_price = item.get("open_price")
+        high_price = item.get("high_price")
+        low_price = item.get("low_price")
+        if all(v is not None for v in [high_price, low_price, open_price]) and open_price != 0:
+            item["volatility_percent"] = round((high_price - low_price) / open_price * 100, 6)
+        else:
+            item["volatility_percent"] = None
+
+        parsed.append(item)
+
+    logger.info(f"[Funds] Обработано {len(parsed)} фондов за {time.time() - start:.2f} сек")
+    return parsed
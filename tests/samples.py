@@ -0,0 +1,99 @@
+# tests/samples.py
+"""
+Случайные ответы ISS для акций, фондов и индексов — общий генератор для теста эквивалентности
+маппинга (test_mapping.py) и бенчмарка (tests/benchmarks/bench_mapping.py).
+Колонки идут в случайном порядке и с лишними полями, значения — числа, None, "" и нули.
+Входы, на которых построчные процессоры падали, генератор не порождает: они проверяются
+отдельными тестами в test_mapping.py.
+"""
+import random
+from typing import Any, Dict, List
+
+from scheduler.clients.iss import IssSection
+
+KINDS = ("stocks", "funds", "indices")
+
+MARKET_COLUMNS = {
+    "stocks": ["SECID", "BOARDID", "LAST", "OPEN", "HIGH", "LOW", "VALTODAY", "NUMTRADES",
+               "ISSUECAPITALIZATION", "TRENDISSUECAPITALIZATION", "VOLTODAY", "UPDATETIME"],
+    "funds": ["SECID", "BOARDID", "LAST", "OPEN", "HIGH", "LOW", "VALTODAY", "NUMTRADES",
+              "VOLTODAY", "SYSTIME", "CLOSEPRICE"],
+    "indices": ["SECID", "BOARDID", "CURRENTVALUE", "OPENVALUE", "HIGH", "LOW", "VALTODAY",
+                "CAPITALIZATION", "LASTCHANGE", "LASTCHANGEPRC", "TRADEDATE"],
+}
+
+SEC_COLUMNS = {
+    "stocks": ["SECID", "SHORTNAME", "PREVPRICE", "CURRENCYID", "LISTLEVEL", "LOTSIZE"],
+    "funds": ["SECID", "SHORTNAME", "PREVPRICE", "FACEUNIT", "LISTLEVEL", "LOTSIZE"],
+    "indices": ["SECID", "BOARDID", "SHORTNAME", "CURRENCYID", "ANNUALHIGH", "ANNUALLOW"],
+}
+
+BOARDS = {
+    "stocks": ["TQBR", "SMAL"],
+    "funds": ["TQTF", "TQIF"],
+    "indices": ["RTSI", "SNDX", "MMIX"],
+}
+
+
+def market_response(kind: str, rng: random.Random, n: int) -> Dict[str, IssSection]:
+    """Ответ ISS на n бумаг: marketdata и securities с общими SECID (часть бумаг без securities)."""
+
+    def maybe(value, p=0.15):
+        c = rng.random()
+        return None if c < p else ("" if c < p * 1.3 else value)
+
+    def num():
+        c = rng.random()
+        if c < 0.1:
+            return 0
+        if c < 0.2:
+            return rng.randint(-50, 500)
+        return round(rng.uniform(-10, 20000), rng.randint(0, 6))
+
+    secids = [f"S{i}" for i in range(n)]
+    m_columns = list(MARKET_COLUMNS[kind])
+    s_columns = list(SEC_COLUMNS[kind])
+    rng.shuffle(m_columns)
+    rng.shuffle(s_columns)
+
+    def market_value(column: str) -> Any:
+        if column == "SECID":
+            return rng.choice(secids + [""])
+        if column == "BOARDID":
+            return rng.choice(BOARDS[kind])
+        if column in ("UPDATETIME", "SYSTIME", "TRADEDATE"):
+            return "2030-01-01"
+        if kind == "stocks" and column in ("LAST", "OPEN", "HIGH", "LOW"):
+            return maybe(rng.choice([0, rng.uniform(1, 100), rng.randint(1, 100)]))
+        return maybe(num())
+
+    def sec_value(column: str, secid: str) -> Any:
+        if column == "SECID":
+            return secid
+        if column == "BOARDID":
+            return rng.choice(BOARDS[kind])
+        if column == "SHORTNAME":
+            return maybe(rng.choice([f"name {secid}", f"idx iNAV {secid}"]))
+        if column == "LISTLEVEL":
+            return maybe(rng.choice([1, 2, 3, "2"]))
+        if column == "PREVPRICE":
+            return maybe(rng.choice([0, rng.uniform(1, 100), rng.randint(1, 9)]))
+        if column in ("CURRENCYID", "FACEUNIT"):
+            return maybe(rng.choice(["RUB", "SUR", "USD"]))
+        return maybe(num())
+
+    market: List[list] = []
+    for _ in range(n):
+        row = {column: market_value(column) for column in m_columns}
+        if kind == "indices" and row["CURRENTVALUE"] in (None, "") and row["LASTCHANGEPRC"] in (None, ""):
+            # Построчный процессор индексов падал на такой строке, если есть OPENVALUE
+            row["LASTCHANGEPRC"] = num()
+        market.append([row[column] for column in m_columns])
+    if kind != "stocks":
+        # Строка не той длины: фонды и индексы её пропускали
+        market.append(["S0", BOARDS[kind][0]])
+
+    securities = [[sec_value(column, s) for column in s_columns] for s in secids if rng.random() < 0.85]
+    # Дубли SECID: побеждает последняя строка
+    securities += [list(rng.choice(securities)) for _ in range(n // 20)] if securities else []
+    return {"marketdata": IssSection(m_columns, market), "securities": IssSection(s_columns, securities)}
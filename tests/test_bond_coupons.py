@@ -0,0 +1,72 @@
+# tests/test_bond_coupons.py
+"""
+Предзагрузка bondization (scheduler.processors.for_bonds_coupons): разбор в bond_events —
+единственный, API эту таблицу только читает, — и next_event_date, по которой
+get_bonds_for_coupon_refresh решает, что кеш бумаги устарел (next_event_date <= current_date).
+"""
+from datetime import date
+
+import pytest
+
+from scheduler.clients.iss import IssSection
+from scheduler.processors.for_bonds_coupons import get_next_event_date, parse_bond_events
+
+TODAY = date(2030, 6, 15)
+
+COUPON_COLUMNS = ["coupondate", "facevalue", "value", "value_rub", "valueprc", "recorddate", "startdate", "faceunit"]
+OFFER_COLUMNS = ["offerdate", "facevalue", "value", "offerdatestart", "offerdateend", "price", "offertype", "faceunit"]
+AMORT_COLUMNS = ["amortdate", "facevalue", "value", "value_rub", "valueprc", "faceunit", "data_source"]
+
+
+def bondization(coupons=(), offers=(), amortizations=()):
+    return {
+        "coupons": IssSection(COUPON_COLUMNS, [[day, 1000, 30, 30, 12, None, None, "SUR"] for day in coupons]),
+        "offers": IssSection(OFFER_COLUMNS, [[day, 1000, 1000, None, None, 100, "put", "SUR"] for day in offers]),
+        "amortizations": IssSection(
+            AMORT_COLUMNS, [[day, 1000, 1000, 1000, 100, "SUR", "maturity"] for day in amortizations]
+        ),
+    }
+
+
+@pytest.mark.parametrize("section", ["coupons", "offers", "amortizations"])
+def test_event_today_is_not_next(section):
+    # В день события next_event_date должна указывать на следующее, иначе бумага
+    # остаётся устаревшей (next_event_date <= current_date) и перезагружается весь день
+    raw_data = bondization(**{section: ["2030-06-15", "2030-12-15"]})
+    assert get_next_event_date(raw_data, TODAY) == date(2030, 12, 15)
+
+
+def test_only_event_today_leaves_no_next_date():
+    assert get_next_event_date(bondization(coupons=["2030-06-15"], amortizations=["2030-06-15"]), TODAY) is None
+
+
+def test_nearest_future_event_across_sections():
+    raw_data = bondization(
+        coupons=["2030-03-15", "2030-06-15", "2030-09-15"],
+        offers=["2030-06-16"],
+        amortizations=["2031-06-15"],
+    )
+    assert get_next_event_date(raw_data, TODAY) == date(2030, 6, 16)
+
+
+def test_placeholder_and_missing_dates_are_ignored():
+    raw_data = bondization(coupons=["0000-00-00", None, "2030-07-01"])
+    assert get_next_event_date(raw_data, TODAY) == date(2030, 7, 1)
+    assert get_next_event_date({}, TODAY) is None
+
+
+def test_bond_events_are_sorted_with_contiguous_seq():
+    # События без даты отбрасываются до нумерации: seq идёт подряд от 0
+    raw_data = bondization(
+        coupons=["2030-09-15", None, "2030-03-15"],
+        offers=["0000-00-00", "2030-03-15"],
+        amortizations=["2031-03-15"],
+    )
+    events = parse_bond_events("RU1", raw_data)
+    assert [(e["seq"], e["event_type"], e["event_date"]) for e in events] == [
+        (0, "COUPON", date(2030, 3, 15)),
+        (1, "OFFER", date(2030, 3, 15)),
+        (2, "COUPON", date(2030, 9, 15)),
+        (3, "MATURITY", date(2031, 3, 15)),
+    ]
+    assert all(e["secid"] == "RU1" for e in events)
@@ -0,0 +1,240 @@
+# tests/test_bonds_columnar.py
+"""
+Колоночная process_bonds_data против построчного эталона (tests/oracles/for_bonds_rows.py):
+те же строки в том же порядке, те же ключи, типы и значения до бита — на случайных ответах ISS
+и на краевых случаях: None, "", 0, битые даты, дубли SECID, облигации без marketdata.
+Если эталон падает на входе, колоночная версия должна упасть с тем же исключением.
+"""
+import logging
+import math
+import random
+from typing import Any, Callable, Dict, List
+
+import pytest
+
+from scheduler.clients.iss import IssSection
+from scheduler.processors.for_bonds import process_bonds_data
+from tests.oracles.for_bonds_rows import process_bonds_data as process_bonds_rows
+
+YIELDS_COLUMNS = ["SECID", "BOARDID", "YIELDDATE", "PRICE", "DURATION", "WAPRICE"]
+MARKET_COLUMNS = ["SECID", "BOARDID", "YIELD", "VALTODAY", "NUMTRADES", "WAPRICE"]
+SEC_COLUMNS = [
+    "SECID", "ISIN", "SHORTNAME", "LISTLEVEL", "MATDATE", "COUPONPERCENT", "COUPONVALUE", "COUPONPERIOD",
+    "NEXTCOUPON", "FACEVALUE", "LOTSIZE", "FACEUNIT", "ISSUESIZE", "ISSUESIZEPLACED", "ACCRUEDINT", "PREVPRICE",
+]
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    # Обе реализации предупреждают о каждом обрезанном значении NUMERIC(10,6)
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def response(yields: List[list], market: List[list], securities: List[list]) -> Dict[str, IssSection]:
+    return {
+        "marketdata_yields": IssSection(YIELDS_COLUMNS, yields),
+        "marketdata": IssSection(MARKET_COLUMNS, market),
+        "securities": IssSection(SEC_COLUMNS, securities),
+    }
+
+
+def security(secid: str, **values: Any) -> list:
+    row = dict.fromkeys(SEC_COLUMNS)
+    row.update(SECID=secid, ISIN=f"ISIN{secid}", SHORTNAME=f"name {secid}", FACEVALUE=1000, FACEUNIT="SUR")
+    row.update(values)
+    return [row[column] for column in SEC_COLUMNS]
+
+
+def _same(a: Any, b: Any) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return type(a) is type(b) and a == b
+
+
+def _outcome(process: Callable, raw_data) -> Any:
+    try:
+        return process(raw_data)
+    except Exception as e:
+        return type(e)
+
+
+def assert_equivalent(raw_data):
+    expected = _outcome(process_bonds_rows, raw_data)
+    actual = _outcome(process_bonds_data, raw_data)
+    if isinstance(expected, type):
+        assert actual is expected, f"эталон упал с {expected.__name__}, колоночная версия: {actual!r}"
+        return
+    assert not isinstance(actual, type), f"колоночная версия упала с {actual.__name__}"
+    assert len(actual) == len(expected)
+    for old, new in zip(expected, actual):
+        assert list(new) == list(old)
+        for key in old:
+            assert _same(old[key], new[key]), (old["secid"], old["boardid"], key, old[key], new[key])
+    return actual
+
+
+# === Случайные ответы ===
+
+def _random_response(rng: random.Random, n: int) -> Dict[str, IssSection]:
+    def maybe(value, p=0.15):
+        return None if rng.random() < p else value
+
+    def num():
+        c = rng.random()
+        if c < 0.1:
+            return 0
+        if c < 0.2:
+            return rng.randint(-5, 5)
+        if c < 0.25:
+            return rng.uniform(-1e6, 1e6)
+        return round(rng.uniform(-200, 20000), rng.randint(0, 9))
+
+    def date():
+        c = rng.random()
+        if c < 0.1:
+            return "0000-00-00"
+        if c < 0.15:
+            return ""
+        if c < 0.17:
+            return "2023-02-30"
+        return f"{rng.randint(2020, 2040)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+    secids = [f"RU{i:06d}" for i in range(n)]
+    boards = ["TQOB", "TQCB", "TQIR"]
+    yields = [
+        [rng.choice(secids), rng.choice(boards), maybe(date()), maybe(num()),
+         maybe(rng.choice([0, rng.randint(1, 5000)])), maybe(num())]
+        for _ in range(n)
+    ]
+    market = [
+        [rng.choice(secids), rng.choice(boards), maybe(num()), maybe(rng.randint(0, 10 ** 9)),
+         maybe(rng.randint(0, 1000)), maybe(num())]
+        for _ in range(n)
+    ]
+    securities = [
+        [s, f"ISIN{s}", maybe(f"name {s}"), maybe(rng.choice([0, 1, 2, 3])), maybe(date()), maybe(num()),
+         maybe(num()), maybe(rng.choice([0, 91, 182])), maybe(date()), maybe(rng.choice([0, 1000, 500.5, ""])),
+         maybe(rng.choice([0, 1, 10])), maybe("RUB"), maybe(rng.randint(0, 10 ** 12)),
+         maybe(rng.randint(0, 10 ** 12)), maybe(rng.choice([num(), ""])), maybe(rng.choice([num(), "", "n/a"]))]
+        for s in secids if rng.random() < 0.9
+    ]
+    # Дубли SECID в securities: побеждает последняя строка
+    securities += [list(rng.choice(securities)) for _ in range(n // 20)]
+    return response(yields, market, securities)
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_random_responses_match_row_implementation(seed):
+    rng = random.Random(seed)
+    assert_equivalent(_random_response(rng, rng.choice([1, 7, 50, 400])))
+
+
+# === Краевые случаи ===
+
+def test_empty_sections():
+    assert assert_equivalent(response([], [], [])) == []
+    assert assert_equivalent(response([], [["A", "TQOB", 1, 2, 3, 4]], [security("A")])) == []
+    assert assert_equivalent({}) == []
+
+
+def test_missing_marketdata_rows():
+    rows = assert_equivalent(response(
+        [["A", "TQOB", "2030-01-01", 99.5, 300, 99.4], ["B", "TQOB", None, 100, 10, None]],
+        [["A", "TQCB", 12.5, 1000, 3, 99.4]],  # другой режим — пары нет
+        [security("A"), security("B")],
+    ))
+    assert [row["volume"] for row in rows] == [None, None]
+    assert [row["effectiveyield"] for row in rows] == [None, None]
+
+    # Секции marketdata нет вовсе
+    assert_equivalent({
+        "marketdata_yields": IssSection(YIELDS_COLUMNS, [["A", "TQOB", None, 99.5, 300, None]]),
+        "marketdata": IssSection(MARKET_COLUMNS, []),
+        "securities": IssSection(SEC_COLUMNS, [security("A")]),
+    })
+
+
+def test_bonds_without_securities_are_skipped():
+    rows = assert_equivalent(response(
+        [["A", "TQOB", None, 99.5, 300, None], ["X", "TQOB", None, 99.5, 300, None]],
+        [],
+        [security("A")],
+    ))
+    assert [row["secid"] for row in rows] == ["A"]
+
+
+def test_duplicate_keys_keep_first_order_and_last_values():
+    rows = assert_equivalent(response(
+        [
+            ["A", "TQOB", None, 90.0, 100, None],
+            ["B", "TQOB", None, 80.0, 100, None],
+            ["A", "TQOB", None, 95.0, 200, None],  # та же пара: место первой, значения последней
+            ["A", "TQCB", None, 97.0, 300, None],
+        ],
+        [
+            ["A", "TQOB", 10.0, 1, 1, None],
+            ["A", "TQOB", 11.0, 2, 2, None],
+        ],
+        [security("A", SHORTNAME="old"), security("B"), security("A", SHORTNAME="new")],
+    ))
+    assert [(row["secid"], row["boardid"]) for row in rows] == [("A", "TQOB"), ("B", "TQOB"), ("A", "TQCB")]
+    assert rows[0]["last_price"] == 95.0 and rows[0]["volume"] == 2 and rows[0]["shortname"] == "new"
+
+
+@pytest.mark.parametrize("value", [None, "", 0, 0.0])
+def test_empty_and_zero_security_values(value):
+    fields = {
+        "LISTLEVEL": value, "COUPONPERCENT": value, "COUPONVALUE": value, "COUPONPERIOD": value,
+        "LOTSIZE": value, "ISSUESIZE": value, "ISSUESIZEPLACED": value,
+        "FACEVALUE": value, "ACCRUEDINT": value, "PREVPRICE": value, "MATDATE": value, "NEXTCOUPON": value,
+    }
+    assert_equivalent(response(
+        [["A", "TQOB", None, 99.5, 365, None]],
+        [["A", "TQOB", value, value, value, value]],
+        [security("A", **fields)],
+    ))
+
+
+@pytest.mark.parametrize("price, duration", [(None, None), (0, 0), (0.0, 1), (101.25, None)])
+def test_empty_and_zero_prices(price, duration):
+    assert_equivalent(response(
+        [["A", "TQOB", None, price, duration, None]],
+        [],
+        [security("A", PREVPRICE=100, ACCRUEDINT=12.3)],
+    ))
+
+
+@pytest.mark.parametrize("price, duration", [("", 10), (99.5, ""), ("abc", 10)])
+def test_invalid_numbers_fail_like_row_implementation(price, duration):
+    assert_equivalent(response(
+        [["A", "TQOB", None, price, duration, None]],
+        [],
+        [security("A")],
+    ))
+
+
+@pytest.mark.parametrize("value", [
+    "2030-06-15", "0000-00-00", "2023-02-29", "2024-02-29", "2023-13-01", "2030/06/15", "20300615",
+    "2030-6-15", " 2030-06-15", "", None, "9999-12-31", "0001-01-01",
+])
+def test_date_parsing(value):
+    assert_equivalent(response(
+        [["A", "TQOB", value, 99.5, 10, None], ["B", "TQOB", None, 99.5, 10, None]],
+        [],
+        [security("A", MATDATE=value, NEXTCOUPON=value), security("B", MATDATE="2031-01-01", NEXTCOUPON=value)],
+    ))
+
+
+@pytest.mark.parametrize("value", [
+    0.123456785, 2.675, 1.0000000049999999, -0.5e-8, 1234.5678901234, 1e12 + 0.123456789,
+    9999.999999, 9999.9999995, 10000.0, -10000.0, 1e15, 5e-324,
+])
+def test_rounding_and_numeric_10_6_limits(value):
+    # rounded() и numeric_10_6(): половинки, большие значения и выход за предел NUMERIC(10,6)
+    assert_equivalent(response(
+        [["A", "TQOB", None, value, 30, None]],
+        [["A", "TQOB", value, 1, 1, None]],
+        [security("A", COUPONPERCENT=value, COUPONVALUE=value, ACCRUEDINT=value, FACEVALUE=value, PREVPRICE=value)],
+    ))
@@ -0,0 +1,138 @@
+# tests/test_bulk.py
+"""
+Массовая запись (scheduler.database.bulk.BulkWriter) через unnest и через COPY в staging:
+те же ограничения колонок, что у обычного INSERT. Нужен Postgres (tests/postgres.py).
+Значения приводятся к типам колонок одинаково для обоих путей, откаты COPY на unnest считаются.
+"""
+import logging
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from scheduler.database.dao import candles_writer, market_data_writer
+from scheduler.settings import settings
+from tests.postgres import pg_schema, requires_postgres, run_in_schema  # noqa: F401
+
+PATHS = ["unnest", "copy"]
+
+
+@pytest.fixture(params=PATHS)
+def path(request, monkeypatch):
+    # COPY включается от BULK_COPY_MIN_ROWS строк: 1 — любая пачка идёт через COPY, иначе — никакая
+    monkeypatch.setattr(settings, "BULK_COPY_ENABLED", request.param == "copy")
+    monkeypatch.setattr(settings, "BULK_COPY_MIN_ROWS", 1)
+    return request.param
+
+
+def market_row(secid: str, **values):
+    return {"secid": secid, "boardid": "TQBR", "instrument_type": "stock", **values}
+
+
+def too_long(column: str, value: str):
+    return {**market_row("SBER"), column: value}
+
+
+def test_array_casts_have_no_length_limits():
+    # Длину VARCHAR(n) и точность NUMERIC(p, s) проверяет присваивание в колонку, а не CAST массива
+    for writer in (market_data_writer, candles_writer):
+        assert "VARCHAR(" not in writer.statement.text and "NUMERIC(" not in writer.statement.text
+
+
+@pytest.mark.parametrize("column, value, expected", [
+    ("volume", 1.5e11 + 0.5, 150_000_000_001),    # объём индекса из ISS — float
+    ("volume", 10.0, 10),
+    ("volume", Decimal("-2.5"), -3),               # как numeric → bigint в Postgres
+    ("trades_count", "12", 12),
+    ("last_price", "300.50", Decimal("300.50")),
+    ("secid", 1234, "1234"),
+    ("maturity_date", "2030-06-15", date(2030, 6, 15)),
+])
+def test_values_are_converted_to_column_types(column, value, expected):
+    record = market_data_writer._records([{**market_row("SBER"), column: value}])[0]
+    converted = record[market_data_writer.names.index(column)]
+    assert converted == expected and type(converted) is type(expected)
+
+
+def test_unconvertible_value_is_data_error():
+    with pytest.raises(ValueError):
+        market_data_writer._records([market_row("SBER", maturity_date="15.06.2030")])
+
+
+@requires_postgres
+def test_rows_are_written(pg_schema, path):
+    async def test(engine):
+        async with AsyncSession(engine) as session:
+            rows = [market_row("SBER", shortname="Сбербанк", last_price=300.5), market_row("GAZP", volume=10)]
+            assert await market_data_writer.write(session, rows) == 2
+            # Повтор без изменений ничего не перезаписывает, None не затирает значения
+            assert await market_data_writer.write(session, [market_row("SBER", shortname=None)]) == 0
+            await session.commit()
+            result = await session.execute(text("SELECT secid, shortname, last_price FROM market_data ORDER BY secid"))
+            return [tuple(row) for row in result]
+
+    rows = run_in_schema(pg_schema, test)
+    assert [(secid, shortname, float(price) if price is not None else None) for secid, shortname, price in rows] == [
+        ("GAZP", None, None), ("SBER", "Сбербанк", 300.5),
+    ]
+
+
+@requires_postgres
+@pytest.mark.parametrize("column, value", [("shortname", "x" * 256), ("secid", "S" * 37), ("boardid", "B" * 13)])
+def test_too_long_values_are_rejected(pg_schema, path, column, value):
+    async def test(engine):
+        async with AsyncSession(engine) as session:
+            with pytest.raises(DBAPIError, match="too long"):
+                await market_data_writer.write(session, [too_long(column, value)])
+            await session.rollback()
+            return (await session.execute(text("SELECT count(*) FROM market_data"))).scalar_one()
+
+    assert run_in_schema(pg_schema, test) == 0
+
+
+@requires_postgres
+def test_long_conflict_keys_do_not_collapse(pg_schema, path):
+    # Два ключа, различающиеся после 20-го символа: обрезка склеила бы их в одну свечу
+    async def test(engine):
+        async with AsyncSession(engine) as session:
+            rows = [{"ticker": "T" * 20 + suffix, "date": date(2030, 1, 1), "close": 1, "volume": 1} for suffix in "AB"]
+            with pytest.raises(DBAPIError, match="too long"):
+                await candles_writer.write(session, rows)
+
+    run_in_schema(pg_schema, test)
+
+
+@requires_postgres
+def test_float_volume_is_written_without_fallback(pg_schema, path):
+    # Индексы: VALTODAY приходит float'ом, колонка volume — BIGINT
+    async def test(engine):
+        async with AsyncSession(engine) as session:
+            fallbacks = market_data_writer.copy_fallbacks
+            rows = [{**market_row("IMOEX", volume=1.5e11 + 0.5), "boardid": "SNDX", "instrument_type": "index"}]
+            assert await market_data_writer.write(session, rows) == 1
+            assert market_data_writer.copy_fallbacks == fallbacks
+            await session.commit()
+            return (await session.execute(text("SELECT volume FROM market_data"))).scalar_one()
+
+    assert run_in_schema(pg_schema, test) == 150_000_000_001
+
+
+@requires_postgres
+def test_copy_fallback_is_counted_and_logged(pg_schema, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "BULK_COPY_ENABLED", True)
+    monkeypatch.setattr(settings, "BULK_COPY_MIN_ROWS", 1)
+    monkeypatch.setattr(market_data_writer, "stage_ddl", "SELECT missing_column FROM market_data")
+
+    async def test(engine):
+        async with AsyncSession(engine) as session:
+            fallbacks = market_data_writer.copy_fallbacks
+            with caplog.at_level(logging.ERROR, logger="scheduler.database.bulk"):
+                assert await market_data_writer.write(session, [market_row("SBER")]) == 1
+            await session.commit()
+            return market_data_writer.copy_fallbacks - fallbacks
+
+    assert run_in_schema(pg_schema, test) == 1
+    assert "пишем через unnest" in caplog.text
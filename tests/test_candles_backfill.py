@@ -0,0 +1,342 @@
+# tests/test_candles_backfill.py
+"""
+Догрузка свечей (scheduler.processors.for_candles_backfill): поиск пропусков в покрытых участках
+и разбор страниц /iss/history — курсор history.cursor, листание без курсора до пустой страницы
+и остановка, когда курсор не сдвигается. Планирование по свечам в БД и запись страниц вместе
+с чекпоинтами проверяются на Postgres (tests/postgres.py).
+"""
+import asyncio
+from datetime import date, timedelta
+from typing import List
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from scheduler.clients.iss import IssSection
+from scheduler.processors import for_candles_backfill
+from scheduler.processors.for_candles_backfill import (
+    BackfillRange, HistoryPage, fetch_history_pages, missing_ranges, parse_history_page, plan_backfill,
+    write_history_pages,
+)
+from scheduler.settings import settings
+from tests.postgres import pg_schema, requires_postgres, run_in_schema, session_factory  # noqa: F401
+
+D = date.fromisoformat
+HISTORY_COLUMNS = ["TRADEDATE", "CLOSE", "LEGALCLOSEPRICE", "VOLUME"]
+ITEM = BackfillRange("SBER", "TQBR", "stock", D("2024-01-01"), D("2024-12-31"))
+
+
+def history(rows: List[list], cursor: List[int] = None):
+    raw_data = {"history": IssSection(HISTORY_COLUMNS, rows)}
+    if cursor is not None:
+        raw_data["history.cursor"] = IssSection(["INDEX", "TOTAL", "PAGESIZE"], [cursor])
+    return raw_data
+
+
+def candle(day: int, close=100.0, volume=10) -> list:
+    return [f"2024-01-{day:02d}", close, None, volume]
+
+
+# === missing_ranges ===
+
+def test_nothing_covered_is_one_gap():
+    assert missing_ranges(D("2024-01-01"), D("2024-01-31"), []) == [(D("2024-01-01"), D("2024-01-31"))]
+
+
+def test_fully_covered_has_no_gaps():
+    covered = [(D("2023-12-01"), D("2024-01-10")), (D("2024-01-11"), D("2024-02-01"))]
+    assert missing_ranges(D("2024-01-01"), D("2024-01-31"), covered) == []
+
+
+def test_gaps_between_and_around_covered():
+    covered = [(D("2024-01-05"), D("2024-01-10")), (D("2024-01-20"), D("2024-01-25"))]
+    assert missing_ranges(D("2024-01-01"), D("2024-01-31"), covered, merge_days=0) == [
+        (D("2024-01-01"), D("2024-01-04")),
+        (D("2024-01-11"), D("2024-01-19")),
+        (D("2024-01-26"), D("2024-01-31")),
+    ]
+
+
+def test_unsorted_overlapping_and_outside_covered():
+    covered = [
+        (D("2024-01-20"), D("2024-01-25")),
+        (D("2023-01-01"), D("2023-06-01")),  # целиком до цели
+        (D("2024-01-05"), D("2024-01-12")),
+        (D("2024-01-03"), D("2024-01-08")),  # перекрывает соседний
+        (D("2024-03-01"), D("2024-04-01")),  # целиком после цели
+    ]
+    assert missing_ranges(D("2024-01-01"), D("2024-01-31"), covered, merge_days=0) == [
+        (D("2024-01-01"), D("2024-01-02")),
+        (D("2024-01-13"), D("2024-01-19")),
+        (D("2024-01-26"), D("2024-01-31")),
+    ]
+
+
+@pytest.mark.parametrize("merge_days, expected", [
+    # Между пропусками 11-19 и 26-31 — 7 дней от конца первого до начала второго
+    (6, [(D("2024-01-11"), D("2024-01-19")), (D("2024-01-26"), D("2024-01-31"))]),
+    (7, [(D("2024-01-11"), D("2024-01-31"))]),
+])
+def test_close_gaps_are_merged(merge_days, expected):
+    covered = [(D("2024-01-01"), D("2024-01-10")), (D("2024-01-20"), D("2024-01-25"))]
+    assert missing_ranges(D("2024-01-01"), D("2024-01-31"), covered, merge_days=merge_days) == expected
+
+
+# === parse_history_page ===
+
+def test_rows_follow_nightly_candle_rules():
+    rows, _, _ = parse_history_page(history([
+        candle(3),
+        ["2024-01-04", None, 101.5, "20"],  # цена из LEGALCLOSEPRICE, объём строкой
+        candle(5, close=None),               # нет цены закрытия
+        candle(6, volume=0),                 # нулевой объём
+        candle(7, volume=-5),
+        ["bad-date", 100.0, None, 10],       # битая строка
+        ["2024-01-08", 100.0],               # короткая строка
+    ]), ITEM, 0)
+    assert rows == [
+        {"ticker": "SBER", "date": D("2024-01-03"), "close": 100.0, "volume": 10},
+        {"ticker": "SBER", "date": D("2024-01-04"), "close": 101.5, "volume": 20},
+    ]
+
+
+@pytest.mark.parametrize("cursor, next_start, done", [
+    ([0, 250, 100], 100, False),
+    ([100, 250, 100], 200, False),
+    ([200, 250, 100], 300, True),   # последняя неполная страница
+    ([100, 200, 100], 200, True),   # ровно дочитали
+    ([0, 0, 100], 100, True),       # в диапазоне нет истории
+])
+def test_cursor_drives_next_start(cursor, next_start, done):
+    _, actual_next, actual_done = parse_history_page(history([candle(3)], cursor), ITEM, cursor[0])
+    assert (actual_next, actual_done) == (next_start, done)
+
+
+def test_without_cursor_pages_until_empty():
+    assert parse_history_page(history([candle(3), candle(4)]), ITEM, 100)[1:] == (102, False)
+    assert parse_history_page(history([]), ITEM, 102) == ([], 102, True)
+    # Секции history нет вовсе — тоже конец
+    assert parse_history_page({}, ITEM, 0) == ([], 0, True)
+
+
+def test_skipped_rows_still_advance_cursor_without_history_cursor():
+    # Отброшенные строки — тоже строки страницы: курсор сдвигается на длину данных, а не свечей
+    rows, next_start, done = parse_history_page(history([candle(3, volume=0), candle(4, close=None)]), ITEM, 0)
+    assert (rows, next_start, done) == ([], 2, False)
+
+
+# === fetch_history_pages: когда листание останавливается ===
+
+class FakeClient:
+    def __init__(self, pages):
+        self.pages = pages
+        self.starts: List[int] = []
+
+    async def get_history(self, engine, market, board, secid, date_from, date_till, columns, start):
+        self.starts.append(start)
+        return self.pages[len(self.starts) - 1]
+
+
+def collect(client: FakeClient, item: BackfillRange = ITEM) -> List[HistoryPage]:
+    async def run():
+        return [page async for page in fetch_history_pages(client, item)]
+    return asyncio.run(run())
+
+
+def test_fetch_follows_cursor_to_total():
+    client = FakeClient([
+        history([candle(3), candle(4)], [0, 3, 2]),
+        history([candle(5)], [2, 3, 2]),
+    ])
+    pages = collect(client)
+    assert client.starts == [0, 2]
+    assert [(len(p.rows), p.next_start, p.done) for p in pages] == [(2, 2, False), (1, 4, True)]
+
+
+def test_fetch_without_cursor_stops_on_empty_page():
+    client = FakeClient([history([candle(3), candle(4)]), history([candle(5)]), history([])])
+    pages = collect(client)
+    assert client.starts == [0, 2, 3]
+    assert [(p.next_start, p.done) for p in pages] == [(2, False), (3, False), (3, True)]
+
+
+def test_fetch_resumes_from_saved_cursor():
+    client = FakeClient([history([candle(5)], [200, 201, 100])])
+    pages = collect(client, ITEM._replace(next_start=200))
+    assert client.starts == [200]
+    assert pages[-1].done
+
+
+def test_fetch_stops_when_cursor_does_not_advance():
+    # PAGESIZE 0: курсор не сдвигается — иначе листали бы одну страницу бесконечно
+    client = FakeClient([history([candle(3)], [0, 1000, 0])])
+    pages = collect(client)
+    assert client.starts == [0]
+    assert pages[-1].done
+
+
+def test_fetch_error_leaves_range_unfinished():
+    class BrokenClient(FakeClient):
+        async def get_history(self, *args):
+            if self.starts:
+                raise ConnectionError("ISS недоступен")
+            return await super().get_history(*args)
+
+    client = BrokenClient([history([candle(3)], [0, 2, 1])])
+    pages = collect(client)
+    assert [(p.next_start, p.done) for p in pages] == [(1, False)]
+
+
+# === plan_backfill и write_history_pages на Postgres ===
+
+TODAY = D("2024-03-01")  # история нужна по 2024-02-29
+
+
+@pytest.fixture
+def backfill_settings(monkeypatch):
+    monkeypatch.setattr(settings, "CANDLES_BACKFILL_FROM", D("2024-01-01"))
+    monkeypatch.setattr(settings, "CANDLES_BACKFILL_GAP_DAYS", 5)
+    return monkeypatch
+
+
+def weekdays(date_from: date, date_till: date) -> List[date]:
+    days = (date_from + timedelta(days=i) for i in range((date_till - date_from).days + 1))
+    return [day for day in days if day.weekday() < 5]
+
+
+async def seed(engine, market_data, candles=(), checkpoints=()):
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "INSERT INTO market_data (secid, boardid, instrument_type, volume, created_at, updated_at)"
+            " VALUES (:secid, :boardid, :instrument_type, :volume, now(), now())"
+        ), [dict(zip(("secid", "boardid", "instrument_type", "volume"), row)) for row in market_data])
+        if candles:
+            await conn.execute(text(
+                "INSERT INTO candles (ticker, date, close, volume) VALUES (:ticker, :date, 100, 10)"
+            ), [{"ticker": ticker, "date": day} for ticker, day in candles])
+        if checkpoints:
+            await conn.execute(text(
+                "INSERT INTO candles_backfill (ticker, date_from, date_till, boardid, instrument_type,"
+                " next_start, rows_loaded, done, updated_at)"
+                " VALUES (:ticker, :date_from, :date_till, 'TQBR', 'stock', 0, :rows_loaded, :done, now())"
+            ), list(checkpoints))
+
+
+async def checkpoints(engine) -> List[tuple]:
+    async with engine.connect() as conn:
+        result = await conn.execute(text(
+            "SELECT ticker, date_from, date_till, boardid, next_start, rows_loaded, done"
+            " FROM candles_backfill ORDER BY ticker, date_from"
+        ))
+        return [tuple(row) for row in result]
+
+
+@requires_postgres
+def test_plan_finds_gaps_against_existing_candles(pg_schema, backfill_settings):
+    async def test(engine):
+        backfill_settings.setattr(for_candles_backfill, "get_db", session_factory(engine))
+        await seed(
+            engine,
+            market_data=[
+                ("SBER", "TQBR", "stock", 100), ("SBER", "SMAL", "stock", 1),  # берётся ликвидный режим
+                ("GAZP", "TQBR", "stock", 50), ("IMOEX", "SNDX", "index", None),
+                ("USD000UTSTOM", "CETS", "currency", 1),                       # тип без истории свечей
+                ("X" * 21, "TQBR", "stock", 1),                                 # не влезает в candles.ticker
+            ],
+            candles=[("GAZP", day) for day in weekdays(D("2024-01-01"), D("2024-02-29"))]
+                    + [("SBER", day) for day in weekdays(D("2024-01-01"), D("2024-01-31"))],
+        )
+        first = await plan_backfill(TODAY)
+        saved = await checkpoints(engine)
+        # Повторный план продолжает заведённые диапазоны и не заводит их заново
+        second = await plan_backfill(TODAY)
+        return first, saved, second, await checkpoints(engine)
+
+    first, saved, second, saved_again = run_in_schema(pg_schema, test)
+    assert sorted(first) == [
+        BackfillRange("IMOEX", "SNDX", "index", D("2024-01-01"), D("2024-02-29")),
+        BackfillRange("SBER", "TQBR", "stock", D("2024-02-01"), D("2024-02-29")),
+    ]
+    assert sorted(second) == sorted(first)
+    assert saved == saved_again == [
+        ("IMOEX", D("2024-01-01"), D("2024-02-29"), "SNDX", 0, 0, False),
+        ("SBER", D("2024-02-01"), D("2024-02-29"), "TQBR", 0, 0, False),
+    ]
+
+
+@requires_postgres
+def test_history_pages_are_written_with_checkpoints(pg_schema, backfill_settings):
+    async def test(engine):
+        backfill_settings.setattr(for_candles_backfill, "get_db", session_factory(engine))
+        await seed(
+            engine,
+            market_data=[("GAZP", "TQBR", "stock", 50)],
+            candles=[("GAZP", day) for day in weekdays(D("2024-01-01"), D("2024-02-01"))],
+        )
+        (item,) = await plan_backfill(TODAY)
+
+        def page(days, next_start, done):
+            rows = [{"ticker": "GAZP", "date": D(day), "close": 101.5, "volume": 20} for day in days]
+            return HistoryPage(item, rows, next_start, done)
+
+        # 2024-02-01 уже есть в candles: дубликат не вставляется, но страница его учитывает
+        inserted = await write_history_pages([
+            page(["2024-02-01", "2024-02-02"], 2, False),
+            page(["2024-02-05"], 3, False),
+        ])
+        after_first = await checkpoints(engine)
+        inserted += await write_history_pages([page(["2024-02-06"], 4, True)])
+        async with engine.connect() as conn:
+            count = (await conn.execute(text(
+                "SELECT count(*) FROM candles WHERE ticker = 'GAZP' AND date > '2024-02-01'"
+            ))).scalar_one()
+        # Диапазон завершён — следующий план его не возвращает
+        return inserted, after_first, await checkpoints(engine), count, await plan_backfill(TODAY)
+
+    inserted, after_first, after_last, count, next_plan = run_in_schema(pg_schema, test)
+    assert inserted == count == 3
+    assert after_first == [("GAZP", D("2024-02-02"), D("2024-02-29"), "TQBR", 3, 3, False)]
+    assert after_last == [("GAZP", D("2024-02-02"), D("2024-02-29"), "TQBR", 4, 4, True)]
+    assert next_plan == []
+
+
+@requires_postgres
+def test_failed_batch_does_not_move_checkpoint(pg_schema, backfill_settings):
+    async def test(engine):
+        backfill_settings.setattr(for_candles_backfill, "get_db", session_factory(engine))
+        await seed(engine, market_data=[("GAZP", "TQBR", "stock", 50)])
+        (item,) = await plan_backfill(TODAY)
+        good = {"ticker": "GAZP", "date": D("2024-01-03"), "close": 100, "volume": 1}
+        bad = {**good, "date": D("2024-01-04"), "close": None}  # close NOT NULL
+        with pytest.raises(DBAPIError):
+            await write_history_pages([HistoryPage(item, [good, bad], 2, True)])
+        async with engine.connect() as conn:
+            count = (await conn.execute(text("SELECT count(*) FROM candles"))).scalar_one()
+        return count, await checkpoints(engine)
+
+    count, saved = run_in_schema(pg_schema, test)
+    # Ни свечей, ни курсора: следующий проход начнёт диапазон с той же страницы
+    assert count == 0
+    assert saved == [("GAZP", D("2024-01-01"), D("2024-02-29"), "TQBR", 0, 0, False)]
+
+
+@requires_postgres
+def test_finished_ranges_collapse_when_ticker_has_no_gaps(pg_schema, backfill_settings):
+    async def test(engine):
+        backfill_settings.setattr(for_candles_backfill, "get_db", session_factory(engine))
+        await seed(
+            engine,
+            market_data=[("SBER", "TQBR", "stock", 100)],
+            checkpoints=[
+                {"ticker": "SBER", "date_from": D("2024-01-01"), "date_till": D("2024-01-31"), "rows_loaded": 20,
+                 "done": True},
+                {"ticker": "SBER", "date_from": D("2024-02-01"), "date_till": D("2024-02-29"), "rows_loaded": 19,
+                 "done": True},
+            ],
+        )
+        return await plan_backfill(TODAY), await checkpoints(engine)
+
+    ranges, saved = run_in_schema(pg_schema, test)
+    assert ranges == []
+    assert saved == [("SBER", D("2024-01-01"), D("2024-02-29"), "TQBR", 0, 39, True)]
@@ -0,0 +1,80 @@
+# tests/test_http_cache.py
+"""
+Кеш ответов BaseHTTPClient: TTL, схлопывание одновременных запросов и удаление истёкших записей —
+кеш не должен расти с каждым новым ключом (страницы истории, bondization по бумагам).
+"""
+import asyncio
+from typing import List
+
+from scheduler.clients.base_client import CACHE_SWEEP_MIN_SIZE, BaseHTTPClient
+
+
+class FakeClient(BaseHTTPClient):
+    def __init__(self):
+        super().__init__("http://iss.test")
+        self.requests: List[str] = []
+
+    async def _fetch_bytes(self, endpoint: str, params: dict = None) -> bytes:
+        self.requests.append(endpoint)
+        await asyncio.sleep(0)
+        return endpoint.encode()
+
+
+def run(test):
+    async def main():
+        client = FakeClient()
+        try:
+            return await test(client)
+        finally:
+            await client.close()
+    return asyncio.run(main())
+
+
+def test_ttl_hits_and_expiry():
+    async def test(client: FakeClient):
+        await client._get_bytes("/a", cache_ttl=0.05)
+        await client._get_bytes("/a", cache_ttl=0.05)
+        assert client.requests == ["/a"] and client.cache_hits == 1
+        await asyncio.sleep(0.06)
+        # Истёкшая запись удаляется при обращении и загружается заново
+        await client._get_bytes("/a", cache_ttl=0.05)
+        assert client.requests == ["/a", "/a"] and len(client._cache) == 1
+
+    run(test)
+
+
+def test_concurrent_requests_are_coalesced():
+    async def test(client: FakeClient):
+        results = await asyncio.gather(*(client._get_bytes("/a") for _ in range(5)))
+        assert results == [b"/a"] * 5
+        assert client.requests == ["/a"] and client.cache_coalesced == 4
+        # Без cache_ttl ответ не кешируется
+        assert client.cache_stats()["size"] == 0
+
+    run(test)
+
+
+def test_expired_entries_are_swept():
+    async def test(client: FakeClient):
+        for i in range(CACHE_SWEEP_MIN_SIZE * 2):
+            await client._get_bytes(f"/history/{i}", cache_ttl=0.01)
+        await asyncio.sleep(0.02)
+        for i in range(CACHE_SWEEP_MIN_SIZE * 4):
+            await client._get_bytes(f"/bondization/{i}", cache_ttl=0.01)
+            await asyncio.sleep(0.001)
+        # Ключи истории давно истекли: чистка при вставке их удалила
+        assert not any(key[1].startswith("/history/") for key in client._cache)
+        assert len(client._cache) < CACHE_SWEEP_MIN_SIZE * 4
+
+    run(test)
+
+
+def test_live_entries_survive_sweep():
+    async def test(client: FakeClient):
+        for i in range(CACHE_SWEEP_MIN_SIZE * 3):
+            await client._get_bytes(f"/securities/{i}", cache_ttl=60)
+        assert len(client._cache) == CACHE_SWEEP_MIN_SIZE * 3
+        await client._get_bytes("/securities/0", cache_ttl=60)
+        assert client.cache_hits == 1
+
+    run(test)
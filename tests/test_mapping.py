@@ -0,0 +1,185 @@
+# tests/test_mapping.py
+"""
+Процессоры акций, фондов и индексов на декларативном маппинге (scheduler.processors.mapping)
+против построчных эталонов (tests/oracles): сгенерированные движком функции разбора должны давать
+те же строки, ключи, типы и значения.
+
+Где построчный код падал на всём ответе, маппинг обрабатывает строку — эти расхождения
+зафиксированы отдельными тестами ниже (test_*_previously_raised).
+"""
+import logging
+import math
+import random
+from typing import Any, Callable, Dict, List
+
+import pytest
+
+from scheduler.clients.iss import IssSection
+from scheduler.processors.for_funds import process_fund_data
+from scheduler.processors.for_indices import process_index_data
+from scheduler.processors.for_stocks import process_stock_data
+from scheduler.processors.mapping import Mapping
+from tests.oracles.for_funds_rows import process_fund_data as process_fund_rows
+from tests.oracles.for_indices_rows import process_index_data as process_index_rows
+from tests.oracles.for_stocks_rows import process_stock_data as process_stock_rows
+from tests.samples import KINDS, market_response
+
+PROCESSORS: Dict[str, Callable] = {
+    "stocks": process_stock_data,
+    "funds": process_fund_data,
+    "indices": process_index_data,
+}
+ORACLES: Dict[str, Callable] = {
+    "stocks": process_stock_rows,
+    "funds": process_fund_rows,
+    "indices": process_index_rows,
+}
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    logging.disable(logging.WARNING)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def _same(a: Any, b: Any) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return type(a) is type(b) and a == b
+
+
+def assert_equivalent(kind: str, raw_data) -> List[Dict[str, Any]]:
+    expected = ORACLES[kind](raw_data)
+    actual = PROCESSORS[kind](raw_data)
+    assert len(actual) == len(expected)
+    for old, new in zip(expected, actual):
+        assert list(new) == list(old)
+        for key in old:
+            assert _same(old[key], new[key]), (kind, old["secid"], key, old[key], new[key])
+    return actual
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("kind", KINDS)
+def test_random_responses_match_row_implementation(kind, seed):
+    rng = random.Random(seed)
+    assert_equivalent(kind, market_response(kind, rng, rng.choice([1, 5, 60, 500])))
+
+
+def test_converters_are_cached_per_schema():
+    # Схема ответа не меняется между запросами: код генерируется один раз
+    rng = random.Random(0)
+    mapping = Mapping("stock", fields={"SECID": "secid", "BOARDID": "boardid"}, sec_fields={}, sec_output=())
+    raw_data = market_response("stocks", rng, 10)
+    mapping.process(raw_data)
+    mapping.process(raw_data)
+    assert len(mapping._market_converters) == 1 and len(mapping._sec_converters) == 1
+
+
+def test_invalid_keys_are_rejected():
+    with pytest.raises(ValueError):
+        Mapping("stock", fields={"SECID": "secid", "BOARDID": "boardid", "X": "row"}, sec_fields={}, sec_output=())
+    with pytest.raises(ValueError):
+        Mapping("stock", fields={"SECID": "secid", "BOARDID": "boardid", "X": "not a name"}, sec_fields={},
+                sec_output=())
+
+
+@pytest.mark.parametrize("kind", KINDS)
+def test_missing_columns(kind):
+    # Колонки нет в ответе — ключа нет и в строке, формулы видят None
+    columns = {"stocks": ["SECID", "BOARDID", "LAST"], "funds": ["SECID", "BOARDID", "LAST"],
+               "indices": ["SECID", "BOARDID", "CURRENTVALUE", "VALTODAY", "LASTCHANGE", "LASTCHANGEPRC"]}[kind]
+    board = {"stocks": "TQBR", "funds": "TQTF", "indices": "SNDX"}[kind]
+    sec_columns = ["SECID", "BOARDID", "SHORTNAME"] if kind == "indices" else ["SECID", "SHORTNAME"]
+    sec_row = ["A", board, "name"] if kind == "indices" else ["A", "name"]
+    market_row = ["A", board, 10.5] + ([100, None, None] if kind == "indices" else [])
+    assert_equivalent(kind, {
+        "marketdata": IssSection(columns, [market_row]),
+        "securities": IssSection(sec_columns, [sec_row]),
+    })
+
+
+def test_index_without_change_columns_emits_none():
+    """
+    Ответ индексов без колонок LASTCHANGE/LASTCHANGEPRC: построчный код не добавлял ключи
+    change_abs/change_percent, если не мог их посчитать, маппинг всегда отдаёт их (None).
+    Для записи это одно и то же: BulkWriter читает row.get(name), а None не затирает значение в БД.
+    """
+    raw_data = {
+        "marketdata": IssSection(["SECID", "BOARDID", "CURRENTVALUE", "VALTODAY"], [["A", "SNDX", 10.5, 100]]),
+        "securities": IssSection(["SECID", "BOARDID", "SHORTNAME"], [["A", "SNDX", "name"]]),
+    }
+    [old] = process_index_rows(raw_data)
+    [new] = process_index_data(raw_data)
+    assert "change_abs" not in old and "change_percent" not in old
+    assert new["change_abs"] is None and new["change_percent"] is None
+    assert {key: new.get(key) for key in {*old, *new}} == {key: old.get(key) for key in {*old, *new}}
+
+
+# === Поведение, которое изменилось намеренно: построчный код падал на всём ответе ===
+
+def _index_response(current, open_value, change_percent) -> Dict[str, IssSection]:
+    return {
+        "marketdata": IssSection(
+            ["SECID", "BOARDID", "CURRENTVALUE", "OPENVALUE", "HIGH", "LOW", "VALTODAY", "LASTCHANGE", "LASTCHANGEPRC"],
+            [["IMOEX", "SNDX", current, open_value, 3100.0, 3000.0, 1e9, None, change_percent],
+             ["RTSI", "SNDX", 1100.0, 1000.0, 1120.0, 990.0, 5e8, None, None]],
+        ),
+        "securities": IssSection(["SECID", "BOARDID", "SHORTNAME"], [["IMOEX", "SNDX", "IMOEX"], ["RTSI", "SNDX", "RTS"]]),
+    }
+
+
+@pytest.mark.parametrize("current", [None, ""])
+def test_index_without_current_value_previously_raised(current):
+    """
+    Индекс с OPENVALUE, но без CURRENTVALUE и LASTCHANGEPRC (например, до первой сделки):
+    построчный код считал (None - open) / open и падал с TypeError — не обновлялся ни один индекс.
+    Маппинг оставляет строку без изменения к открытию, остальные индексы обрабатываются как раньше.
+    """
+    raw_data = _index_response(current, 3050.0, None)
+    with pytest.raises(TypeError):
+        process_index_rows(raw_data)
+
+    imoex, rtsi = process_index_data(raw_data)
+    assert imoex["last_price"] is None and imoex["change_abs"] is None and imoex["change_percent"] is None
+    assert imoex["volatility_percent"] == round(100 / 3050.0 * 100, 6)
+    # Остальные строки — как у построчного кода на ответе без проблемной строки
+    raw_data["marketdata"] = IssSection(raw_data["marketdata"].columns, raw_data["marketdata"].data[1:])
+    assert rtsi == process_index_rows(raw_data)[0]
+
+
+def test_stock_invalid_list_level_previously_raised():
+    """LISTLEVEL, который не приводится к int: построчный код акций падал с ValueError, маппинг даёт None (как у фондов)."""
+    raw_data = {
+        "marketdata": IssSection(["SECID", "BOARDID", "LAST"], [["SBER", "TQBR", 300.0]]),
+        "securities": IssSection(["SECID", "LISTLEVEL"], [["SBER", "n/a"]]),
+    }
+    with pytest.raises(ValueError):
+        process_stock_rows(raw_data)
+    [row] = process_stock_data(raw_data)
+    assert row["list_level"] is None
+
+
+def test_stock_malformed_rows_previously_raised():
+    """Строка marketdata короче заголовка: построчный код акций падал с IndexError, маппинг её пропускает (как у фондов и индексов)."""
+    raw_data = {
+        "marketdata": IssSection(["SECID", "BOARDID", "LAST"], [["SBER", "TQBR", 300.0], ["GAZP", "TQBR"]]),
+        "securities": IssSection(["SECID", "SHORTNAME"], [["SBER", "Сбербанк"]]),
+    }
+    with pytest.raises(IndexError):
+        process_stock_rows(raw_data)
+    assert [row["secid"] for row in process_stock_data(raw_data)] == ["SBER"]
+
+
+@pytest.mark.parametrize("missing", ["marketdata", "securities"])
+def test_stock_missing_section_previously_raised(missing):
+    """Ответ без секции: построчный код акций падал с KeyError, маппинг возвращает пустой список с предупреждением."""
+    raw_data = {
+        "marketdata": IssSection(["SECID", "BOARDID", "LAST"], [["SBER", "TQBR", 300.0]]),
+        "securities": IssSection(["SECID", "SHORTNAME"], [["SBER", "Сбербанк"]]),
+    }
+    del raw_data[missing]
+    with pytest.raises(KeyError):
+        process_stock_rows(raw_data)
+    assert process_stock_data(raw_data) == []
@@ -0,0 +1,87 @@
+# tests/test_pipeline.py
+"""
+Конвейер падает после того, как часть пачек уже закоммичена: счётчики стадий остаются
+в Pipeline.stats, а publish_partial публикует записанное до ошибки.
+"""
+import asyncio
+import logging
+from typing import List
+
+import pytest
+
+from scheduler.pipeline import Pipeline, each
+from scheduler.processors.sinks import publish_partial
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def failing_pipeline(committed: List[list], fail_on_batch: int) -> Pipeline:
+    async def write(rows: list) -> int:
+        if len(committed) == fail_on_batch:
+            raise RuntimeError("пачка не записана")
+        committed.append(rows)
+        return len(rows)
+
+    async def parse(rows: list) -> list:
+        return rows
+
+    return (
+        Pipeline("Test")
+        .source("fetch", each([[1, 2], [3, 4], [5, 6]]))
+        .stage("parse", parse)
+        .sink("write", write, batch_size=2)
+    )
+
+
+async def run_job(pipeline: Pipeline, published: List[int]):
+    async def publish(written: int):
+        published.append(written)
+
+    try:
+        await pipeline.run()
+    except Exception:
+        await publish_partial(pipeline, publish)
+        raise
+
+
+def test_stats_survive_failed_run():
+    committed: List[list] = []
+    pipeline = failing_pipeline(committed, fail_on_batch=1)
+    with pytest.raises(RuntimeError):
+        asyncio.run(pipeline.run())
+    assert committed == [[1, 2]]
+    assert pipeline.stats["write"].result == 2 and pipeline.stats["write"].items_out == 2
+
+
+def test_partial_result_is_published_before_reraise():
+    published: List[int] = []
+    with pytest.raises(RuntimeError, match="пачка не записана"):
+        asyncio.run(run_job(failing_pipeline([], fail_on_batch=2), published))
+    assert published == [4]
+
+
+def test_nothing_written_nothing_published():
+    published: List[int] = []
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_job(failing_pipeline([], fail_on_batch=0), published))
+    assert published == []
+
+
+def test_publish_error_does_not_replace_original():
+    async def publish(written: int):
+        raise ConnectionError("БД недоступна")
+
+    async def job(pipeline: Pipeline):
+        try:
+            await pipeline.run()
+        except Exception:
+            await publish_partial(pipeline, publish)
+            raise
+
+    with pytest.raises(RuntimeError, match="пачка не записана"):
+        asyncio.run(job(failing_pipeline([], fail_on_batch=1)))
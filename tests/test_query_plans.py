@@ -0,0 +1,219 @@
+# tests/test_query_plans.py
+"""
+Планы запросов к БД на заполненной базе: ни один запрос API (api/database/dao.py) и пересчёта
+топов шедулером (scheduler/database/leaderboards.py) не читает market_data, candles и bond_events
+последовательным сканированием — только по индексам из initdb и миграций.
+
+Нужен Postgres (tests/postgres.py): тест работает в своей схеме с initdb и всеми миграциями,
+заполняет таблицы объёмами порядка боевых и делает ANALYZE. Без DATABASE_URL тест пропускается.
+"""
+import asyncio
+import json
+import os
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.database.dao import (
+    BaseDao, BondDAO, BondEventDAO, CandlesDAO, CapitalizationDAO, CompanyDAO, CouponDAO, IndexDAO, StockDAO,
+)
+from api.database.snapshot import market_snapshot
+from scheduler.database.leaderboards import _specs, rebuild_leaderboards
+from tests.postgres import create_schema, drop_schema, requires_postgres, schema_engine
+
+pytestmark = requires_postgres
+
+SCHEMA = f"query_plans_{os.getpid()}"
+
+# Таблицы, которые растут с рынком: по ним последовательное сканирование недопустимо
+INDEXED_TABLES = {"market_data", "candles", "bond_events"}
+
+TODAY = date.today()
+
+SEED_SQL = """
+SELECT setseed(0.42);
+
+-- Состав рынка: ~250 акций, ~3000 облигаций, фонды и индексы, как на Мосбирже
+INSERT INTO market_data (
+    secid, boardid, instrument_type, shortname, currency, list_level,
+    last_price, open_price, high_price, low_price, change_percent, volume, volatility_percent,
+    maturity_date, couponpercent, next_coupon_date, duration_years, effectiveyield, facevalue, accruedint
+)
+SELECT
+    t.prefix || g, t.boardid, t.instrument_type, t.prefix || ' ' || g, 'SUR', 1 + (random() * 2)::int,
+    p.price, p.price * (0.97 + random() * 0.06), p.price * 1.03, p.price * 0.97,
+    CASE WHEN random() < 0.1 THEN NULL ELSE round((random() * 10 - 5)::numeric, 4) END,
+    CASE WHEN random() < 0.1 THEN NULL ELSE (random() * 1e8)::bigint END,
+    round((random() * 6)::numeric, 4),
+    CASE WHEN t.instrument_type = 'bond' THEN current_date + (random() * 5000)::int - 200 END,
+    CASE WHEN t.instrument_type = 'bond' THEN round((random() * 20)::numeric, 4) END,
+    CASE WHEN t.instrument_type = 'bond' THEN current_date + (random() * 200)::int - 10 END,
+    CASE WHEN t.instrument_type = 'bond' THEN round((random() * 10)::numeric, 4) END,
+    CASE WHEN t.instrument_type = 'bond' THEN round((random() * 30)::numeric, 4) END,
+    CASE WHEN t.instrument_type = 'bond' THEN 1000 END,
+    CASE WHEN t.instrument_type = 'bond' AND random() > 0.05 THEN round((random() * 40)::numeric, 2) END
+FROM (VALUES
+    ('S', 'TQBR', 'stock', 300),
+    ('RU', 'TQCB', 'bond', 3000),
+    ('F', 'TQTF', 'fund', 300),
+    ('I', 'SNDX', 'index', 150)
+) AS t(prefix, boardid, instrument_type, n)
+CROSS JOIN LATERAL generate_series(1, t.n) AS g
+CROSS JOIN LATERAL (SELECT 50 + random() * 950 AS price) AS p;
+
+INSERT INTO market_data (secid, boardid, instrument_type, shortname)
+SELECT secid, 'SNDX', 'index', secid FROM unnest(CAST(:index_secids AS VARCHAR[])) AS secid;
+
+-- История свечей: 300 тикеров за ~4 года
+INSERT INTO candles (ticker, date, close, volume)
+SELECT 'S' || t, d::date, 50 + random() * 950, (random() * 1e7)::bigint
+FROM generate_series(1, 300) AS t,
+     generate_series(current_date - 1500, current_date - 1, interval '1 day') AS d;
+
+-- События облигаций: купоны раз в квартал, амортизации и погашение
+INSERT INTO bond_events (secid, seq, event_type, event_date, face_value, payment_amount, currency)
+SELECT
+    'RU' || b, s,
+    CASE WHEN s = 24 THEN 'MATURITY' WHEN s % 8 = 0 THEN 'AMORTIZATION' ELSE 'COUPON' END,
+    current_date - 1000 + (b % 91) + s * 91,
+    1000, round((random() * 50)::numeric, 2),
+    CASE WHEN b % 10 = 0 THEN 'USD' ELSE 'SUR' END
+FROM generate_series(1, 3000) AS b, generate_series(1, 24) AS s;
+
+INSERT INTO coupons (secid, data, updated_at, next_event_date)
+SELECT 'RU' || b, '{}'::jsonb, NOW() AT TIME ZONE 'utc', current_date + 30
+FROM generate_series(1, 3000) AS b;
+
+INSERT INTO market_caps (timestamp, cap)
+SELECT d::date, 5e13 + random() * 1e13
+FROM generate_series(current_date - 1500, current_date - 1, interval '1 day') AS d;
+
+INSERT INTO companies (secid, description) VALUES ('S1', 'test');
+"""
+
+
+async def _scalar_plan(conn, statement: str, parameters: Any) -> Dict[str, Any]:
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+    plan = result.scalar_one()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+
+def _seq_scans(plan: Dict[str, Any]) -> List[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in INDEXED_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", ()):
+        found += _seq_scans(child)
+    return found
+
+
+# Запросы API: имя → вызов DAO с сессией (снимок market_data не загружен, всё идёт в БД)
+DAO_CALLS: Dict[str, Callable[[AsyncSession], Any]] = {
+    "BaseDao.get_page": lambda s: BaseDao.get_page(s, "bond", 5, 40),
+    "BaseDao.get_page[columns]": lambda s: BaseDao.get_page(s, "stock", 2, 40, columns=("secid", "last_price")),
+    "BaseDao.get_page_after": lambda s: BaseDao.get_page_after(s, "bond", 1500, 40),
+    "BaseDao.get_marketdata_by_secid": lambda s: BaseDao.get_marketdata_by_secid(s, "RU17"),
+    "StockDAO.get_top_stocks": lambda s: StockDAO.get_top_stocks(s, "volume", 10),
+    "BondDAO.get_events": lambda s: BondDAO.get_events(s, "payment", 20),
+    "BondDAO.get_top_bonds": lambda s: BondDAO.get_top_bonds(s, "liquidity", 5, columns=("secid", "volume")),
+    "BondDAO.get_top_yields": lambda s: BondDAO.get_top_yields(s, "long", 5),
+    "IndexDAO.get_top_indexes[rising]": lambda s: IndexDAO.get_top_indexes(s, "rising"),
+    "IndexDAO.get_top_indexes[main]": lambda s: IndexDAO.get_top_indexes(s, "main"),
+    "IndexDAO.get_top_indexes[sector]": lambda s: IndexDAO.get_top_indexes(s, "sector"),
+    "IndexDAO.get_top_indexes[all]": lambda s: IndexDAO.get_top_indexes(s, "all"),
+    "CapitalizationDAO.get_capitalization": lambda s: CapitalizationDAO.get_capitalization(s, "1y"),
+    "CandlesDAO.get_candles[1m]": lambda s: CandlesDAO.get_candles(s, "S7", "1m"),
+    "CandlesDAO.get_candles[all]": lambda s: CandlesDAO.get_candles(s, "S7", "all"),
+    "CouponDAO.get_bond_payments": lambda s: CouponDAO.get_bond_payments(s, "RU17"),
+    "BondEventDAO.get_for_secid": lambda s: BondEventDAO.get_for_secid(s, "RU17"),
+    "BondEventDAO.get_calendar": lambda s: BondEventDAO.get_calendar(
+        s, TODAY, TODAY + timedelta(days=7), 500
+    ),
+    "BondEventDAO.get_calendar[filters]": lambda s: BondEventDAO.get_calendar(
+        s, TODAY, TODAY + timedelta(days=30), 500, event_types=["COUPON", "MATURITY"], currencies=["USD"]
+    ),
+    "BondEventDAO.get_calendar[after]": lambda s: BondEventDAO.get_calendar(
+        s, TODAY, TODAY + timedelta(days=30), 500, after=(TODAY + timedelta(days=3), "RU100", 12)
+    ),
+    "CompanyDAO.get_company_info": lambda s: CompanyDAO.get_company_info(s, "S1"),
+}
+
+LEADERBOARD_SPECS = [f"{spec.instrument_type}-{spec.metric}-{spec.bucket or 'all'}" for spec in _specs()]
+
+Statement = Tuple[str, Any]
+
+
+async def _collect_plans() -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+    assert not market_snapshot.ready
+
+    await create_schema(SCHEMA)
+    engine = schema_engine(SCHEMA)
+    captured: List[Statement] = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not statement.startswith("EXPLAIN"):
+            captured.append((statement, parameters))
+
+    try:
+        async with AsyncSession(engine) as session:
+            for statement in SEED_SQL.split(";\n"):
+                if statement.strip():
+                    await session.execute(
+                        text(statement),
+                        {"index_secids": [*IndexDAO.MAIN_INDEXES, *IndexDAO.SECTOR_INDEXES]}
+                        if ":index_secids" in statement else {}
+                    )
+            captured.clear()
+            await rebuild_leaderboards(session)
+            rebuild = list(captured)
+            await session.commit()
+
+        async with engine.connect() as conn:
+            await conn.execute(text("ANALYZE"))
+            await conn.commit()
+
+        plans: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+
+        # Пересчёт топов: DELETE, затем INSERT ... SELECT на каждую спецификацию в порядке _specs()
+        async with engine.connect() as conn:
+            for name, (statement, parameters) in zip(LEADERBOARD_SPECS, rebuild[1:]):
+                plans[f"leaderboards:{name}"] = [(statement, await _scalar_plan(conn, statement, parameters))]
+
+        for name, call in DAO_CALLS.items():
+            async with AsyncSession(engine) as session:
+                captured.clear()
+                await call(session)
+                statements = list(captured)
+                conn = await session.connection()
+                plans[name] = [
+                    (statement, await _scalar_plan(conn, statement, parameters))
+                    for statement, parameters in statements
+                ]
+                await session.rollback()
+        return plans
+    finally:
+        await engine.dispose()
+        await drop_schema(SCHEMA)
+
+
+@pytest.fixture(scope="module")
+def plans():
+    return asyncio.run(_collect_plans())
+
+
+@pytest.mark.parametrize("name", list(DAO_CALLS))
+def test_dao_queries_use_indexes(plans, name):
+    statements = plans[name]
+    assert statements, f"{name} не обратился к БД"
+    for statement, plan in statements:
+        assert not _seq_scans(plan), f"{name}: Seq Scan в плане\n{statement}\n{json.dumps(plan, indent=2)}"
+
+
+@pytest.mark.parametrize("name", LEADERBOARD_SPECS)
+def test_leaderboard_rebuild_uses_indexes(plans, name):
+    [(statement, plan)] = plans[f"leaderboards:{name}"]
+    assert not _seq_scans(plan), f"топ {name}: Seq Scan в плане\n{statement}\n{json.dumps(plan, indent=2)}"
@@ -0,0 +1,52 @@
+# tests/test_serialization.py
+"""
+Сериализация ответов (api.common.serialization): приведение значений из БД к типам схемы
+без молчаливой потери данных и ответ /companies/{secid}, когда описания компании нет.
+"""
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Optional
+
+import orjson
+import pytest
+from pydantic import BaseModel
+
+from api.common import routes
+from api.common.serialization import RowSerializer, _to_int
+
+
+class Item(BaseModel):
+    id: int
+    volume: Optional[int] = None
+
+
+serializer = RowSerializer(Item)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None), (7, 7), (Decimal("7"), 7), (Decimal("7.000"), 7), (7.0, 7), ("7", 7), (True, 1),
+])
+def test_integral_values_are_converted(value, expected):
+    assert _to_int(value) == expected
+
+
+@pytest.mark.parametrize("value", [Decimal("7.5"), 7.25, -0.5])
+def test_fractional_values_are_rejected(value):
+    with pytest.raises(ValueError):
+        _to_int(value)
+
+
+def test_dump_converts_and_rejects():
+    assert orjson.loads(serializer.dump([SimpleNamespace(id=1, volume=Decimal("10"))])) == [{"id": 1, "volume": 10}]
+    with pytest.raises(ValueError):
+        serializer.dump([SimpleNamespace(id=1, volume=10.5)])
+
+
+def test_missing_company_is_null(monkeypatch):
+    async def get_company_info(session, secid):
+        return None
+
+    monkeypatch.setattr(routes.CompanyDAO, "get_company_info", staticmethod(get_company_info))
+    response = asyncio.run(routes.get_info_companies_by_secid(secid="NOPE", session=None))
+    assert response.status_code == 200 and response.body == b"null"
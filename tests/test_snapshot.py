@@ -0,0 +1,189 @@
+# tests/test_snapshot.py
+"""
+Снимок market_data в памяти API (api.database.snapshot): пока он загружен, DAO отвечают из него,
+а не из SQL. Строки снимка собираются только из columns схемы ответа — как проекция SQL-запроса, —
+и JSON совпадает с сериализацией полных строк. Инкрементальная догрузка убирает строки,
+удалённые из таблицы (проверка на Postgres — tests/postgres.py).
+"""
+import asyncio
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import Date, DateTime, Integer, Numeric, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.bonds.schemas import bond_event_serializer, bond_for_table_serializer, bond_full_info_serializer
+from api.common.schemas import forex_serializer
+from api.database import dao
+from api.database.dao import BaseDao, BondDAO, IndexDAO, StockDAO
+from api.database import snapshot as snapshot_module
+from api.database.models import MarketData
+from api.database.snapshot import COLUMNS, MarketDataSnapshot
+from api.funds.schemas import fund_for_table_serializer, fund_full_info_serializer
+from api.indices.schemas import index_for_table_serializer, index_full_info_serializer
+from api.stocks.schemas import stock_for_table_serializer, stock_for_top_serializer, stock_full_info_serializer
+from tests.postgres import pg_schema, requires_postgres, run_in_schema  # noqa: F401
+
+BOARDS = {"stock": "TQBR", "fund": "TQTF", "index": "SNDX", "bond": "TQCB", "forex": "CETS"}
+MAIN_INDEX = next(iter(IndexDAO.MAIN_INDEXES))
+
+
+def value(column, n: int):
+    # Те же Python-типы, что отдаёт asyncpg: Decimal для NUMERIC, int для INTEGER/BIGINT
+    if isinstance(column.type, Numeric):
+        return Decimal(f"{n}.25")
+    if isinstance(column.type, Integer):
+        return n
+    if isinstance(column.type, DateTime):
+        return datetime(2030, 1, 1, 10, n % 60)
+    if isinstance(column.type, Date):
+        return date(2030, 1, 1 + n % 28)
+    return f"{column.name}-{n}"
+
+
+def market_row(n: int, instrument_type: str, secid: str = None) -> tuple:
+    values = {column.name: value(column, n) for column in MarketData.__table__.columns}
+    values.update(id=n, instrument_type=instrument_type, boardid=BOARDS[instrument_type], secid=secid or f"S{n}")
+    return tuple(values[name] for name in COLUMNS)
+
+
+@pytest.fixture
+def snapshot(monkeypatch) -> MarketDataSnapshot:
+    rows = [market_row(n, instrument_type) for n, instrument_type in enumerate(sorted(BOARDS) * 3, 1)]
+    rows.append(market_row(len(rows) + 1, "index", MAIN_INDEX))
+
+    snapshot = MarketDataSnapshot()
+    snapshot._replace(rows)
+    type_idx = COLUMNS.index("instrument_type")
+    snapshot._leaderboards = {
+        (row[type_idx], metric, bucket): [other[0] for other in reversed(rows) if other[type_idx] == row[type_idx]]
+        for row in rows
+        for metric, bucket in (("volume", ""), ("payment", ""), ("yield", "long"))
+    }
+    snapshot.ready = True
+    monkeypatch.setattr(dao, "market_snapshot", snapshot)
+    return snapshot
+
+
+# Вызовы DAO так, как их делают роуты: метод, аргументы, сериализатор и overrides при dump
+CALLS = {
+    "stocks_page": (BaseDao.get_page, dict(instrument_type="stock", page=1, per_page=2), stock_for_table_serializer, {}),
+    "funds_page": (BaseDao.get_page, dict(instrument_type="fund", page=2, per_page=2), fund_for_table_serializer, {}),
+    "bonds_after": (BaseDao.get_page_after, dict(instrument_type="bond", after_id=1, per_page=5),
+                    bond_for_table_serializer, {}),
+    "stocks_top": (StockDAO.get_top_stocks, dict(type="volume", limit=2), stock_for_top_serializer, {}),
+    "bond_events": (BondDAO.get_events, dict(type="payment", limit=2), bond_event_serializer,
+                    {"event_type": "payment"}),
+    "bond_yields": (BondDAO.get_top_yields, dict(type="long", limit=2), bond_for_table_serializer, {}),
+    "indexes_main": (IndexDAO.get_top_indexes, dict(type="main"), index_for_table_serializer, {}),
+    "indexes_all": (IndexDAO.get_top_indexes, dict(type="all"), index_for_table_serializer, {}),
+}
+
+BY_SECID = {
+    "stock": stock_full_info_serializer,
+    "fund": fund_full_info_serializer,
+    "index": index_full_info_serializer,
+    "bond": bond_full_info_serializer,
+}
+
+
+def call(method, kwargs, columns=None):
+    return asyncio.run(method(session=None, columns=columns, **kwargs))
+
+
+def assert_projected(rows, serializer):
+    expected = {"id", *(name for name in serializer.columns if name in COLUMNS)}
+    assert all(set(vars(row)) == expected for row in rows)
+
+
+@pytest.mark.parametrize("name", CALLS)
+def test_snapshot_rows_follow_response_columns(snapshot, name):
+    method, kwargs, serializer, overrides = CALLS[name]
+    rows = call(method, kwargs, serializer.columns)
+    assert rows
+    assert_projected(rows, serializer)
+    # Ответ тот же, что и из полных строк снимка
+    full = call(method, kwargs)
+    assert serializer.dump(rows, start_id=1, **overrides) == serializer.dump(full, start_id=1, **overrides)
+
+
+@pytest.mark.parametrize("instrument_type", BY_SECID)
+def test_snapshot_row_by_secid_follows_response_columns(snapshot, instrument_type):
+    serializer = BY_SECID[instrument_type]
+    secid = next(secid for secid, pos in snapshot._by_secid.items()
+                 if snapshot._columns["instrument_type"][pos] == instrument_type)
+    row = asyncio.run(BaseDao.get_marketdata_by_secid(session=None, secid=secid, columns=serializer.columns))
+    assert_projected([row], serializer)
+    assert serializer.dump_items([row]) == serializer.dump_items([snapshot.get_by_secid(secid)])
+    assert asyncio.run(BaseDao.get_marketdata_by_secid(session=None, secid="NOPE", columns=serializer.columns)) is None
+
+
+def test_forex_rows_have_fields_the_route_reads(snapshot):
+    # /forex собирает ответ сам (logo_url из secid): строке нужны только колонки таблицы
+    rows = asyncio.run(BaseDao.get_page(
+        session=None, instrument_type="forex", page=1, per_page=5, columns=forex_serializer.columns
+    ))
+    assert len(rows) == 3
+    assert all(set(vars(row)) == {"id", "secid", "last_price", "shortname"} for row in rows)
+
+
+def test_without_columns_rows_are_complete(snapshot):
+    rows = snapshot.get_all("stock")
+    assert len(rows) == 3 and all(tuple(vars(row)) == COLUMNS for row in rows)
+
+
+# === Догрузка: удалённые и перезаписанные под новым id строки ===
+
+def test_merge_drops_rows_missing_from_table(snapshot):
+    stocks = [row.id for row in snapshot.get_all("stock")]
+    ids = set(snapshot._pos_by_id) - {stocks[0]}
+    # Бумага перезаписана под новым id: старый id пропал, новый пришёл как изменённая строка
+    old = snapshot.get_by_secid("S" + str(stocks[1]))
+    ids.discard(old.id)
+    ids.add(100)
+    snapshot._merge([market_row(100, "stock", old.secid)], ids)
+
+    assert snapshot.get_by_secid(f"S{stocks[0]}") is None
+    assert snapshot.get_by_secid(old.secid).id == 100
+    assert [row.id for row in snapshot.get_all("stock")] == [stocks[2], 100]
+    assert all(len(values) == len(ids) for values in snapshot._columns.values())
+    # Топ с удалённой строкой её просто пропускает
+    assert stocks[0] not in [row.id for row in snapshot.get_leaderboard("stock", "volume", "", 10)]
+
+
+def test_merge_without_ids_keeps_rows(snapshot):
+    size = len(snapshot._pos_by_id)
+    snapshot._merge([])
+    assert len(snapshot._pos_by_id) == size
+
+
+@requires_postgres
+def test_incremental_load_removes_deleted_rows(pg_schema, monkeypatch):
+    async def test(engine):
+        monkeypatch.setattr(snapshot_module, "AsyncSessionLocal", lambda: AsyncSession(engine))
+        async with engine.begin() as conn:
+            await conn.execute(text(
+                "INSERT INTO market_data (secid, boardid, instrument_type, created_at, updated_at) "
+                "SELECT s, 'TQBR', 'stock', now(), now() FROM unnest(ARRAY['SBER', 'GAZP', 'LKOH']) AS s"
+            ))
+        loaded = MarketDataSnapshot()
+        await loaded._load(full=True)
+
+        async with engine.begin() as conn:
+            await conn.execute(text("DELETE FROM market_data WHERE secid = 'GAZP'"))
+            # Перезапись под новым id: та же бумага, другая строка
+            await conn.execute(text("DELETE FROM market_data WHERE secid = 'LKOH'"))
+            await conn.execute(text(
+                "INSERT INTO market_data (secid, boardid, instrument_type, created_at, updated_at) "
+                "VALUES ('LKOH', 'TQBR', 'stock', now(), now())"
+            ))
+        await loaded._load(full=False)
+        async with AsyncSession(engine) as session:
+            ids = dict((await session.execute(text("SELECT secid, id FROM market_data"))).all())
+        return loaded, ids
+
+    loaded, ids = run_in_schema(pg_schema, test)
+    assert loaded.get_by_secid("GAZP") is None
+    assert loaded.get_by_secid("LKOH").id == ids["LKOH"]
+    assert sorted(row.secid for row in loaded.get_all("stock")) == ["LKOH", "SBER"]